@@ -0,0 +1,500 @@
+"""
+=============================================================
+  BENCHMARK  —  Mediciones del punto de venta sin interfaz
+  Ejecutar:  python benchmark.py cobro
+             python benchmark.py cobro --lineas 1 10 100 1000 --repeticiones 50
+             python benchmark.py estres --terminales 8 --ventas 200
+             python benchmark.py estres --terminales 16 --servidor
+             python benchmark.py generar grande.db --productos 50000 --anios 2
+             python benchmark.py suite grande.db --guardar historial_bench.json
+  Trabaja sobre una base temporal; nunca toca ventas.db.
+=============================================================
+"""
+
+import argparse, bisect, datetime, itertools, json, multiprocessing, os, platform, random
+import sqlite3, statistics, subprocess, sys, tempfile, time
+
+import repositorio as repo
+from busqueda import IndiceProductos
+from carrito import Carrito
+from catalogo import Catalogo
+
+
+# ──────────────────────────────────────────────────────────
+#  UTILIDADES
+# ──────────────────────────────────────────────────────────
+def percentil(valores, p):
+    """Percentil p (0–100) por el método del rango más cercano."""
+    orden = sorted(valores)
+    if not orden:
+        return 0.0
+    k = max(0, min(len(orden) - 1, round(p / 100 * len(orden) + 0.5) - 1))
+    return orden[k]
+
+def usar_base_temporal(directorio):
+    """Apunta el repositorio a un ventas.db nuevo dentro de 'directorio'."""
+    repo.cerrar_conexiones()
+    repo.DB_FILE = os.path.join(directorio, "ventas.db")
+    repo.init_db()
+
+def crear_catalogo(n, stock=10**9):
+    """Inserta n productos con stock de sobra para que ninguna venta falle."""
+    with repo.get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO productos (codigo,nombre,precio,costo,stock,categoria)"
+            " VALUES (?,?,?,?,?,?)",
+            [(f"B{i:07d}", f"Producto {i}", 1000 + i % 90 * 100, 500 + i % 40 * 100, stock, "Bench")
+             for i in range(n)])
+    # Solo los del benchmark: init_db también siembra productos de ejemplo con poco stock
+    return [p for p in repo.listar_productos() if p[1].startswith("B")]
+
+def _fmt_ms(segundos):
+    return f"{segundos * 1000:9.2f}"
+
+
+# ──────────────────────────────────────────────────────────
+#  COBRO
+# ──────────────────────────────────────────────────────────
+def medir_cobro(lineas=(1, 10, 100, 1000), repeticiones=30):
+    """
+    Latencia de repositorio.registrar_venta (COMMIT incluido) para tickets de
+    distinto tamaño. Retorna {lineas: [segundos por venta, ...]}.
+    """
+    catalogo = crear_catalogo(max(lineas))
+    resultados = {}
+    for n in lineas:
+        tiempos = []
+        for _ in range(repeticiones):
+            carrito = [{"id": p[0], "nombre": p[2], "precio": p[3], "costo": p[4],
+                        "cantidad": random.randint(1, 3)}
+                       for p in random.sample(catalogo, n)]
+            t0 = time.perf_counter()
+            repo.registrar_venta(carrito)
+            tiempos.append(time.perf_counter() - t0)
+        resultados[n] = tiempos
+    return resultados
+
+def _cmd_cobro(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        usar_base_temporal(tmp)
+        resultados = medir_cobro(args.lineas, args.repeticiones)
+        repo.cerrar_conexiones()
+    modo = "persistente (WAL)" if repo.CONEXION_PERSISTENTE else "por llamada"
+    print(f"Cobro — {args.repeticiones} ventas por tamaño, conexión {modo}")
+    print(f"{'líneas':>8} {'media ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'máx ms':>9}")
+    for n, t in resultados.items():
+        print(f"{n:>8} {_fmt_ms(statistics.mean(t))} {_fmt_ms(percentil(t, 50))}"
+              f" {_fmt_ms(percentil(t, 95))} {_fmt_ms(max(t))}")
+
+
+# ──────────────────────────────────────────────────────────
+#  ESTRÉS: VARIAS TERMINALES SOBRE EL MISMO ARCHIVO
+# ──────────────────────────────────────────────────────────
+def _terminal(ruta, ventas, semilla, servidor=None):
+    """Un proceso = una caja. Cobra 'ventas' tickets de 1–5 líneas contra 'ruta',
+    o contra servidor.py si se indica su dirección."""
+    global repo
+    random.seed(semilla)
+    if servidor:
+        import cliente as repo
+        repo.SERVIDOR = servidor
+    else:
+        repo.DB_FILE = ruta
+    catalogo = [p for p in repo.listar_productos() if p[1].startswith("B")]
+    tiempos, sin_stock, bloqueos, unidades = [], 0, 0, 0
+    for _ in range(ventas):
+        carrito = [{"id": p[0], "nombre": p[2], "precio": p[3], "costo": p[4],
+                    "cantidad": random.randint(1, 3)}
+                   for p in random.sample(catalogo, random.randint(1, 5))]
+        t0 = time.perf_counter()
+        try:
+            repo.registrar_venta(carrito)
+        except repo.StockInsuficiente:
+            sin_stock += 1
+            continue
+        except (sqlite3.OperationalError, ConnectionError):
+            bloqueos += 1   # Se agotaron los reintentos
+            continue
+        tiempos.append(time.perf_counter() - t0)
+        unidades += sum(i["cantidad"] for i in carrito)
+    repo.cerrar_conexiones()
+    return tiempos, sin_stock, bloqueos, unidades
+
+def _esperar_servidor(direccion, limite=10):
+    import cliente
+    cliente.SERVIDOR = direccion
+    fin = time.monotonic() + limite
+    while True:
+        try:
+            return cliente.init_db()
+        except ConnectionError:
+            if time.monotonic() > fin:
+                raise
+            time.sleep(0.1)
+        finally:
+            cliente.cerrar_conexiones()
+
+def _cmd_estres(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        usar_base_temporal(tmp)
+        catalogo = crear_catalogo(args.productos, stock=args.stock)
+        stock_inicial = sum(p[5] for p in catalogo)
+        repo.cerrar_conexiones()
+
+        servidor = direccion = None
+        if args.servidor:
+            direccion = f"127.0.0.1:{args.puerto}"
+            servidor = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                              "servidor.py"),
+                 "--db", repo.DB_FILE, "--puerto", str(args.puerto)],
+                stdout=subprocess.DEVNULL)
+            _esperar_servidor(direccion)
+
+        try:
+            t0 = time.perf_counter()
+            # 'spawn' igual que en Windows: cada caja es un proceso independiente
+            with multiprocessing.get_context("spawn").Pool(args.terminales) as pool:
+                res = pool.starmap(_terminal, [(repo.DB_FILE, args.ventas, i, direccion)
+                                               for i in range(args.terminales)])
+            duracion = time.perf_counter() - t0
+        finally:
+            if servidor:
+                servidor.terminate()
+                servidor.wait()
+
+        tiempos  = [t for r in res for t in r[0]]
+        sin_stock = sum(r[1] for r in res)
+        bloqueos = sum(r[2] for r in res)
+        unidades = sum(r[3] for r in res)
+        with repo.get_conn() as conn:
+            n_ventas   = conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0]
+            n_resumen  = conn.execute("SELECT IFNULL(SUM(ventas),0) FROM resumen_diario").fetchone()[0]
+            vendidas   = conn.execute("SELECT IFNULL(SUM(cantidad),0) FROM detalle_venta").fetchone()[0]
+            stock_final = conn.execute(
+                "SELECT SUM(stock) FROM productos WHERE codigo LIKE 'B%'").fetchone()[0]
+            negativos  = conn.execute("SELECT COUNT(*) FROM productos WHERE stock < 0").fetchone()[0]
+        repo.cerrar_conexiones()
+
+    print(f"Estrés — {args.terminales} terminales × {args.ventas} ventas,"
+          + (" vía servidor.py (escritor único)" if args.servidor else
+             f" modo {repo.JOURNAL_MODE}, espera {repo.ESPERA_BLOQUEO:.1f}s,"
+             f" {repo.REINTENTOS_ESCRITURA} reintentos"))
+    print(f"  registradas {len(tiempos)}   sin stock {sin_stock}   bloqueadas {bloqueos}")
+    print(f"  {len(tiempos) / duracion:.0f} ventas/s   p50 {_fmt_ms(percentil(tiempos, 50)).strip()} ms"
+          f"   p95 {_fmt_ms(percentil(tiempos, 95)).strip()} ms"
+          f"   p99 {_fmt_ms(percentil(tiempos, 99)).strip()} ms")
+    coherente = (n_ventas == n_resumen == len(tiempos) and vendidas == unidades
+                 and stock_inicial - stock_final == vendidas and negativos == 0)
+    print("  consistencia:", "OK" if coherente else
+          f"FALLA (ventas {n_ventas}, resumen {n_resumen}, unidades {vendidas}/{unidades},"
+          f" stock {stock_inicial}-{stock_final}, negativos {negativos})")
+
+
+# ──────────────────────────────────────────────────────────
+#  DATOS SINTÉTICOS: UN ventas.db DE AÑOS DE OPERACIÓN
+# ──────────────────────────────────────────────────────────
+_TIPOS = {   # tipo → (categoría, precio base en centavos)
+    "Refresco": ("Bebidas", 1800), "Agua": ("Bebidas", 1000), "Jugo": ("Bebidas", 2200),
+    "Cerveza": ("Bebidas", 2500), "Leche": ("Lácteos", 2800), "Yogur": ("Lácteos", 1500),
+    "Queso": ("Lácteos", 6500), "Papas": ("Botanas", 1700), "Galletas": ("Botanas", 1400),
+    "Cacahuates": ("Botanas", 1200), "Pan": ("Panadería", 900), "Pastelito": ("Panadería", 1300),
+    "Café": ("Cafetería", 2500), "Jabón": ("Limpieza", 2100), "Detergente": ("Limpieza", 4500),
+    "Atún": ("Abarrotes", 2300), "Arroz": ("Abarrotes", 3200), "Frijol": ("Abarrotes", 3600),
+}
+_MARCAS  = ("Sol", "Norteña", "La Granja", "Del Valle", "Premium", "Casera", "Don Pepe",
+            "Sierra", "Costa", "Real", "Alba", "Imperial", "Rancho", "Mar Azul")
+_TAMANOS = ("chico", "mediano", "grande", "familiar", "100g", "250g", "500g", "1kg",
+            "355ml", "600ml", "1L", "2L")
+# Ventas por hora del día (7:00–22:00): picos en la mañana, a mediodía y al salir del trabajo
+_HORAS      = list(range(7, 23))
+_PESO_HORAS = [2, 4, 5, 5, 6, 8, 9, 7, 5, 5, 6, 8, 9, 7, 4, 2]
+_PESO_DIAS  = (1.1, 0.9, 0.9, 0.95, 1.0, 1.2, 1.3)   # lunes … domingo (date.weekday())
+
+def generar_base(ruta, productos=50000, ventas_dia=900, anios=2, lineas=3, semilla=1,
+                 al_avanzar=None):
+    """
+    Crea en 'ruta' (no debe existir) un ventas.db con 'productos' productos y
+    'anios' años de ventas que terminan hoy: unas 'ventas_dia' por día (más el
+    fin de semana), concentradas en horas pico, de ~'lineas' productos cada
+    una, elegidos con popularidad tipo Zipf (pocos productos venden mucho).
+    Retorna (productos, ventas, lineas de detalle).
+    """
+    if os.path.exists(ruta):
+        raise FileExistsError(f"{ruta} ya existe; la base se genera en un archivo nuevo")
+    rnd = random.Random(semilla)
+    repo.cerrar_conexiones()
+    repo.DB_FILE = os.path.abspath(ruta)
+    repo.init_db()
+    conn = repo.get_conn()
+
+    tipos = list(_TIPOS)
+    filas = []
+    for i in range(productos):
+        tipo = tipos[i % len(tipos)]
+        categoria, base = _TIPOS[tipo]
+        precio = base * rnd.randint(60, 250) // 100
+        filas.append((f"75{i:011d}", f"{tipo} {rnd.choice(_MARCAS)} {rnd.choice(_TAMANOS)} {i}",
+                      precio, precio * rnd.randint(55, 80) // 100, 10**7, categoria))
+    with repo.transaccion(conn):
+        conn.execute("DELETE FROM productos")   # Los de ejemplo de init_db
+        conn.executemany(
+            "INSERT INTO productos (codigo,nombre,precio,costo,stock,categoria)"
+            " VALUES (?,?,?,?,?,?)", filas)
+    catalogo = conn.execute("SELECT id, nombre, precio, costo FROM productos").fetchall()
+    rnd.shuffle(catalogo)   # La popularidad no depende del orden de alta
+    acumulado = list(itertools.accumulate(1 / (k + 1) for k in range(len(catalogo))))
+
+    hoy = datetime.date.today()
+    dia = hoy - datetime.timedelta(days=365 * anios)
+    venta_id = n_lineas = 0
+    while dia <= hoy:
+        n = max(1, round(ventas_dia * _PESO_DIAS[dia.weekday()] * rnd.uniform(0.8, 1.2)))
+        horas = sorted(rnd.choices(_HORAS, _PESO_HORAS, k=n))
+        ventas, detalle = [], []
+        for hora in horas:
+            venta_id += 1
+            fecha = f"{dia.isoformat()} {hora:02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}"
+            elegidos = {}
+            for _ in range(min(30, 1 + round(rnd.expovariate(1 / max(lineas - 1, 0.01))))):
+                pid, nombre, precio, costo = catalogo[bisect.bisect(acumulado,
+                                                                     rnd.random() * acumulado[-1])]
+                elegidos[pid] = (nombre, precio, costo)
+            total = 0
+            for pid, (nombre, precio, costo) in elegidos.items():
+                cantidad = rnd.choice((1, 1, 1, 1, 2, 2, 3))
+                total += precio * cantidad
+                detalle.append((venta_id, pid, nombre, precio, costo, cantidad,
+                                precio * cantidad, (precio - costo) * cantidad))
+            ventas.append((venta_id, fecha, total))
+        with repo.transaccion(conn):
+            conn.executemany("INSERT INTO ventas (id, fecha, total) VALUES (?,?,?)", ventas)
+            conn.executemany(
+                "INSERT INTO detalle_venta"
+                " (venta_id,producto_id,nombre,precio,costo,cantidad,subtotal,ganancia)"
+                " VALUES (?,?,?,?,?,?,?,?)", detalle)
+        n_lineas += len(detalle)
+        if al_avanzar and dia.day == 1:
+            al_avanzar(dia, venta_id, n_lineas)
+        dia += datetime.timedelta(days=1)
+
+    # Los resúmenes se calculan al final en una pasada, no venta por venta
+    with repo.transaccion(conn):
+        repo.reconstruir_resumen_diario(conn)
+        repo.reconstruir_resumenes_reportes(conn)
+    conn.execute("ANALYZE")
+    repo.cerrar_conexiones()
+    return productos, venta_id, n_lineas
+
+def _cmd_generar(args):
+    t0 = time.perf_counter()
+    try:
+        productos, ventas, lineas = generar_base(
+            args.archivo, args.productos, args.ventas_dia, args.anios, args.lineas, args.semilla,
+            al_avanzar=lambda dia, v, l: print(f"  {dia}  {v} ventas, {l} líneas…", end="\r"))
+    except FileExistsError as e:
+        sys.exit(str(e))
+    print(f"\r{args.archivo}: {productos} productos, {ventas} ventas, {lineas} líneas"
+          f" en {time.perf_counter() - t0:.0f} s ({os.path.getsize(args.archivo) / 1e6:.0f} MB)")
+
+
+# ──────────────────────────────────────────────────────────
+#  SUITE: LATENCIA DE LAS OPERACIONES DE LA CAJA
+#  Las mismas funciones que usa la interfaz, sin tkinter,
+#  sobre una copia de la base (cobrar y eliminar la modifican).
+# ──────────────────────────────────────────────────────────
+def _medir(argumentos, operacion):
+    """Llama operacion(*a) por cada a de 'argumentos' (preparados antes, fuera
+    del tiempo medido). Retorna los segundos de cada llamada."""
+    tiempos = []
+    for a in argumentos:
+        t0 = time.perf_counter()
+        operacion(*a)
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos
+
+def correr_suite(ruta, repeticiones=200, semilla=1):
+    """
+    Mide las operaciones de la caja sobre una copia de la base 'ruta'.
+    Retorna (datos, {operación: [segundos, ...]}), datos = tamaño de la base.
+    """
+    rnd = random.Random(semilla)
+    with tempfile.TemporaryDirectory() as tmp:
+        copia = os.path.join(tmp, "ventas.db")
+        origen = sqlite3.connect(ruta)
+        with sqlite3.connect(copia) as destino:
+            origen.backup(destino)   # Copia consistente aunque la base esté en WAL
+        destino.close()
+        origen.close()
+        repo.cerrar_conexiones()
+        repo.DB_FILE = copia
+        repo.init_db()
+        conn = repo.get_conn()
+        datos = {
+            "productos": conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0],
+            "ventas":    conn.execute("SELECT COUNT(*) FROM ventas").fetchone()[0],
+            "lineas":    conn.execute("SELECT COUNT(*) FROM detalle_venta").fetchone()[0],
+        }
+        ids   = [r[0] for r in conn.execute("SELECT id FROM ventas")]
+        dias  = [r[0] for r in conn.execute("SELECT dia FROM resumen_diario")] or [None]
+        meses = sorted({d[:7] for d in dias if d}) or [None]
+        r = {}
+
+        # Arranque: catálogo completo e índice de búsqueda (ver PuntoDeVenta)
+        def cargar_catalogo():
+            cat = Catalogo(repo)
+            cat.sincronizar()
+            return cat, IndiceProductos(cat.filas_venta())
+        r["carga_catalogo"] = _medir([()] * max(3, repeticiones // 40), cargar_catalogo)
+        catalogo, indice = cargar_catalogo()
+        filas = indice.buscar("")
+
+        # Búsqueda de la pantalla de ventas: palabras, prefijos, subcadenas y códigos
+        consultas = []
+        for _ in range(repeticiones):
+            _, codigo, nombre, *_ = rnd.choice(filas)
+            palabra = rnd.choice(nombre.split())
+            consultas.append((rnd.choice((palabra, palabra[:2], palabra[1:5], codigo,
+                                          f"{nombre.split()[0]} {palabra[:3]}")),))
+        r["filtro_productos"] = _medir(consultas, lambda q: indice.buscar(q, 500))
+        r["filtro_productos_admin"] = _medir(consultas[:max(5, repeticiones // 10)],
+                                             catalogo.listar)
+
+        carrito = Carrito()
+        r["agregar_al_carrito"] = _medir(
+            [(rnd.choice(filas)[0],) for _ in range(repeticiones)],
+            lambda pid: carrito.agregar(indice.fila(pid)))
+
+        def cobrar(n):
+            items = [{"id": f[0], "nombre": f[2], "precio": f[3], "costo": f[4], "cantidad": 1}
+                     for f in rnd.sample(filas, n)]
+            t0 = time.perf_counter()
+            repo.registrar_venta(items)
+            return time.perf_counter() - t0
+        r["cobro"] = [cobrar(rnd.randint(1, 8)) for _ in range(repeticiones)]
+
+        r["historial_mes"] = _medir(
+            [repo.rango_de_fechas(rnd.choice(meses)) or (None, None)
+             for _ in range(repeticiones)],
+            repo.listar_ventas)
+        cursores = [conn.execute("SELECT fecha, id FROM ventas WHERE id = ?",
+                                 (rnd.choice(ids),)).fetchone() for _ in range(repeticiones)] \
+            if ids else []
+        r["historial_pagina"] = _medir(cursores, lambda f, i: repo.listar_ventas(
+            despues_de=(f, i)))
+        r["kpis_del_dia"] = _medir([(rnd.choice(dias),) for _ in range(repeticiones)],
+                                   repo.kpis_del_dia)
+        r["detalle_venta"] = _medir([(rnd.choice(ids),) for _ in range(repeticiones)]
+                                    if ids else [], repo.detalle_de_venta)
+        r["reporte_top_anual"] = _medir(
+            [repo.rango_de_fechas(rnd.choice(meses)[:4]) if meses[0] else (None, None)
+             for _ in range(max(5, repeticiones // 10))],
+            repo.top_productos)
+        r["eliminar_venta"] = _medir([(v,) for v in rnd.sample(ids, min(len(ids), repeticiones))],
+                                     repo.eliminar_venta)
+        repo.cerrar_conexiones()
+    return datos, r
+
+def _resumen(tiempos):
+    ms = lambda p: round(percentil(tiempos, p) * 1000, 4)
+    return {"n": len(tiempos), "p50_ms": ms(50), "p95_ms": ms(95), "p99_ms": ms(99),
+            "max_ms": round(max(tiempos, default=0) * 1000, 4)}
+
+def comparar(actual, anterior, tolerancia=25, minimo_ms=0.05):
+    """Operaciones cuyo p95 empeoró más de 'tolerancia' % respecto a la corrida
+    anterior (y más de minimo_ms, para no alarmarse por ruido en microsegundos).
+    Retorna {operación: (p95 anterior, p95 actual)}."""
+    regresiones = {}
+    for op, res in actual["resultados"].items():
+        antes = anterior["resultados"].get(op)
+        if not antes or not res["n"]:
+            continue
+        if (res["p95_ms"] > antes["p95_ms"] * (1 + tolerancia / 100)
+                and res["p95_ms"] - antes["p95_ms"] > minimo_ms):
+            regresiones[op] = (antes["p95_ms"], res["p95_ms"])
+    return regresiones
+
+def _cmd_suite(args):
+    if not os.path.exists(args.archivo):
+        sys.exit(f"No existe {args.archivo} (créalo con: python benchmark.py generar {args.archivo})")
+    datos, tiempos = correr_suite(args.archivo, args.repeticiones, args.semilla)
+    corrida = {
+        "fecha":  datetime.datetime.now().isoformat(timespec="seconds"),
+        "base":   os.path.basename(args.archivo),
+        "datos":  datos,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "resultados": {op: _resumen(t) for op, t in tiempos.items()},
+    }
+    historial = []
+    if args.guardar and os.path.exists(args.guardar):
+        with open(args.guardar, encoding="utf-8") as f:
+            historial = json.load(f)
+    # Solo se compara contra una corrida sobre una base del mismo tamaño
+    anterior = next((c for c in reversed(historial) if c["datos"] == datos), None)
+    regresiones = comparar(corrida, anterior, args.tolerancia) if anterior else {}
+
+    print(f"Suite — {datos['productos']} productos, {datos['ventas']} ventas,"
+          f" {datos['lineas']} líneas" + (f"  (contra {anterior['fecha']})" if anterior else ""))
+    print(f"{'operación':<24}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    for op, res in corrida["resultados"].items():
+        marca = ""
+        if anterior and op in anterior["resultados"]:
+            antes = anterior["resultados"][op]["p95_ms"]
+            if antes:
+                marca = f"  {100 * (res['p95_ms'] - antes) / antes:+.0f}%"
+            if op in regresiones:
+                marca += "  ▲ REGRESIÓN"
+        print(f"{op:<24}{res['n']:>6}{res['p50_ms']:>10.3f}{res['p95_ms']:>10.3f}"
+              f"{res['p99_ms']:>10.3f}{res['max_ms']:>10.3f}{marca}")
+    if args.guardar:
+        historial.append(corrida)
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(historial, f, ensure_ascii=False, indent=1)
+        print(f"Corrida agregada a {args.guardar}")
+    if regresiones:
+        sys.exit(1)   # Para usarlo en integración continua
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del punto de venta")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("cobro", help="latencia de registrar una venta (commit incluido)")
+    p.add_argument("--lineas", type=int, nargs="+", default=[1, 10, 100, 1000])
+    p.add_argument("--repeticiones", type=int, default=30)
+    p.set_defaults(func=_cmd_cobro)
+
+    p = sub.add_parser("estres", help="varias terminales (procesos) cobrando en paralelo")
+    p.add_argument("--terminales", type=int, default=4)
+    p.add_argument("--ventas", type=int, default=200, help="ventas por terminal")
+    p.add_argument("--productos", type=int, default=500)
+    p.add_argument("--stock", type=int, default=10**6,
+                   help="stock inicial por producto (bájalo para forzar StockInsuficiente)")
+    p.add_argument("--servidor", action="store_true",
+                   help="las terminales cobran a través de servidor.py en vez de abrir el archivo")
+    p.add_argument("--puerto", type=int, default=8799)
+    p.set_defaults(func=_cmd_estres)
+
+    p = sub.add_parser("generar", help="crear un ventas.db sintético de años de operación")
+    p.add_argument("archivo", help="ruta del .db nuevo (no debe existir)")
+    p.add_argument("--productos", type=int, default=50000)
+    p.add_argument("--ventas-dia", type=int, default=900, help="ventas en un día promedio")
+    p.add_argument("--anios", type=int, default=2, help="años de historial hasta hoy")
+    p.add_argument("--lineas", type=float, default=3, help="productos por venta, en promedio")
+    p.add_argument("--semilla", type=int, default=1)
+    p.set_defaults(func=_cmd_generar)
+
+    p = sub.add_parser("suite", help="latencias p50/p95/p99 de las operaciones de la caja")
+    p.add_argument("archivo", help="ventas.db a medir (se trabaja sobre una copia)")
+    p.add_argument("--repeticiones", type=int, default=200)
+    p.add_argument("--semilla", type=int, default=1)
+    p.add_argument("--guardar", metavar="JSON",
+                   help="agregar la corrida a este archivo y compararla con la anterior")
+    p.add_argument("--tolerancia", type=float, default=25,
+                   help="%% que puede empeorar el p95 antes de marcar regresión")
+    p.set_defaults(func=_cmd_suite)
+
+    args = parser.parse_args()
+    args.func(args)
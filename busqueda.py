@@ -0,0 +1,175 @@
+"""
+=============================================================
+  BÚSQUEDA  —  Índice en memoria del catálogo de productos
+  Se construye una vez al cargar el catálogo y se actualiza
+  producto por producto cuando se edita o elimina uno.
+=============================================================
+"""
+
+import bisect, threading, unicodedata
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Café Américano' → 'cafe americano'."""
+    if texto.isascii():
+        return texto.casefold()
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(ch for ch in texto if not unicodedata.combining(ch)).casefold()
+
+def _trigramas(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class IndiceProductos:
+    """
+    Índice de búsqueda sobre las filas del catálogo de ventas
+    (id, codigo, nombre, precio, costo, stock).
+
+    - Código exacto: búsqueda en diccionario, O(1) (caso típico del lector de código de barras).
+    - Términos de 1–2 letras: prefijo de palabra, por bisección en una lista ordenada.
+    - Términos de 3+ letras: subcadena, usando un índice de trigramas para reducir
+      los candidatos y verificando solo esos.
+    Los textos se normalizan una sola vez al indexar, no en cada tecla.
+
+    buscar() puede llamarse desde un hilo de trabajo mientras el hilo de la
+    interfaz actualiza productos: ambas operaciones toman el mismo candado.
+    """
+
+    def __init__(self, filas=()):
+        self._filas     = {}   # id → fila
+        self._texto     = {}   # id → (codigo_norm, nombre_norm)
+        self.por_codigo = {}   # codigo_norm → id
+        self._tokens    = []   # [(token, id)] ordenada, para búsqueda por prefijo
+        self._trigramas = {}   # trigrama → {id}
+        self._orden     = []   # [(nombre_norm, id)] ordenada, resultado sin filtro
+        self._candado   = threading.Lock()
+        for fila in filas:
+            self._agregar(fila, ordenar=False)
+        self._tokens.sort()
+        self._orden.sort()
+
+    def __len__(self):
+        return len(self._filas)
+
+    def fila(self, pid):
+        """Fila del producto con ese id, o None."""
+        return self._filas.get(pid)
+
+    def por_codigo_exacto(self, codigo):
+        """Fila cuyo código coincide exactamente (sin importar mayúsculas/acentos), o None."""
+        pid = self.por_codigo.get(normalizar(codigo.strip()))
+        return self._filas.get(pid) if pid is not None else None
+
+    # ── Mantenimiento incremental ─────────────────────────
+    def actualizar(self, fila):
+        """Agrega un producto nuevo o reemplaza uno existente (mismo id)."""
+        with self._candado:
+            self._quitar(fila[0])
+            self._agregar(fila, ordenar=True)
+
+    def eliminar(self, pid):
+        with self._candado:
+            self._quitar(pid)
+
+    def _quitar(self, pid):
+        if pid not in self._filas:
+            return
+        codigo, nombre = self._texto.pop(pid)
+        del self._filas[pid]
+        if self.por_codigo.get(codigo) == pid:
+            del self.por_codigo[codigo]
+        for token in self._tokens_de(codigo, nombre):
+            i = bisect.bisect_left(self._tokens, (token, pid))
+            if i < len(self._tokens) and self._tokens[i] == (token, pid):
+                del self._tokens[i]
+            for tri in _trigramas(token):
+                ids = self._trigramas.get(tri)
+                if ids is not None:
+                    ids.discard(pid)
+                    if not ids:
+                        del self._trigramas[tri]
+        i = bisect.bisect_left(self._orden, (nombre, pid))
+        if i < len(self._orden) and self._orden[i] == (nombre, pid):
+            del self._orden[i]
+
+    def _agregar(self, fila, ordenar):
+        pid, codigo, nombre = fila[0], normalizar(fila[1]), normalizar(fila[2])
+        self._filas[pid] = fila
+        self._texto[pid] = (codigo, nombre)
+        self.por_codigo[codigo] = pid
+        for token in self._tokens_de(codigo, nombre):
+            if ordenar:
+                bisect.insort(self._tokens, (token, pid))
+            else:
+                self._tokens.append((token, pid))
+            for tri in _trigramas(token):
+                self._trigramas.setdefault(tri, set()).add(pid)
+        if ordenar:
+            bisect.insort(self._orden, (nombre, pid))
+        else:
+            self._orden.append((nombre, pid))
+
+    @staticmethod
+    def _tokens_de(codigo, nombre):
+        return {codigo, *nombre.split()}
+
+    # ── Consulta ──────────────────────────────────────────
+    def _con_prefijo(self, prefijo):
+        i = bisect.bisect_left(self._tokens, (prefijo,))
+        ids = set()
+        while i < len(self._tokens) and self._tokens[i][0].startswith(prefijo):
+            ids.add(self._tokens[i][1])
+            i += 1
+        return ids
+
+    def _con_subcadena(self, termino):
+        grupos = sorted((self._trigramas.get(t, set()) for t in _trigramas(termino)), key=len)
+        if not grupos[0]:
+            return set()
+        ids = set(grupos[0]).intersection(*grupos[1:])
+        return {pid for pid in ids
+                if termino in self._texto[pid][0] or termino in self._texto[pid][1]}
+
+    def buscar(self, consulta, limite=None):
+        """
+        Filas que contienen todos los términos de la consulta, ordenadas por relevancia:
+        código exacto, código que empieza con la consulta, nombre que empieza con ella,
+        alguna palabra que empieza con ella y, al final, coincidencias en medio de palabra.
+        Sin consulta devuelve todo el catálogo ordenado por nombre.
+        """
+        with self._candado:
+            return self._buscar(consulta, limite)
+
+    def _buscar(self, consulta, limite):
+        q = normalizar(consulta.strip())
+        if not q:
+            orden = self._orden if limite is None else self._orden[:limite]
+            return [self._filas[pid] for _, pid in orden]
+
+        ids = None
+        for termino in q.split():
+            encontrados = (self._con_subcadena(termino) if len(termino) >= 3
+                           else self._con_prefijo(termino))
+            ids = encontrados if ids is None else ids & encontrados
+            if not ids:
+                return []
+
+        primero = q.split()[0]
+        def _rango(pid):
+            codigo, nombre = self._texto[pid]
+            if codigo == q:
+                r = 0
+            elif codigo.startswith(q):
+                r = 1
+            elif nombre.startswith(q):
+                r = 2
+            elif nombre.startswith(primero) or f" {primero}" in nombre:
+                r = 3
+            else:
+                r = 4
+            return (r, nombre, pid)
+
+        orden = sorted(ids, key=_rango)
+        if limite is not None:
+            orden = orden[:limite]
+        return [self._filas[pid] for pid in orden]
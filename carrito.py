@@ -0,0 +1,85 @@
+"""
+=============================================================
+  CARRITO  —  Modelo del carrito de venta (sin tkinter)
+  Líneas indexadas por id de producto, total acumulado y
+  avisos por línea para que la vista solo redibuje lo que cambió.
+=============================================================
+"""
+
+
+class Carrito:
+    """
+    Cada línea es un dict con las llaves id, codigo, nombre, precio, costo,
+    cantidad y stock (el formato que espera repositorio.registrar_venta).
+    precio, costo y total en centavos enteros: el total acumulado es exacto
+    por muchas líneas que se agreguen y quiten (ver dinero.py).
+
+    Los suscriptores reciben (evento, indice, linea) con evento en:
+      "agregada"  — línea nueva al final, en la posición indice
+      "cambiada"  — cambió la cantidad de la línea en indice
+      "quitada"   — se quitó la línea que estaba en indice
+      "vaciado"   — se quitaron todas (indice y linea son None)
+    """
+
+    def __init__(self):
+        self._lineas    = {}   # id producto → línea
+        self._orden     = []   # ids en el orden en que se agregaron
+        self._posicion  = {}   # id producto → índice en _orden
+        self._oyentes   = []
+        self.total      = 0
+
+    def suscribir(self, funcion):
+        self._oyentes.append(funcion)
+
+    def _avisar(self, evento, indice=None, linea=None):
+        for funcion in self._oyentes:
+            funcion(evento, indice, linea)
+
+    # ── Consultas ─────────────────────────────────────────
+    def __len__(self):
+        return len(self._orden)
+
+    def __iter__(self):
+        return (self._lineas[pid] for pid in self._orden)
+
+    def linea(self, pid):
+        """Línea del producto, o None si no está en el carrito. O(1)."""
+        return self._lineas.get(pid)
+
+    # ── Cambios ───────────────────────────────────────────
+    def agregar(self, fila, cantidad=1):
+        """Suma unidades de un producto (fila del catálogo: id, codigo, nombre,
+        precio, costo, stock). Retorna la línea afectada."""
+        pid, codigo, nombre, precio, costo, stock = fila
+        linea = self._lineas.get(pid)
+        self.total += precio * cantidad
+        if linea is not None:
+            linea["cantidad"] += cantidad
+            self._avisar("cambiada", self._posicion[pid], linea)
+            return linea
+        linea = {"id": pid, "codigo": codigo, "nombre": nombre,
+                 "precio": precio, "costo": costo,
+                 "cantidad": cantidad, "stock": stock}
+        self._lineas[pid] = linea
+        self._posicion[pid] = len(self._orden)
+        self._orden.append(pid)
+        self._avisar("agregada", self._posicion[pid], linea)
+        return linea
+
+    def quitar_en(self, indice):
+        """Quita la línea que ocupa esa posición (la fila seleccionada en la lista)."""
+        pid = self._orden.pop(indice)
+        linea = self._lineas.pop(pid)
+        del self._posicion[pid]
+        for i in range(indice, len(self._orden)):
+            self._posicion[self._orden[i]] = i
+        self.total -= linea["precio"] * linea["cantidad"]
+        self._avisar("quitada", indice, linea)
+        return linea
+
+    def vaciar(self):
+        self._lineas.clear()
+        self._orden.clear()
+        self._posicion.clear()
+        self.total = 0
+        self._avisar("vaciado")
@@ -0,0 +1,84 @@
+"""
+=============================================================
+  CATÁLOGO  —  Copia en memoria de la tabla productos
+  Se lee completa una vez; después solo se piden a la BD los
+  productos que cambiaron (repositorio.cambios_productos), así
+  una venta de 3 productos actualiza 3 filas, no 20 000.
+=============================================================
+"""
+
+import threading
+
+
+class Catalogo:
+    """
+    Filas en el formato de repositorio.listar_productos_admin():
+    (id, codigo, nombre, costo, precio, stock, categoria).
+
+    repo: módulo con version_productos / listar_productos_admin /
+          cambios_productos (repositorio o cliente).
+
+    sincronizar() hace E/S y se llama desde el hilo de consultas; las lecturas
+    (listar, filas_venta, tomar_cambios) pueden venir de cualquier hilo. La
+    consulta a la BD se hace fuera del candado de los datos: una BD lenta no
+    bloquea al hilo de la interfaz.
+    """
+
+    def __init__(self, repo):
+        self._repo        = repo
+        self._filas       = {}      # id → fila
+        self.version      = None    # None = todavía no se ha leído
+        self._sin_aplicar = set()   # ids cambiados que la interfaz aún no ha tomado
+        self._candado     = threading.Lock()   # _filas y _sin_aplicar
+        self._leyendo     = threading.Lock()   # una sincronización a la vez
+
+    def sincronizar(self):
+        """
+        Pone la copia al día: la primera vez lee todo; después, solo lo que
+        cambió. Los ids cambiados se acumulan hasta que alguien los pide con
+        tomar_cambios(), así no se pierden aunque se descarte el resultado
+        de una sincronización (ver ProgramadorConsultas).
+        """
+        with self._leyendo:
+            if self.version is None:
+                version = self._repo.version_productos()   # Antes de listar: ver cambios_productos
+                filas = {f[0]: f for f in self._repo.listar_productos_admin()}
+                with self._candado:
+                    self._filas = filas
+                self.version = version
+                return
+            version, filas, eliminados = self._repo.cambios_productos(self.version)
+            with self._candado:
+                for fila in filas:
+                    self._filas[fila[0]] = fila
+                    self._sin_aplicar.add(fila[0])
+                for pid in eliminados:
+                    self._filas.pop(pid, None)
+                    self._sin_aplicar.add(pid)
+            self.version = version
+
+    def tomar_cambios(self):
+        """{id: fila, o None si se eliminó} de lo que cambió desde la llamada anterior."""
+        with self._candado:
+            ids, self._sin_aplicar = self._sin_aplicar, set()
+            return {pid: self._filas.get(pid) for pid in ids}
+
+    def listar(self, filtro=""):
+        """Filas de la página Productos cuyo código o nombre contiene 'filtro', por nombre."""
+        filtro = filtro.strip().lower()
+        with self._candado:
+            filas = list(self._filas.values())
+        if filtro:
+            filas = [f for f in filas if filtro in f[1].lower() or filtro in f[2].lower()]
+        filas.sort(key=lambda f: f[2])
+        return filas
+
+    @staticmethod
+    def a_venta(fila):
+        """Fila de admin → fila de la pantalla de ventas (id, codigo, nombre, precio, costo, stock)."""
+        pid, codigo, nombre, costo, precio, stock, _ = fila
+        return pid, codigo, nombre, precio, costo, stock
+
+    def filas_venta(self):
+        with self._candado:
+            return [self.a_venta(f) for f in self._filas.values()]
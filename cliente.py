@@ -0,0 +1,202 @@
+"""
+=============================================================
+  CLIENTE  —  Las funciones de repositorio.py, vía servidor.py
+  Mismos nombres y mismos valores de retorno que repositorio,
+  así la interfaz no distingue si la BD es local o remota:
+      POS_SERVIDOR=http://192.168.1.10:8765 POS_TOKEN=… python punto_de_venta.py
+  POS_TOKEN es el que muestra servidor.py al arrancar; en la
+  misma computadora que el servidor se lee solo de servidor.token.
+=============================================================
+"""
+
+import http.client, json, os, sqlite3, threading, urllib.parse
+
+# Lo que no toca la BD se usa tal cual del repositorio local
+from repositorio import StockInsuficiente, rango_de_fechas, PAGINA_HISTORIAL, ORDEN_TOP
+
+SERVIDOR = os.environ.get("POS_SERVIDOR", "http://127.0.0.1:8765")
+ESPERA   = float(os.environ.get("POS_ESPERA_SERVIDOR_S", "15"))
+TOKEN    = os.environ.get("POS_TOKEN")
+RUTA_TOKEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "servidor.token")
+
+_local    = threading.local()
+_abiertas = []
+_lock     = threading.Lock()
+
+
+# ──────────────────────────────────────────────────────────
+#  CONEXIÓN
+# ──────────────────────────────────────────────────────────
+def _conexion():
+    """Una conexión HTTP keep-alive por hilo (como get_conn() en repositorio)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        url = urllib.parse.urlsplit(SERVIDOR if "//" in SERVIDOR else f"http://{SERVIDOR}")
+        conn = http.client.HTTPConnection(url.hostname, url.port or 8765, timeout=ESPERA)
+        _local.conn = conn
+        with _lock:
+            _abiertas.append(conn)
+    return conn
+
+def _olvidar_conexion():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        conn.close()
+
+def cerrar_conexiones():
+    with _lock:
+        for conn in _abiertas:
+            conn.close()
+        _abiertas.clear()
+
+def _token():
+    """POS_TOKEN o, con el servidor en esta computadora, el de servidor.token."""
+    if TOKEN:
+        return TOKEN
+    try:
+        with open(RUTA_TOKEN, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def _pedir(metodo, ruta, cuerpo=None, reintentar=False):
+    datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+    for intento in (1, 2):
+        try:
+            conn = _conexion()
+            conn.request(metodo, ruta, body=datos,
+                         headers={"Content-Type": "application/json",
+                                  "Authorization": f"Bearer {_token()}"})
+            respuesta = conn.getresponse()
+            estado, resultado = respuesta.status, json.loads(respuesta.read())
+            break
+        except (OSError, http.client.HTTPException) as e:
+            _olvidar_conexion()
+            # Una lectura (o una venta con uuid) se puede repetir sin riesgo, p. ej.
+            # si el servidor se reinició y la conexión keep-alive quedó muerta; otra
+            # escritura, no: podría haberse guardado y la respuesta perderse.
+            if not reintentar or intento == 2:
+                raise ConnectionError(f"Sin conexión con el servidor {SERVIDOR}: {e}") from e
+    if estado == 401:
+        raise ConnectionError(f"El servidor {SERVIDOR} rechazó esta caja: "
+                              f"{resultado.get('mensaje', '')}")
+    return resultado
+
+def _llamar(nombre, *args, repetible=False, **kwargs):
+    # repetible=True: se puede repetir sin efectos dobles si la conexión falla
+    respuesta = _pedir("POST", f"/api/{nombre}", {"args": args, "kwargs": kwargs},
+                       reintentar=repetible)
+    if "error" not in respuesta:
+        return respuesta["resultado"]
+    tipo, mensaje = respuesta["error"], respuesta.get("mensaje", "")
+    if tipo == "StockInsuficiente":
+        raise StockInsuficiente([tuple(f) for f in respuesta["faltantes"]])
+    if tipo == "IntegrityError":
+        raise sqlite3.IntegrityError(mensaje)
+    if tipo == "ValueError":
+        raise ValueError(mensaje)
+    if tipo == "PermissionError":
+        raise PermissionError(mensaje)
+    raise sqlite3.OperationalError(mensaje)
+
+def _filas(filas):
+    # JSON no tiene tuplas; la interfaz compara y desempaca filas como tuplas
+    return [tuple(f) for f in filas]
+
+
+# ──────────────────────────────────────────────────────────
+#  MISMA API QUE repositorio.py
+# ──────────────────────────────────────────────────────────
+def init_db():
+    """El esquema lo crea el servidor; aquí solo se comprueba que responde."""
+    _pedir("GET", "/salud", reintentar=True)
+
+def get_config(clave):
+    return _llamar("get_config", clave, repetible=True)
+
+def set_config(clave, valor):
+    _llamar("set_config", clave, valor)
+
+def hay_admin():
+    return _llamar("hay_admin", repetible=True)
+
+def verificar_admin(clave):
+    return _llamar("verificar_admin", clave, repetible=True)
+
+def cambiar_admin(nueva, actual=None):
+    _llamar("cambiar_admin", nueva, actual)
+
+def listar_productos():
+    return _filas(_llamar("listar_productos", repetible=True))
+
+def obtener_producto(producto_id):
+    fila = _llamar("obtener_producto", producto_id, repetible=True)
+    return tuple(fila) if fila is not None else None
+
+def listar_productos_admin():
+    return _filas(_llamar("listar_productos_admin", repetible=True))
+
+def version_productos():
+    return _llamar("version_productos", repetible=True)
+
+def cambios_productos(desde_version):
+    version, filas, eliminados = _llamar("cambios_productos", desde_version, repetible=True)
+    return version, _filas(filas), eliminados
+
+def guardar_producto(codigo, nombre, costo, precio, stock, categoria, producto_id=None):
+    return _llamar("guardar_producto", codigo, nombre, costo, precio, stock, categoria,
+                   producto_id)
+
+def upsert_productos(columnas, filas):
+    insertadas, actualizadas, sin_alta = _llamar("upsert_productos", list(columnas),
+                                                 [list(f) for f in filas])
+    return insertadas, actualizadas, sin_alta
+
+def eliminar_producto(producto_id):
+    _llamar("eliminar_producto", producto_id)
+
+def registrar_venta(items, fecha=None, uuid=None):
+    # Con uuid la venta es idempotente en el servidor: reenviarla es seguro
+    venta_id, total = _llamar("registrar_venta", list(items), fecha, uuid,
+                              repetible=uuid is not None)
+    return venta_id, total
+
+def registrar_lote(ventas):
+    return [(venta_id, [tuple(f) for f in faltantes])
+            for venta_id, faltantes in _llamar("registrar_lote", list(ventas), repetible=True)]
+
+def listar_ventas(desde=None, hasta=None, despues_de=None, limite=PAGINA_HISTORIAL):
+    return _filas(_llamar("listar_ventas", desde, hasta, despues_de, limite, repetible=True))
+
+def kpis_del_dia(dia=None):
+    return tuple(_llamar("kpis_del_dia", dia, repetible=True))
+
+def detalle_de_venta(venta_id):
+    return _filas(_llamar("detalle_de_venta", venta_id, repetible=True))
+
+def eliminar_venta(venta_id, clave=None):
+    # El servidor la rechaza sin la contraseña de administrador
+    _llamar("eliminar_venta", venta_id, clave=clave)
+
+def top_productos(desde=None, hasta=None, por="unidades", limite=10):
+    return _filas(_llamar("top_productos", desde, hasta, por, limite, repetible=True))
+
+def mapa_horario(desde=None, hasta=None):
+    return _filas(_llamar("mapa_horario", desde, hasta, repetible=True))
+
+def margenes_por_categoria(desde=None, hasta=None):
+    return _filas(_llamar("margenes_por_categoria", desde, hasta, repetible=True))
+
+def registrar_compra(lineas, proveedor="", folio=None, fecha=None):
+    # Toda la entrega en una sola petición; no se repite sola: sin respuesta
+    # no se sabe si se recibió (con folio, recibirla otra vez lanza ValueError)
+    compra_id, n, unidades, total = _llamar("registrar_compra", [list(l) for l in lineas],
+                                            proveedor, folio, fecha)
+    return compra_id, n, unidades, total
+
+def listar_compras(desde=None, hasta=None, limite=PAGINA_HISTORIAL):
+    return _filas(_llamar("listar_compras", desde, hasta, limite, repetible=True))
+
+def detalle_de_compra(compra_id):
+    return _filas(_llamar("detalle_de_compra", compra_id, repetible=True))
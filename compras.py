@@ -0,0 +1,133 @@
+"""
+=============================================================
+  COMPRAS  —  Recepción de mercancía de proveedores
+  Ejecutar:  python compras.py recibir factura.csv --proveedor "Bimbo" --folio F-1234
+             python compras.py listar 2025-03
+             python compras.py ver 17
+  En la interfaz: Productos → 📥 Recibir…
+=============================================================
+
+Archivo de la entrega (.csv, .json o .jsonl, como en importacion.py):
+  codigo, cantidad, costo
+costo es el costo por unidad en pesos ("18.50", "$1,250.00" o "12,50"). Se
+aceptan mayúsculas y acentos ("Código") y "costo unitario" por costo.
+
+Una entrega se recibe completa o no se recibe: si alguna línea tiene un error
+o un código que no existe en productos, no se modifica nada y se reportan
+todas las líneas con problemas. Ver repositorio.registrar_compra para cómo se
+suman el stock y el costo promedio.
+"""
+
+import argparse, os, sys
+
+import repositorio
+from busqueda import normalizar
+from dinero import a_centavos, formato, limpiar_numero
+from importacion import leer_registros
+
+ALIAS = {"costo unitario": "costo", "costo_unitario": "costo", "piezas": "cantidad",
+         "unidades": "cantidad"}
+
+
+class ErroresRecepcion(ValueError):
+    """La entrega tiene líneas inválidas: errores = [(línea, motivo), ...]."""
+
+    def __init__(self, errores):
+        self.errores = errores
+        lista = "\n".join(f"  línea {n}: {motivo}" for n, motivo in errores[:20])
+        mas = f"\n  … y {len(errores) - 20} más" if len(errores) > 20 else ""
+        super().__init__(f"{len(errores)} líneas con errores; no se recibió nada:\n{lista}{mas}")
+
+
+def _columna(nombre):
+    nombre = normalizar(str(nombre).strip())
+    return ALIAS.get(nombre, nombre)
+
+def _linea(registro):
+    """dict del archivo → (codigo, cantidad, costo en centavos). ValueError con el motivo."""
+    if not isinstance(registro, dict):
+        raise ValueError("no es un objeto")
+    datos  = {_columna(k): v for k, v in registro.items() if k is not None}
+    codigo = str(datos.get("codigo") or "").strip()
+    if not codigo:
+        raise ValueError("codigo vacío")
+    try:
+        cantidad = float(limpiar_numero(datos.get("cantidad", "")))
+        entera   = int(cantidad)   # OverflowError con "1e400", ValueError con "nan"
+    except (ValueError, OverflowError):
+        raise ValueError(f"cantidad no es un número: {datos.get('cantidad')!r}")
+    if cantidad != entera or entera <= 0:
+        raise ValueError(f"cantidad debe ser un entero mayor que 0: {datos.get('cantidad')!r}")
+    costo = a_centavos(datos.get("costo", ""))   # ValueError con el valor
+    if costo < 0:
+        raise ValueError(f"costo negativo: {datos.get('costo')!r}")
+    if entera * costo > repositorio.ENTERO_MAX:
+        raise ValueError(f"cantidad o costo demasiado grandes: {datos.get('cantidad')!r}"
+                         f" × {datos.get('costo')!r}")
+    return codigo, entera, costo
+
+def leer_recepcion(ruta):
+    """Lee y valida todas las líneas. Lanza ErroresRecepcion si alguna está mal."""
+    lineas, errores = [], []
+    for n, registro in leer_registros(ruta):
+        if isinstance(registro, Exception):   # Línea de JSONL ilegible
+            errores.append((n, registro.args[0]))
+            continue
+        try:
+            lineas.append(_linea(registro))
+        except ValueError as e:
+            errores.append((n, str(e)))
+    if errores:
+        raise ErroresRecepcion(errores)
+    return lineas
+
+def recibir_archivo(ruta, proveedor="", folio=None, repo=repositorio):
+    """
+    Registra la entrega del archivo. repo: repositorio o cliente (modo servidor):
+    en modo servidor las líneas viajan en UNA petición.
+    Retorna (compra_id, lineas, unidades, total). Lanza ValueError (o
+    ErroresRecepcion) si la entrega no se pudo recibir.
+    """
+    return repo.registrar_compra(leer_recepcion(ruta), proveedor, folio)
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recepción de mercancía")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("recibir", help="sumar al stock una entrega del proveedor")
+    p.add_argument("archivo")
+    p.add_argument("--proveedor", default="")
+    p.add_argument("--folio", default=None, help="factura o remisión (evita recibirla dos veces)")
+    p = sub.add_parser("listar", help="compras registradas")
+    p.add_argument("periodo", nargs="?", default=None, help="YYYY, YYYY-MM o YYYY-MM-DD")
+    p = sub.add_parser("ver", help="líneas de una compra")
+    p.add_argument("compra_id", type=int)
+    args = parser.parse_args()
+
+    if args.db:
+        repositorio.DB_FILE = os.path.abspath(args.db)
+    repositorio.init_db()
+    if args.comando == "recibir":
+        try:
+            compra_id, n, unidades, total = recibir_archivo(args.archivo, args.proveedor,
+                                                            args.folio)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print(f"Compra #{compra_id}: {n} productos, {unidades} unidades, {formato(total, True)}")
+    elif args.comando == "listar":
+        rango = repositorio.rango_de_fechas(args.periodo) if args.periodo else (None, None)
+        if rango is None:
+            parser.error(f"Periodo no válido: {args.periodo}")
+        for compra_id, fecha, proveedor, folio, n, unidades, total in \
+                repositorio.listar_compras(*rango):
+            print(f"#{compra_id:<6}{fecha}  {proveedor[:20]:<20} {folio or '':<12}"
+                  f"{n:>6} prod.{unidades:>8} u.{formato(total, True):>14}")
+    else:
+        for codigo, nombre, cantidad, costo, costo_anterior, stock_anterior in \
+                repositorio.detalle_de_compra(args.compra_id):
+            print(f"{codigo:<12}{nombre[:28]:<29}{cantidad:>6} × {formato(costo):>9}"
+                  f"   costo antes {formato(costo_anterior):>9}, stock antes {stock_anterior}")
+    repositorio.cerrar_conexiones()
@@ -0,0 +1,226 @@
+"""
+=============================================================
+  DIARIO DE VENTAS  —  Cobrar sin esperar a la base de datos
+  Cada venta se escribe primero en un archivo local (una línea
+  JSON, con fsync) y la caja queda libre al instante. Un hilo
+  la pasa después a ventas / detalle_venta en lotes.
+  Opcional: punto_de_venta.py lo usa con POS_COBRO_DIFERIDO=1.
+=============================================================
+
+Formato del archivo (solo se agregan líneas):
+  {"uuid": "...", "fecha": "...", "items": [...], "centavos": true}   venta cobrada
+  {"sincronizada": "...", "venta_id": 123}                             ya está en la BD
+  {"descartada": "..."}                                                 la quitó el usuario
+Los montos de items van en centavos; una venta sin "centavos" quedó de una
+versión anterior, con montos en pesos, y se convierte al cargarla.
+
+Si el programa se cierra o se cae con ventas pendientes, al abrirlo otra vez
+se vuelven a enviar. El uuid de cada venta es único en la tabla ventas
+(ver repositorio.registrar_lote), así que reenviar una venta que sí alcanzó
+a guardarse no la duplica.
+
+Una venta que la BD rechaza (p. ej. se eliminó uno de sus productos) queda
+en atascadas y no detiene a las demás. La interfaz la muestra y permite
+reintentarla o descartarla; las descartadas se copian a
+<diario>_descartadas.jsonl para poder revisarlas después.
+"""
+
+import datetime, json, os, queue, sqlite3, sys, threading, traceback, uuid
+
+from dinero import a_centavos
+
+LOTE_MAX  = 50     # ventas por transacción
+INTERVALO = 2.0    # segundos entre intentos mientras la BD no responde
+
+
+class DiarioVentas:
+    """
+    registrar_lote: función con la firma de repositorio.registrar_lote
+                    (o cliente.registrar_lote en modo servidor).
+
+    anotar() lo llama la interfaz al cobrar; novedades() entrega, también al
+    hilo de la interfaz, lo que el hilo de sincronización ya guardó.
+    """
+
+    def __init__(self, ruta, registrar_lote):
+        self.ruta            = ruta
+        self._registrar_lote = registrar_lote
+        self._pendientes     = {}                 # uuid → venta, en orden de cobro
+        self._candado        = threading.Lock()   # archivo y _pendientes
+        self._hay_trabajo    = threading.Event()
+        self._detener        = threading.Event()
+        self._novedades      = queue.Queue()
+        self._hilo           = None
+        self.ultimo_error    = None
+        self.atascadas       = {}   # uuid → error de las que la BD rechaza (ver sincronizar)
+        self.ruta_descartadas = os.path.splitext(ruta)[0] + "_descartadas.jsonl"
+        self._cargar()
+
+    def _cargar(self):
+        """Pendientes que quedaron de la sesión anterior."""
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, encoding="utf-8") as f:
+            texto = f.read()
+        for linea in texto.splitlines():
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue   # Última línea a medio escribir cuando se cortó la luz
+            if "uuid" in registro:
+                if not registro.get("centavos"):
+                    for item in registro["items"]:
+                        item["precio"] = a_centavos(item["precio"])
+                        item["costo"]  = a_centavos(item["costo"])
+                    registro["centavos"] = True
+                self._pendientes[registro["uuid"]] = registro
+            else:
+                self._pendientes.pop(
+                    registro.get("sincronizada") or registro.get("descartada"), None)
+        if texto and not texto.endswith("\n"):
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write("\n")   # Que la próxima venta empiece en su propia línea
+
+    def _escribir(self, registros):
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            for r in registros:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ── Hilo de la interfaz ───────────────────────────────
+    def anotar(self, items, fecha=None):
+        """Guarda la venta en el diario (durable al retornar). Retorna (uuid, total)."""
+        items = [{k: i[k] for k in ("id", "nombre", "precio", "costo", "cantidad")}
+                 for i in items]
+        if not items:
+            raise ValueError("La venta no tiene líneas.")
+        venta = {"uuid": uuid.uuid4().hex,
+                 "fecha": fecha or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 "items": items, "centavos": True}
+        with self._candado:
+            self._escribir([venta])
+            self._pendientes[venta["uuid"]] = venta
+        self._hay_trabajo.set()
+        return venta["uuid"], sum(i["precio"] * i["cantidad"] for i in items)
+
+    def pendientes(self):
+        return len(self._pendientes)
+
+    def unidades_pendientes(self):
+        """producto_id → unidades vendidas que todavía no están en la BD."""
+        with self._candado:
+            ventas = list(self._pendientes.values())
+        unidades = {}
+        for venta in ventas:
+            for item in venta["items"]:
+                unidades[item["id"]] = unidades.get(item["id"], 0) + item["cantidad"]
+        return unidades
+
+    def detalle_atascadas(self):
+        """[(uuid, fecha, total, error), ...] de las ventas que la BD rechazó."""
+        with self._candado:
+            return [(u, v["fecha"], sum(i["precio"] * i["cantidad"] for i in v["items"]),
+                     str(self.atascadas[u]))
+                    for u, v in self._pendientes.items() if u in self.atascadas]
+
+    def reintentar(self):
+        """Vuelve a enviar las atascadas (p. ej. tras dar de alta otra vez el producto)."""
+        with self._candado:
+            self.atascadas.clear()
+        self._hay_trabajo.set()
+
+    def descartar(self, uuid):
+        """
+        Quita del diario una venta atascada: deja de contar como pendiente y
+        de descontar stock en la caja. Queda copiada, con su error, en
+        ruta_descartadas. Retorna False si la venta ya no estaba atascada.
+        """
+        with self._candado:
+            if uuid not in self.atascadas:
+                return False
+            venta = self._pendientes.pop(uuid)
+            error = self.atascadas.pop(uuid)
+            with open(self.ruta_descartadas, "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(venta, error=str(error)), ensure_ascii=False) + "\n")
+            self._escribir([{"descartada": uuid}])
+            if not self._pendientes:
+                open(self.ruta, "w").close()
+        return True
+
+    def novedades(self):
+        """[(uuid, venta_id, faltantes), ...] sincronizadas desde la última llamada."""
+        hechas = []
+        while True:
+            try:
+                hechas.append(self._novedades.get_nowait())
+            except queue.Empty:
+                return hechas
+
+    # ── Sincronización ────────────────────────────────────
+    def sincronizar(self):
+        """Pasa a la BD las pendientes, en lotes. Retorna cuántas se guardaron.
+        Lanza el error de la BD (o de conexión) si un lote no se pudo guardar."""
+        guardadas, lote_max = 0, LOTE_MAX
+        while True:
+            with self._candado:
+                lote = [v for u, v in self._pendientes.items()
+                        if u not in self.atascadas][:lote_max]
+            if not lote:
+                return guardadas
+            try:
+                resultados = self._registrar_lote(
+                    [(v["uuid"], v["items"], v["fecha"]) for v in lote])
+            except (sqlite3.IntegrityError, ValueError) as e:
+                if len(lote) > 1:
+                    lote_max = 1   # Probar de una en una para aislar la que falla
+                else:
+                    # P. ej. se eliminó un producto de la venta: se aparta para no
+                    # detener a las demás, pero sigue en el archivo
+                    with self._candado:
+                        self.atascadas[lote[0]["uuid"]] = e
+                continue
+            with self._candado:
+                self._escribir([{"sincronizada": v["uuid"], "venta_id": venta_id}
+                                for v, (venta_id, _) in zip(lote, resultados)])
+                for v in lote:
+                    self._pendientes.pop(v["uuid"], None)
+                if not self._pendientes:
+                    # Todo está en la BD: el diario vuelve a empezar vacío
+                    open(self.ruta, "w").close()
+            for v, (venta_id, faltantes) in zip(lote, resultados):
+                self._novedades.put((v["uuid"], venta_id, faltantes))
+            guardadas += len(lote)
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._trabajar, name="diario", daemon=True)
+        self._hilo.start()
+        if self._pendientes:
+            self._hay_trabajo.set()
+
+    def detener(self, espera=5):
+        """Al cerrar el programa: un último intento de sincronizar. Lo que no
+        alcance a guardarse queda en el archivo para la próxima sesión."""
+        self._detener.set()
+        self._hay_trabajo.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+
+    def _trabajar(self):
+        while True:
+            self._hay_trabajo.wait(INTERVALO)
+            self._hay_trabajo.clear()
+            try:
+                self.sincronizar()
+                self.ultimo_error = None
+            except (sqlite3.Error, ConnectionError) as e:
+                self.ultimo_error = e   # BD bloqueada o servidor caído: reintentar luego
+            except Exception as e:
+                # Nada debe terminar este hilo: las ventas pendientes se quedarían
+                # sin llegar a la BD sin que la caja lo note
+                if repr(e) != repr(self.ultimo_error):   # Anotar cada error una vez
+                    print("[diario] Error al sincronizar; se reintentará:", file=sys.stderr)
+                    traceback.print_exc()
+                self.ultimo_error = e
+            if self._detener.is_set():
+                return
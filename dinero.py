@@ -0,0 +1,55 @@
+"""
+=============================================================
+  DINERO  —  Montos en centavos enteros
+  Precios, costos, totales y ganancias se guardan y se suman
+  como enteros (1850 = $18.50): la suma de un año de ventas
+  da exactamente lo mismo que sumar ticket por ticket, sin
+  el error de redondeo de los float. Solo se convierte a
+  texto al mostrar o exportar, y de texto al capturar.
+=============================================================
+"""
+
+import decimal
+
+
+def limpiar_numero(texto):
+    """'$1,250.50' → '1250.50', '12,50' → '12.50' (coma decimal), ' 7 ' → '7'."""
+    texto = str(texto).strip().replace("$", "").replace(" ", "")
+    if "," in texto and "." not in texto:
+        return texto.replace(",", ".")   # 12,50 (decimal con coma)
+    return texto.replace(",", "")        # 1,250.00 (separador de miles)
+
+def a_centavos(valor):
+    """
+    Monto capturado o leído de un archivo → centavos (int). Acepta texto
+    ('18.5', '$1,250.00', '12,50') o números. Se redondea al centavo
+    (mitades hacia arriba). Lanza ValueError si no es un monto.
+    """
+    if isinstance(valor, bool):
+        raise ValueError(f"No es un monto: {valor!r}")
+    try:
+        # Decimal desde el texto, no desde el float: 0.29 es 29 centavos, no 28.999…
+        monto = decimal.Decimal(limpiar_numero(valor) if isinstance(valor, str)
+                                else repr(valor) if isinstance(valor, float) else valor)
+        centavos = (monto * 100).quantize(decimal.Decimal(1), decimal.ROUND_HALF_UP)
+    except (decimal.InvalidOperation, TypeError):
+        raise ValueError(f"No es un monto: {valor!r}")
+    if not centavos.is_finite():
+        raise ValueError(f"No es un monto: {valor!r}")
+    return int(centavos)
+
+def texto(centavos):
+    """1850 → '18.50', sin signo de pesos: para archivos y campos de captura."""
+    signo = "-" if centavos < 0 else ""
+    pesos, resto = divmod(abs(centavos), 100)
+    return f"{signo}{pesos}.{resto:02d}"
+
+def formato(centavos, miles=False):
+    """1850 → '$18.50'; con miles=True, 125000 → '$1,250.00'. Para la pantalla."""
+    signo = "-" if centavos < 0 else ""
+    pesos, resto = divmod(abs(centavos), 100)
+    return f"{signo}${pesos:,}.{resto:02d}" if miles else f"{signo}${pesos}.{resto:02d}"
+
+def a_decimal(centavos):
+    """1850 → Decimal('18.50'), exacto (p. ej. para columnas decimales de Parquet)."""
+    return decimal.Decimal(centavos).scaleb(-2)
@@ -0,0 +1,171 @@
+"""
+=============================================================
+  EXPORTACIÓN DE VENTAS  —  Para contabilidad, sin interfaz
+  Ejecutar:  python exportacion.py 2025 ventas_2025.csv
+             python exportacion.py 2025-03 marzo.csv.gz
+             python exportacion.py --desde 2025-01-01 --hasta 2025-07-01 s1.parquet
+  Escribe dos archivos: <nombre>_ventas.<ext> (una fila por venta)
+  y <nombre>_detalle.<ext> (una fila por línea vendida).
+=============================================================
+
+Formatos según la extensión:
+  .csv       texto, separado por comas (abre en Excel)
+  .csv.gz    el mismo CSV comprimido: ~5 veces más chico
+  .parquet   columnar, para herramientas de análisis; requiere
+             'pip install pyarrow' (opcional, el resto no lo necesita)
+
+Los montos se escriben en pesos con dos decimales exactos (en la BD están en
+centavos enteros, ver dinero.py); en Parquet como decimal(18, 2).
+
+Con --archivadas se incluyen las ventas de los años archivados (ver
+respaldo.py), leídas de archivo/ventas_<año>.db antes que las de la BD principal.
+
+La BD se lee por partes (fetchmany, ver repositorio.iterar_consulta) y cada
+parte se escribe antes de leer la siguiente: exportar un año completo usa
+la misma memoria que exportar un día.
+"""
+
+import argparse, csv, gzip, os, time
+
+import repositorio
+from dinero import a_decimal, texto
+
+try:
+    import pyarrow, pyarrow.parquet
+except ImportError:   # Parquet es opcional
+    pyarrow = None
+
+FILAS_POR_GRUPO = 50000   # filas por grupo de Parquet (cuánto se junta en memoria)
+
+# Tipos de cada columna para Parquet
+_TIPOS = {"id": "int64", "venta_id": "int64", "producto_id": "int64", "cantidad": "int64",
+          "uuid": "string", "fecha": "string", "nombre": "string",
+          "total": "decimal", "precio": "decimal", "costo": "decimal",
+          "subtotal": "decimal", "ganancia": "decimal"}
+
+
+# ──────────────────────────────────────────────────────────
+#  ESCRITORES
+# ──────────────────────────────────────────────────────────
+def _formato(ruta):
+    ruta = ruta.lower()
+    for extension in (".csv.gz", ".csv", ".parquet"):
+        if ruta.endswith(extension):
+            return extension
+    raise ValueError(f"Formato no reconocido: {ruta} (usa .csv, .csv.gz o .parquet)")
+
+def escribir_csv(ruta, columnas, filas, comprimir=False):
+    """Retorna cuántas filas escribió."""
+    abrir = gzip.open if comprimir else open
+    n = 0
+    with abrir(ruta, "wt", encoding="utf-8-sig", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(columnas)
+        for fila in filas:
+            escritor.writerow(fila)
+            n += 1
+    return n
+
+def escribir_parquet(ruta, columnas, filas):
+    """Escribe de a FILAS_POR_GRUPO filas (un grupo de Parquet cada vez)."""
+    if pyarrow is None:
+        raise RuntimeError("Para exportar a Parquet instala pyarrow: pip install pyarrow")
+    esquema = pyarrow.schema([
+        (c, pyarrow.decimal128(18, 2) if _TIPOS[c] == "decimal" else getattr(pyarrow, _TIPOS[c])())
+        for c in columnas])
+    n = 0
+    with pyarrow.parquet.ParquetWriter(ruta, esquema, compression="zstd") as escritor:
+        grupo = []
+        for fila in filas:
+            grupo.append(fila)
+            if len(grupo) == FILAS_POR_GRUPO:
+                escritor.write_table(_tabla(grupo, esquema))
+                n += len(grupo)
+                grupo = []
+        if grupo or not n:
+            escritor.write_table(_tabla(grupo, esquema))
+            n += len(grupo)
+    return n
+
+def _tabla(grupo, esquema):
+    columnas = list(zip(*grupo)) if grupo else [[] for _ in esquema]
+    return pyarrow.Table.from_arrays(
+        [pyarrow.array(col, type=campo.type) for col, campo in zip(columnas, esquema)],
+        schema=esquema)
+
+def _en_pesos(columnas, filas, convertir):
+    """Pasa las columnas de montos de centavos a pesos con 'convertir'."""
+    montos = [i for i, c in enumerate(columnas) if _TIPOS[c] == "decimal"]
+    for fila in filas:
+        fila = list(fila)
+        for i in montos:
+            fila[i] = convertir(fila[i])
+        yield fila
+
+def _escribir(ruta, columnas, filas):
+    formato = _formato(ruta)
+    if formato == ".parquet":
+        return escribir_parquet(ruta, columnas, _en_pesos(columnas, filas, a_decimal))
+    return escribir_csv(ruta, columnas, _en_pesos(columnas, filas, texto),
+                        comprimir=(formato == ".csv.gz"))
+
+
+# ──────────────────────────────────────────────────────────
+#  EXPORTAR
+# ──────────────────────────────────────────────────────────
+def rutas_de_salida(ruta):
+    """'s1.csv.gz' → ('s1_ventas.csv.gz', 's1_detalle.csv.gz')."""
+    formato = _formato(ruta)
+    base = ruta[:-len(formato)]
+    return f"{base}_ventas{formato}", f"{base}_detalle{formato}"
+
+def exportar_ventas(ruta, desde=None, hasta=None, archivadas=False):
+    """
+    Exporta ventas y detalle del rango [desde, hasta) (ver
+    repositorio.rango_de_fechas). Retorna (ventas, lineas) escritas.
+    archivadas=True incluye las de los años archivados.
+    """
+    ruta_ventas, ruta_detalle = rutas_de_salida(ruta)
+    ventas = _escribir(ruta_ventas, repositorio.COLUMNAS_VENTA,
+                       repositorio.iterar_ventas(desde, hasta, archivadas=archivadas))
+    lineas = _escribir(ruta_detalle, repositorio.COLUMNAS_DETALLE,
+                       repositorio.iterar_detalle(desde, hasta, archivadas=archivadas))
+    return ventas, lineas
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportar ventas para contabilidad")
+    parser.add_argument("periodo", nargs="?", default=None,
+                        help="YYYY, YYYY-MM o YYYY-MM-DD (por defecto, todas las ventas)")
+    parser.add_argument("archivo", help="salida: .csv, .csv.gz o .parquet")
+    parser.add_argument("--desde", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--hasta", help="YYYY-MM-DD, sin incluir")
+    parser.add_argument("--archivadas", action="store_true",
+                        help="incluir las ventas de los años archivados (ver respaldo.py)")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    args = parser.parse_args()
+
+    try:
+        if _formato(args.archivo) == ".parquet" and pyarrow is None:
+            parser.error("Para exportar a Parquet instala pyarrow: pip install pyarrow")
+    except ValueError as e:
+        parser.error(str(e))
+    desde, hasta = args.desde, args.hasta
+    if args.periodo:
+        rango = repositorio.rango_de_fechas(args.periodo)
+        if rango is None:
+            parser.error(f"Periodo no válido: {args.periodo}")
+        desde, hasta = rango
+    if args.db:
+        repositorio.DB_FILE = os.path.abspath(args.db)
+    if not os.path.exists(repositorio.DB_FILE):
+        parser.error(f"No existe {repositorio.DB_FILE}")
+    repositorio.init_db()
+
+    t0 = time.perf_counter()
+    ventas, lineas = exportar_ventas(args.archivo, desde, hasta, args.archivadas)
+    print(f"{ventas} ventas y {lineas} líneas en {time.perf_counter() - t0:.1f} s:")
+    for ruta in rutas_de_salida(args.archivo):
+        print(f"  {ruta}  ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+    repositorio.cerrar_conexiones()
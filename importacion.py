@@ -0,0 +1,283 @@
+"""
+=============================================================
+  IMPORTACIÓN / EXPORTACIÓN DE PRODUCTOS  —  CSV, JSON, JSONL
+  Ejecutar:  python importacion.py importar lista_proveedor.csv
+             python importacion.py exportar catalogo.csv
+  Lee y escribe por partes: un archivo de 100 000 productos no
+  se carga completo en memoria.
+=============================================================
+
+Columnas (encabezado del CSV o llaves de cada objeto JSON):
+  codigo (obligatoria), nombre, costo, precio, stock, categoria
+Se aceptan mayúsculas y acentos ("Código", "Categoría"). costo y precio van en
+pesos ("18.50", "$1,250.00" o "12,50"); se guardan en centavos. Solo se modifican
+las columnas que trae el archivo: una lista de precios con codigo y precio
+actualiza los precios sin tocar stock ni nombre. Para dar de alta productos
+nuevos el archivo debe traer al menos codigo y nombre (lo que falte queda en 0).
+
+Las filas con errores no detienen la importación: se anotan en
+<archivo>_rechazados.csv con el número de línea y el motivo.
+"""
+
+import argparse, csv, json, os, re
+
+import repositorio
+from busqueda import normalizar
+from dinero import a_centavos, limpiar_numero, texto
+
+LOTE = 5000   # filas por transacción
+
+ALIAS = {"precio venta": "precio", "precio_venta": "precio", "existencia": "stock",
+         "existencias": "stock"}
+
+
+# ──────────────────────────────────────────────────────────
+#  LECTURA POR PARTES
+# ──────────────────────────────────────────────────────────
+def _leer_csv(f):
+    """(número de línea, dict) por fila. Detecta ';' (Excel en español) o ','."""
+    muestra = f.readline()
+    delimitador = ";" if muestra.count(";") > muestra.count(",") else ","
+    f.seek(0)
+    lector = csv.DictReader(f, delimiter=delimitador)
+    for registro in lector:
+        yield lector.line_num, registro
+
+def _leer_jsonl(f):
+    for n, linea in enumerate(f, 1):
+        if linea.strip():
+            try:
+                yield n, json.loads(linea)
+            except ValueError as e:
+                yield n, ValueError(f"JSON inválido: {e}", linea.rstrip("\n"))
+
+_ESPACIO = re.compile(r"[\s,]*")
+
+def _leer_json(f, trozo=1 << 16):
+    """Arreglo JSON [{...}, {...}] leído de a 'trozo' caracteres: cada objeto se
+    decodifica en cuanto está completo, sin cargar el arreglo entero."""
+    decodificador = json.JSONDecoder()
+    buf, pos, n, fin = f.read(trozo), 0, 0, False
+    pos = _ESPACIO.match(buf, pos).end()
+    if buf[pos:pos + 1] == "[":
+        pos += 1
+    while True:
+        pos = _ESPACIO.match(buf, pos).end()
+        if buf[pos:pos + 1] == "]":
+            return
+        try:
+            if pos == len(buf):
+                raise ValueError("faltan datos")
+            objeto, pos = decodificador.raw_decode(buf, pos)
+        except ValueError:
+            if fin:
+                if pos < len(buf):
+                    raise ValueError(f"JSON inválido después del registro {n}")
+                return
+            mas = f.read(trozo)
+            fin = not mas
+            buf, pos = buf[pos:] + mas, 0
+            continue
+        n += 1
+        yield n, objeto
+
+def leer_registros(ruta):
+    """(número de línea o registro, dict) según la extensión: .csv, .json o .jsonl."""
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, encoding="utf-8-sig", newline="") as f:
+        if extension == ".csv":
+            yield from _leer_csv(f)
+        elif extension in (".jsonl", ".ndjson"):
+            yield from _leer_jsonl(f)
+        elif extension == ".json":
+            yield from _leer_json(f)
+        else:
+            raise ValueError(f"Formato no reconocido: {extension} (usa .csv, .json o .jsonl)")
+
+
+# ──────────────────────────────────────────────────────────
+#  VALIDACIÓN
+# ──────────────────────────────────────────────────────────
+def _columna(nombre):
+    nombre = normalizar(str(nombre).strip())
+    return ALIAS.get(nombre, nombre)
+
+def _entero(dato):
+    if isinstance(dato, (int, float)) and not isinstance(dato, bool):
+        valor = dato
+    else:
+        valor = float(limpiar_numero(dato))
+    if valor != int(valor):
+        raise ValueError
+    return int(valor)
+
+def validar(registro, columnas):
+    """dict del archivo → tupla en el orden de 'columnas'. Lanza ValueError con el motivo."""
+    datos = {_columna(k): v for k, v in registro.items() if k is not None}
+    fila = []
+    for col in columnas:
+        valor = datos.get(col)
+        valor = "" if valor is None else valor
+        if col in ("codigo", "nombre", "categoria"):
+            valor = str(valor).strip()
+            if not valor and col != "categoria":
+                raise ValueError(f"{col} vacío")
+            fila.append(valor or "General")
+            continue
+        if valor == "":
+            raise ValueError(f"{col} vacío")
+        try:
+            numero = _entero(valor) if col == "stock" else a_centavos(valor)
+        except (ValueError, OverflowError):
+            raise ValueError(f"{col} no es {'un entero' if col == 'stock' else 'un número'}: {valor!r}")
+        if numero < 0 and col != "stock":
+            raise ValueError(f"{col} negativo: {valor}")
+        if abs(numero) > repositorio.ENTERO_MAX:   # SQLite no lo guardaría
+            raise ValueError(f"{col} demasiado grande: {valor!r}")
+        fila.append(numero)
+    return tuple(fila)
+
+
+# ──────────────────────────────────────────────────────────
+#  IMPORTAR
+# ──────────────────────────────────────────────────────────
+def importar_productos(ruta, repo=repositorio, lote=LOTE, al_avanzar=None):
+    """
+    Importa un archivo de productos: inserta los códigos nuevos y actualiza
+    los existentes, de a 'lote' filas por transacción.
+
+    repo:       repositorio o cliente (modo servidor).
+    al_avanzar: función opcional (leidas) que se llama después de cada lote.
+
+    Retorna un dict con leidas, insertadas, actualizadas, rechazadas y la
+    ruta del reporte de rechazadas (None si no hubo).
+    """
+    resumen = {"leidas": 0, "insertadas": 0, "actualizadas": 0, "rechazadas": 0,
+               "reporte": None}
+    base, _ = os.path.splitext(ruta)
+    ruta_reporte = f"{base}_rechazados.csv"
+    reporte = None
+    columnas = None
+    pendientes = {}   # codigo → (línea, fila); si un código se repite, gana la última
+
+    def rechazar(linea, motivo, registro):
+        nonlocal reporte
+        if reporte is None:
+            archivo = open(ruta_reporte, "w", encoding="utf-8-sig", newline="")
+            reporte = (archivo, csv.writer(archivo))
+            reporte[1].writerow(["linea", "motivo", "registro"])
+        reporte[1].writerow([linea, motivo,
+                             json.dumps(registro, ensure_ascii=False, default=str)])
+        resumen["rechazadas"] += 1
+
+    def guardar():
+        lineas = [l for l, _ in pendientes.values()]
+        filas  = [f for _, f in pendientes.values()]
+        insertadas, actualizadas, sin_alta = repo.upsert_productos(columnas, filas)
+        resumen["insertadas"]   += insertadas
+        resumen["actualizadas"] += actualizadas
+        for i in sin_alta:
+            rechazar(lineas[i], "código nuevo y el archivo no trae nombre",
+                     dict(zip(columnas, filas[i])))
+        pendientes.clear()
+        if al_avanzar:
+            al_avanzar(resumen["leidas"])
+
+    try:
+        for linea, registro in leer_registros(ruta):
+            resumen["leidas"] += 1
+            if isinstance(registro, Exception):   # Línea de JSONL ilegible
+                rechazar(linea, registro.args[0], registro.args[-1])
+                continue
+            if not isinstance(registro, dict):
+                rechazar(linea, "no es un objeto", registro)
+                continue
+            if columnas is None:
+                presentes = {_columna(k) for k in registro if k is not None}
+                if "codigo" not in presentes:
+                    raise ValueError("El archivo no tiene columna 'codigo'.")
+                columnas = [c for c in repositorio.COLUMNAS_PRODUCTO if c in presentes]
+            try:
+                fila = validar(registro, columnas)
+            except ValueError as e:
+                rechazar(linea, str(e), registro)
+                continue
+            pendientes[fila[0]] = (linea, fila)
+            if len(pendientes) >= lote:
+                guardar()
+        if pendientes:
+            guardar()
+    finally:
+        if reporte is not None:
+            reporte[0].close()
+            resumen["reporte"] = ruta_reporte
+    return resumen
+
+
+# ──────────────────────────────────────────────────────────
+#  EXPORTAR
+# ──────────────────────────────────────────────────────────
+def exportar_productos(ruta, filas=None):
+    """
+    Escribe los productos en .csv, .json o .jsonl según la extensión.
+    filas: iterable en el formato de listar_productos_admin(); por defecto
+           repositorio.iterar_productos() (se lee por partes de la BD).
+    Retorna cuántos productos se escribieron.
+    """
+    if filas is None:
+        filas = repositorio.iterar_productos()
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in (".csv", ".json", ".jsonl", ".ndjson"):
+        raise ValueError(f"Formato no reconocido: {extension} (usa .csv, .json o .jsonl)")
+    n = 0
+    with open(ruta, "w", encoding="utf-8-sig" if extension == ".csv" else "utf-8",
+              newline="") as f:
+        escritor = csv.writer(f) if extension == ".csv" else None
+        if escritor:
+            escritor.writerow(repositorio.COLUMNAS_PRODUCTO)
+        elif extension == ".json":
+            f.write("[\n")
+        for _, codigo, nombre, costo, precio, stock, categoria in filas:
+            # Montos en pesos, como se capturan (ver importar_productos)
+            if escritor:
+                escritor.writerow((codigo, nombre, texto(costo), texto(precio), stock, categoria))
+            else:
+                objeto = json.dumps(dict(zip(repositorio.COLUMNAS_PRODUCTO,
+                                             (codigo, nombre, costo / 100, precio / 100,
+                                              stock, categoria))),
+                                    ensure_ascii=False)
+                if extension == ".json":
+                    f.write((",\n" if n else "") + objeto)
+                else:
+                    f.write(objeto + "\n")
+            n += 1
+        if extension == ".json":
+            f.write("\n]\n")
+    return n
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importar / exportar productos")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("importar", help="insertar / actualizar productos desde un archivo")
+    p.add_argument("archivo")
+    p.add_argument("--lote", type=int, default=LOTE, help="filas por transacción")
+    p = sub.add_parser("exportar", help="escribir todos los productos a un archivo")
+    p.add_argument("archivo")
+    args = parser.parse_args()
+
+    if args.db:
+        repositorio.DB_FILE = os.path.abspath(args.db)
+    repositorio.init_db()
+    if args.comando == "importar":
+        r = importar_productos(args.archivo, lote=args.lote,
+                               al_avanzar=lambda n: print(f"  {n} filas leídas…", end="\r"))
+        print(f"Leídas {r['leidas']}: {r['insertadas']} nuevas, {r['actualizadas']}"
+              f" actualizadas, {r['rechazadas']} rechazadas")
+        if r["reporte"]:
+            print(f"Detalle de rechazadas: {r['reporte']}")
+    else:
+        print(f"{exportar_productos(args.archivo)} productos escritos en {args.archivo}")
+    repositorio.cerrar_conexiones()
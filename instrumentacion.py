@@ -0,0 +1,236 @@
+"""
+=============================================================
+  INSTRUMENTACIÓN  —  Tiempos de la BD y de la interfaz
+  Ejecutar:  POS_INSTRUMENTAR=1 python punto_de_venta.py
+             POS_INSTRUMENTAR=1 POS_CONSULTA_LENTA_MS=20 python servidor.py
+  Apagada no cuesta nada: sin la variable no se envuelve nada.
+=============================================================
+
+Con POS_INSTRUMENTAR=1 se mide:
+  sql:   cada sentencia que pasa por get_conn() (y las conexiones propias de
+         iterar_consulta), agrupadas por texto: "WHERE id IN (?,?,?)" y
+         "IN (?,?)" cuentan como la misma. El tiempo es el de execute(), que
+         en SQLite incluye preparar la sentencia y llegar a la primera fila
+         (un ORDER BY sin índice o un GROUP BY se calculan completos ahí).
+  bd:    cada función del repositorio que usa la interfaz (o del cliente en
+         modo servidor), con todo: consultas, fetchall y armar las tuplas.
+  ui:    los métodos de la ventana que refrescan pantallas (ver
+         punto_de_venta.METODOS_MEDIDOS).
+  hilo:  cada consulta del ProgramadorConsultas en el hilo de trabajo, por clave.
+
+De cada nombre se guarda cuántas veces se llamó, el tiempo total y el máximo,
+y un histograma por rangos (LIMITES_MS) del que salen p50/p95/p99 aproximados:
+memoria constante aunque la caja pase el día entero abierta.
+
+Las sentencias que tardan más de POS_CONSULTA_LENTA_MS (50 por defecto) se
+anotan en instrumentacion.log (POS_REGISTRO_INSTRUMENTACION para otra ruta)
+con sus parámetros y, la primera vez, su EXPLAIN QUERY PLAN. El resumen se
+escribe en el mismo archivo al salir y con F12 en la ventana.
+"""
+
+import atexit, bisect, contextlib, functools, logging, logging.handlers, os, re, \
+    sqlite3, sys, threading, time
+
+ACTIVA         = os.environ.get("POS_INSTRUMENTAR", "") == "1"
+UMBRAL_LENTA_S = float(os.environ.get("POS_CONSULTA_LENTA_MS", "50")) / 1000
+RUTA_REGISTRO  = os.environ.get("POS_REGISTRO_INSTRUMENTACION") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instrumentacion.log")
+
+# Rangos del histograma (ms): el último cuenta todo lo que pase de 3 s
+LIMITES_MS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000, 3000)
+
+# Funciones del repositorio / cliente que se miden (las que llama la interfaz)
+FUNCIONES_BD = (
+    "init_db", "hay_admin", "verificar_admin", "cambiar_admin", "listar_productos",
+    "listar_productos_admin", "version_productos", "cambios_productos",
+    "guardar_producto", "eliminar_producto", "upsert_productos",
+    "registrar_venta", "registrar_lote", "listar_ventas", "kpis_del_dia",
+    "detalle_de_venta", "eliminar_venta", "registrar_compra",
+    "top_productos", "mapa_horario", "margenes_por_categoria",
+)
+
+registro = logging.getLogger("pos.instrumentacion")
+
+
+# ──────────────────────────────────────────────────────────
+#  ESTADÍSTICAS
+# ──────────────────────────────────────────────────────────
+_lock  = threading.Lock()
+_datos = {}    # nombre → [veces, total_s, maximo_s, [conteo por rango]]
+
+def registrar(nombre, segundos):
+    """Suma una medición. Se puede llamar desde cualquier hilo."""
+    rango = bisect.bisect_left(LIMITES_MS, segundos * 1000)
+    with _lock:
+        d = _datos.get(nombre)
+        if d is None:
+            d = _datos[nombre] = [0, 0.0, 0.0, [0] * (len(LIMITES_MS) + 1)]
+        d[0] += 1
+        d[1] += segundos
+        d[2]  = max(d[2], segundos)
+        d[3][rango] += 1
+
+@contextlib.contextmanager
+def medir(nombre):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - t0)
+
+def cronometrar(funcion, nombre):
+    """funcion envuelta para registrar su duración con 'nombre'."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            registrar(nombre, time.perf_counter() - t0)
+    return envoltura
+
+def medir_atributos(objeto, nombres, prefijo):
+    """Reemplaza objeto.<nombre> (función de un módulo o método de una clase)
+    por su versión cronometrada. Los que no existan se ignoran."""
+    for nombre in nombres:
+        funcion = getattr(objeto, nombre, None)
+        if callable(funcion) and not hasattr(funcion, "__wrapped__"):
+            setattr(objeto, nombre, cronometrar(funcion, f"{prefijo}: {nombre}"))
+
+def reiniciar():
+    with _lock:
+        _datos.clear()
+
+def _percentil(conteos, veces, p):
+    """Límite superior del rango donde cae el percentil p (aproximado)."""
+    objetivo, acumulado = veces * p, 0
+    for i, n in enumerate(conteos):
+        acumulado += n
+        if acumulado >= objetivo:
+            return f"<{LIMITES_MS[i]:g}" if i < len(LIMITES_MS) else f">{LIMITES_MS[-1]:g}"
+    return "–"
+
+def resumen(limite=40, prefijo=""):
+    """Tabla de texto con lo medido (solo los nombres que empiezan con
+    'prefijo'), lo que más tiempo sumó primero."""
+    with _lock:
+        filas = [(nombre, d[0], d[1], d[2], list(d[3])) for nombre, d in _datos.items()
+                 if nombre.startswith(prefijo)]
+    filas.sort(key=lambda f: f[2], reverse=True)
+    lineas = [f"{'Medición':<58}{'veces':>7}{'total ms':>10}{'media':>8}"
+              f"{'p50':>7}{'p95':>7}{'p99':>7}{'máx':>8}"]
+    for nombre, veces, total, maximo, conteos in filas[:limite]:
+        nombre = nombre if len(nombre) <= 57 else nombre[:56] + "…"
+        lineas.append(f"{nombre:<58}{veces:>7}{total * 1000:>10.1f}"
+                      f"{total * 1000 / veces:>8.2f}"
+                      + "".join(f"{_percentil(conteos, veces, p):>7}" for p in (0.5, 0.95, 0.99))
+                      + f"{maximo * 1000:>8.1f}")
+    if len(filas) > limite:
+        lineas.append(f"… y {len(filas) - limite} más")
+    if not filas:
+        lineas.append("(nada medido todavía)")
+    return "\n".join(lineas)
+
+def volcar(motivo="resumen"):
+    """Escribe el resumen en el registro y lo retorna."""
+    texto = resumen()
+    registro.info("%s (ms; p50/p95/p99 por rango del histograma)\n%s", motivo.upper(), texto)
+    return texto
+
+
+# ──────────────────────────────────────────────────────────
+#  CONEXIÓN MEDIDA
+# ──────────────────────────────────────────────────────────
+_ESPACIOS   = re.compile(r"\s+")
+_MARCADORES = re.compile(r"\?(\s*,\s*\?)+")
+_CON_PLAN   = re.compile(r"(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_planes     = set()   # sentencias cuyo plan ya se anotó
+
+def _clave(sql):
+    """Texto de la sentencia en una línea; las listas '?,?,…' cuentan como una."""
+    return _MARCADORES.sub("?,…", _ESPACIOS.sub(" ", sql).strip())
+
+class ConexionMedida(sqlite3.Connection):
+    """sqlite3.Connection que mide execute/executemany/commit (ver
+    repositorio.FABRICA_CONEXION). Se usa solo con la instrumentación activa."""
+
+    def execute(self, sql, parametros=(), /):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._medida(sql, parametros, time.perf_counter() - t0)
+
+    def executemany(self, sql, parametros, /):
+        parametros = parametros if isinstance(parametros, (list, tuple)) else list(parametros)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            self._medida(sql, parametros, time.perf_counter() - t0, lote=True)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self._medida("COMMIT", (), time.perf_counter() - t0)
+
+    def _medida(self, sql, parametros, segundos, lote=False):
+        clave = _clave(sql)
+        registrar(f"sql: {clave}", segundos)
+        if segundos < UMBRAL_LENTA_S:
+            return
+        muestra = repr(parametros[:3] if lote else parametros)
+        if len(muestra) > 200:
+            muestra = muestra[:199] + "…"
+        detalle = f"{len(parametros)} filas, las primeras: {muestra}" if lote else muestra
+        mensaje = [f"LENTA {segundos * 1000:.1f} ms [{threading.current_thread().name}]",
+                   f"  {clave}", f"  parámetros: {detalle}"]
+        if clave not in _planes and not lote and _CON_PLAN.match(clave):
+            _planes.add(clave)
+            mensaje += [f"  plan: {linea}" for linea in self._plan(sql, parametros)]
+        registro.warning("\n".join(mensaje))
+
+    def _plan(self, sql, parametros):
+        # Sobre la misma conexión: ve las mismas tablas temporales y la misma
+        # transacción. EXPLAIN no ejecuta la sentencia, solo la prepara.
+        try:
+            filas = super().execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+        except sqlite3.Error as e:
+            return [f"(no disponible: {e})"]
+        # (id, padre, _, detalle): sangría según la profundidad en el árbol
+        nivel, lineas = {0: 0}, []
+        for id_, padre, _, detalle in filas:
+            nivel[id_] = nivel.get(padre, 0) + 1
+            lineas.append("  " * (nivel[id_] - 1) + detalle)
+        return lineas or ["(sin plan: no lee tablas)"]
+
+
+# ──────────────────────────────────────────────────────────
+#  ACTIVAR
+# ──────────────────────────────────────────────────────────
+def preparar_registro(registro, ruta):
+    """Archivo de registro rotativo: hasta 4 archivos de 5 MB (ruta, ruta.1, …)."""
+    if not registro.handlers:
+        manejador = logging.handlers.RotatingFileHandler(
+            ruta, maxBytes=5_000_000, backupCount=3, encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        registro.addHandler(manejador)
+        registro.setLevel(logging.INFO)
+        registro.propagate = False
+
+def activar(repo):
+    """
+    Mide las conexiones del repositorio y las funciones de FUNCIONES_BD de
+    'repo' (repositorio o cliente), abre el registro y deja programado el
+    resumen al salir. Llamarla antes de abrir la primera conexión.
+    """
+    preparar_registro(registro, RUTA_REGISTRO)
+    if hasattr(repo, "FABRICA_CONEXION"):
+        repo.FABRICA_CONEXION = ConexionMedida
+    medir_atributos(repo, FUNCIONES_BD, "bd")
+    registro.info("Instrumentación activa (pid %d, lentas desde %.0f ms)",
+                  os.getpid(), UMBRAL_LENTA_S * 1000)
+    atexit.register(lambda: print(f"\n{volcar('al salir')}\n(también en {RUTA_REGISTRO})",
+                                  file=sys.stderr))
@@ -0,0 +1,111 @@
+"""
+=============================================================
+  PROGRAMADOR DE CONSULTAS  —  Búsquedas sin congelar la UI
+  Agrupa las teclas (debounce), ejecuta la consulta en un hilo
+  de trabajo y entrega a tkinter solo el resultado más reciente.
+=============================================================
+"""
+
+import queue, threading, time
+
+
+class ProgramadorConsultas:
+    """
+    Cada consulta se identifica con una clave ("busqueda", "historial", ...).
+
+    programar(clave, consulta, al_terminar, demora_ms):
+      - Si llega otra petición con la misma clave antes de que pase la demora,
+        la anterior se cancela: escribir "refresco" lanza UNA consulta, no ocho.
+      - consulta() corre en un hilo de trabajo y NO debe tocar widgets.
+      - al_terminar(resultado) corre en el hilo de tkinter (vía after()), y solo
+        si nadie pidió una consulta más nueva con la misma clave mientras tanto.
+
+    tkinter no es seguro entre hilos: el hilo de trabajo solo deja resultados en
+    una cola, y el hilo principal la revisa con after() mientras haya trabajo.
+
+    al_medir: función opcional (nombre, segundos) que recibe cuánto tardó cada
+    consulta en el hilo de trabajo y cada al_terminar (ver instrumentacion.py).
+
+    Un programador tiene UN hilo: las consultas corren de a una. Los trabajos
+    largos (importar, exportar, reportes) van en otro programador, para que
+    no hagan esperar a la búsqueda de la caja.
+    """
+
+    INTERVALO_MS = 15   # cada cuánto revisar la cola de resultados
+
+    def __init__(self, widget, nombre="consultas"):
+        self.widget      = widget
+        self._generacion = {}    # clave → número de la petición más reciente
+        self._esperando  = {}    # clave → id de after() aún no disparado
+        self._trabajos   = queue.Queue()
+        self._resultados = queue.Queue()
+        self._en_vuelo   = 0
+        self._sondeando  = False
+        self.al_medir    = None
+        threading.Thread(target=self._trabajar, name=nombre, daemon=True).start()
+
+    def programar(self, clave, consulta, al_terminar, demora_ms=0):
+        gen = self._generacion.get(clave, 0) + 1
+        self._generacion[clave] = gen
+        anterior = self._esperando.pop(clave, None)
+        if anterior is not None:
+            self.widget.after_cancel(anterior)
+        self._esperando[clave] = self.widget.after(
+            demora_ms, lambda: self._lanzar(clave, gen, consulta, al_terminar))
+
+    def cancelar(self, clave):
+        """Descarta lo pendiente para esa clave (p. ej. antes de resolverla en línea)."""
+        self._generacion[clave] = self._generacion.get(clave, 0) + 1
+        anterior = self._esperando.pop(clave, None)
+        if anterior is not None:
+            self.widget.after_cancel(anterior)
+
+    def _vigente(self, clave, gen):
+        return self._generacion.get(clave) == gen
+
+    def _lanzar(self, clave, gen, consulta, al_terminar):
+        self._esperando.pop(clave, None)
+        self._en_vuelo += 1
+        self._trabajos.put((clave, gen, consulta, al_terminar))
+        if not self._sondeando:
+            self._sondeando = True
+            self.widget.after(self.INTERVALO_MS, self._sondear)
+
+    # ── Hilo de trabajo ───────────────────────────────────
+    def _trabajar(self):
+        while True:
+            clave, gen, consulta, al_terminar = self._trabajos.get()
+            if not self._vigente(clave, gen):
+                # Llegó una petición más nueva antes de empezar: ni siquiera ejecutar
+                self._resultados.put((clave, gen, None, None, None))
+                continue
+            t0 = time.perf_counter()
+            try:
+                self._resultados.put((clave, gen, consulta(), None, al_terminar))
+            except Exception as e:
+                self._resultados.put((clave, gen, None, e, al_terminar))
+            if self.al_medir:
+                self.al_medir(f"hilo: {clave}", time.perf_counter() - t0)
+
+    # ── Hilo de tkinter ───────────────────────────────────
+    def _sondear(self):
+        while True:
+            try:
+                clave, gen, resultado, error, al_terminar = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._en_vuelo -= 1
+            if al_terminar is None or not self._vigente(clave, gen):
+                continue   # Resultado viejo: ya hay otro más reciente en camino
+            if error is not None:
+                self.widget.report_callback_exception(type(error), error, error.__traceback__)
+            elif self.al_medir:
+                t0 = time.perf_counter()
+                al_terminar(resultado)
+                self.al_medir(f"ui: {clave} (mostrar)", time.perf_counter() - t0)
+            else:
+                al_terminar(resultado)
+        if self._en_vuelo > 0:
+            self.widget.after(self.INTERVALO_MS, self._sondear)
+        else:
+            self._sondeando = False
@@ -2,101 +2,34 @@
 =============================================================
   PUNTO DE VENTA  —  Sistema local con SQLite
   Ejecutar:  python punto_de_venta.py
+  Como caja de un servidor (ver servidor.py):
+             POS_SERVIDOR=http://IP:8765 python punto_de_venta.py
 =============================================================
 """
 
-import tkinter as tk
-from tkinter import ttk, messagebox, font as tkfont
-import sqlite3, os, datetime, hashlib
-
-# ──────────────────────────────────────────────────────────
-#  BASE DE DATOS
-# ──────────────────────────────────────────────────────────
-DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ventas.db")
-
-def get_conn():
-    return sqlite3.connect(DB_FILE)
-
-def _hash(texto):
-    """Devuelve el SHA-256 hexadecimal de un texto. Único punto de hashing en todo el sistema."""
-    return hashlib.sha256(texto.encode()).hexdigest()
-
-def get_admin_hash():
-    """Lee el hash de contraseña guardado en BD. Retorna None si aún no se ha creado."""
-    with get_conn() as conn:
-        row = conn.execute(
-            "SELECT valor FROM configuracion WHERE clave = 'admin_hash'"
-        ).fetchone()
-    return row[0] if row else None
-
-def set_admin_hash(nuevo_hash):
-    """Guarda o actualiza el hash en BD (INSERT OR REPLACE)."""
-    with get_conn() as conn:
-        conn.execute(
-            "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('admin_hash', ?)",
-            (nuevo_hash,)
-        )
+import time
+_INICIO = time.perf_counter()   # Para el reporte de arranque (POS_TIEMPOS_ARRANQUE=1)
 
-def init_db():
-    with get_conn() as conn:
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS configuracion (
-                clave  TEXT PRIMARY KEY,
-                valor  TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS productos (
-                id        INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo    TEXT    UNIQUE NOT NULL,
-                nombre    TEXT    NOT NULL,
-                precio    REAL    NOT NULL DEFAULT 0,
-                costo     REAL    NOT NULL DEFAULT 0,
-                stock     INTEGER NOT NULL DEFAULT 0,
-                categoria TEXT    DEFAULT 'General'
-            );
-
-            CREATE TABLE IF NOT EXISTS ventas (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha      TEXT    NOT NULL,
-                total      REAL    NOT NULL DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS detalle_venta (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                venta_id    INTEGER NOT NULL,
-                producto_id INTEGER NOT NULL,
-                nombre      TEXT    NOT NULL,
-                precio      REAL    NOT NULL,
-                costo       REAL    NOT NULL DEFAULT 0,
-                cantidad    INTEGER NOT NULL,
-                subtotal    REAL    NOT NULL,
-                ganancia    REAL    NOT NULL DEFAULT 0,
-                FOREIGN KEY (venta_id)    REFERENCES ventas(id),
-                FOREIGN KEY (producto_id) REFERENCES productos(id)
-            );
-        """)
-        # Migración: agregar columnas a BD existente sin perder datos
-        for sql in [
-            "ALTER TABLE productos ADD COLUMN costo REAL NOT NULL DEFAULT 0",
-            "ALTER TABLE detalle_venta ADD COLUMN costo REAL NOT NULL DEFAULT 0",
-            "ALTER TABLE detalle_venta ADD COLUMN ganancia REAL NOT NULL DEFAULT 0",
-        ]:
-            try:
-                conn.execute(sql)
-            except Exception:
-                pass  # La columna ya existe — ignorar
-        cur = conn.execute("SELECT COUNT(*) FROM productos")
-        if cur.fetchone()[0] == 0:
-            conn.executemany(
-                "INSERT INTO productos (codigo,nombre,precio,costo,stock,categoria) VALUES (?,?,?,?,?,?)",
-                [
-                    ("P001", "Refresco 600ml",  18.0, 12.0, 50, "Bebidas"),
-                    ("P002", "Agua 500ml",       10.0,  6.0, 80, "Bebidas"),
-                    ("P003", "Papas fritas",     15.0,  9.0, 30, "Botanas"),
-                    ("P004", "Galletas",         12.0,  7.0, 40, "Botanas"),
-                    ("P005", "Café americano",   25.0, 14.0, 20, "Cafetería"),
-                ]
-            )
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog, simpledialog, font as tkfont
+import os, sqlite3
+
+if os.environ.get("POS_SERVIDOR"):
+    import cliente as repo       # Caja ligera: la BD la maneja servidor.py
+else:
+    import repositorio as repo
+from busqueda import IndiceProductos
+from tabla_virtual import TablaVirtual
+from programador import ProgramadorConsultas
+from carrito import Carrito
+from diario import DiarioVentas
+from catalogo import Catalogo
+from importacion import importar_productos, exportar_productos
+from compras import recibir_archivo
+from reportes import informe
+from dinero import a_centavos, formato
+from respaldo import RespaldoAutomatico
+import instrumentacion, vigia
 
 # ──────────────────────────────────────────────────────────
 #  COLORES Y ESTILO
@@ -117,20 +50,88 @@ C = {
     "hover":     "#2d3250",
 }
 
+# Espera (ms) tras la última tecla antes de consultar, para no buscar letra por letra
+DEMORA_BUSQUEDA = 120    # búsqueda de la pantalla de ventas (en memoria)
+DEMORA_FILTROS  = 250    # filtros de Productos e Historial (van a la BD)
+
+# Por defecto cada cobro es una transacción que verifica el stock en la BD
+# (WHERE stock >= cantidad): entre varias cajas, nunca se vende lo que no hay.
+# Con POS_COBRO_DIFERIDO=1 (ver diario.py) la venta se anota en un archivo local
+# y un hilo la guarda en la BD: la caja no espera a la BD, pero si otra caja
+# vendió lo mismo mientras tanto el stock queda negativo (se avisa al sincronizar).
+COBRO_DIFERIDO = os.environ.get("POS_COBRO_DIFERIDO", "") == "1"
+RUTA_DIARIO    = os.environ.get("POS_DIARIO") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "ventas_pendientes.jsonl")
+REVISAR_DIARIO = 1000    # ms entre revisiones de ventas ya sincronizadas
+REVISAR_CATALOGO = 3000  # ms entre consultas de productos cambiados (p. ej. por otras cajas)
+
+# Con POS_TIEMPOS_ARRANQUE=1 se imprime cuánto tardó cada etapa del arranque
+TIEMPOS_ARRANQUE = os.environ.get("POS_TIEMPOS_ARRANQUE", "") == "1"
+
+# Con POS_INSTRUMENTAR=1 (ver instrumentacion.py) se cronometran estos métodos,
+# además de cada sentencia SQL y cada consulta del hilo de trabajo. F12 muestra
+# el resumen. Los que pintan resultados de una consulta (_mostrar_busqueda,
+# _mostrar_historial, ...) ya se miden como "ui: <clave> (mostrar)".
+METODOS_MEDIDOS = (
+    "_show_page", "_refrescar_productos", "_filtrar_productos", "_agregar_producto",
+    "_on_carrito", "_cobrar_venta", "_revisar_diario", "_cargar_tabla_productos",
+    "_llenar_form_producto", "_guardar_producto", "_cargar_historial",
+    "_cargar_pagina_historial", "_ver_detalle_venta",
+)
+
 # ──────────────────────────────────────────────────────────
 #  APLICACIÓN PRINCIPAL
 # ──────────────────────────────────────────────────────────
 class PuntoDeVenta(tk.Tk):
     def __init__(self):
+        self.tiempos_arranque = []   # [(etapa, ms desde que arrancó el proceso)]
+        self._marcar("módulos")
         super().__init__()
-        init_db()
-        self.title("Punto de Venta")
+        # POS_VIGIA=1: anota en bloqueos.log qué deja la pantalla sin responder (vigia.py)
+        self.vigia = vigia.VigiaCiclo(self) if vigia.ACTIVO else None
+        if self.vigia:
+            self.vigia.iniciar()
+        repo.init_db()   # Por el módulo: instrumentacion.activar() la reemplaza
+        self._marcar("init_db")
+        self.title("Punto de Venta  —  cargando productos…")
         self.geometry("1200x750")
         self.minsize(900, 600)
         self.configure(bg=C["bg"])
-        self.carrito = []
+        self.carrito = Carrito()
+        self._consultas = ProgramadorConsultas(self)
+        # Importar, exportar, recibir y reportes tardan segundos: en su propio
+        # hilo, así la búsqueda y el catálogo de la caja no esperan detrás
+        self._tareas = ProgramadorConsultas(self, "tareas")
+        if instrumentacion.ACTIVA:
+            self._consultas.al_medir = instrumentacion.registrar
+            self._tareas.al_medir = instrumentacion.registrar
+            self.bind_all("<F12>", lambda e: self._mostrar_instrumentacion())
+        self.catalogo = Catalogo(repo)
+        self.diario = None
+        # Sin cobro diferido el diario solo se abre si quedaron ventas de cuando
+        # estaba activo: se terminan de enviar, pero los cobros nuevos van directo
+        if COBRO_DIFERIDO or os.path.exists(RUTA_DIARIO) and os.path.getsize(RUTA_DIARIO):
+            self.diario = DiarioVentas(RUTA_DIARIO, repo.registrar_lote)
+            self.diario.iniciar()
+            self._atascadas_avisadas = 0
+            self.bind_all("<F9>", lambda e: self._ver_atascadas())
+        self._marcar("diario")
+        # Con BD local, esta caja también respalda (respaldo.py); en modo servidor
+        # lo hace el servidor, dueño de la BD
+        self.respaldos = None if os.environ.get("POS_SERVIDOR") else RespaldoAutomatico()
+        if self.respaldos:
+            self.respaldos.iniciar()
+        # Primero la pantalla de ventas; el catálogo llega del hilo de consultas
+        # y Productos / Historial se construyen la primera vez que se abren
+        self._indice       = IndiceProductos([])
+        self._indice_listo = False
         self._build_ui()
-        self._cargar_productos()
+        self._marcar("interfaz")
+        self._refrescar_productos()
+        self.after_idle(lambda: self._marcar("primer cuadro"))
+        if self.diario:
+            self.after(REVISAR_DIARIO, self._revisar_diario)
+        self.after(REVISAR_CATALOGO, self._sondear_catalogo)
         # Verificar contraseña al arrancar — si no existe, forzar creación
         self.after(200, self._verificar_contrasena_inicial)
 
@@ -165,11 +166,12 @@ class PuntoDeVenta(tk.Tk):
 
         self.pages = {}
         self._build_page_ventas()
-        self._build_page_productos()
-        self._build_page_historial()
         self._show_ventas()
 
     def _show_page(self, name):
+        if name not in self.pages:
+            getattr(self, f"_build_page_{name}")()
+            self._marcar(f"página {name}")
         for p in self.pages.values():
             p.pack_forget()
         self.pages[name].pack(fill="both", expand=True)
@@ -180,8 +182,38 @@ class PuntoDeVenta(tk.Tk):
                      bg=C["card"] if k == labels[name] else C["panel"])
 
     def _show_ventas(self):    self._show_page("ventas")
-    def _show_productos(self): self._cargar_tabla_productos(); self._show_page("productos")
-    def _show_historial(self): self._cargar_historial(); self._show_page("historial")
+    def _show_productos(self): self._show_page("productos"); self._cargar_tabla_productos()
+    def _show_historial(self): self._show_page("historial"); self._cargar_historial()
+
+    def _pagina_visible(self, name):
+        return name in self.pages and self.pages[name].winfo_ismapped()
+
+    # ── Reporte de arranque ───────────────────────────────
+    def _marcar(self, etapa):
+        ms = (time.perf_counter() - _INICIO) * 1000
+        self.tiempos_arranque.append((etapa, ms))
+        if not TIEMPOS_ARRANQUE:
+            return
+        anterior = self.tiempos_arranque[-2][1] if len(self.tiempos_arranque) > 1 else 0
+        print(f"[arranque] {etapa:<18}{ms:8.0f} ms  (+{ms - anterior:.0f})", flush=True)
+
+    # ── Instrumentación (POS_INSTRUMENTAR=1, tecla F12) ───
+    def _mostrar_instrumentacion(self):
+        """Resumen de tiempos hasta ahora; también queda en instrumentacion.log."""
+        texto_resumen = instrumentacion.volcar("F12")
+        dlg = getattr(self, "_dlg_instrumentacion", None)
+        if dlg is None or not dlg.winfo_exists():
+            dlg = self._dlg_instrumentacion = tk.Toplevel(self)
+            dlg.title("⏱  Tiempos medidos  (F12 para actualizar)")
+            dlg.configure(bg=C["card"])
+            dlg.texto = tk.Text(dlg, bg=C["panel"], fg=C["text"], bd=0, padx=12, pady=12,
+                                font=("Courier", 9), width=112, height=36, wrap="none")
+            dlg.texto.pack(fill="both", expand=True)
+        dlg.texto.config(state="normal")
+        dlg.texto.delete("1.0", "end")
+        dlg.texto.insert("1.0", texto_resumen)
+        dlg.texto.config(state="disabled")
+        dlg.lift()
 
     # ══════════════════════════════════════════════════════
     #  PÁGINA: VENTAS
@@ -207,13 +239,13 @@ class PuntoDeVenta(tk.Tk):
                  font=("Courier", 14), padx=8).pack(side="left")
 
         self.sv_busqueda = tk.StringVar()
-        self.sv_busqueda.trace_add("write", lambda *a: self._filtrar_productos())
+        self.sv_busqueda.trace_add("write", lambda *a: self._busqueda_cambio())
         entry = tk.Entry(inner, textvariable=self.sv_busqueda,
                          bg=C["panel"], fg=C["text"], insertbackground=C["text"],
                          bd=0, font=("Courier", 12), highlightthickness=0)
         entry.pack(side="left", fill="x", expand=True, ipady=8)
         entry.focus()
-        entry.bind("<Return>", lambda e: self._agregar_primero_al_carrito())
+        entry.bind("<Return>", lambda e: self._enter_busqueda())
         entry.bind("<Down>", lambda e: self._focus_tabla())
 
         cols = ("codigo", "nombre", "precio", "stock")
@@ -243,11 +275,12 @@ class PuntoDeVenta(tk.Tk):
 
         sb = ttk.Scrollbar(frame_t, orient="vertical",
                            command=self.tabla_busq.yview)
-        self.tabla_busq.configure(yscrollcommand=sb.set)
         self.tabla_busq.pack(side="left", fill="both", expand=True)
         sb.pack(side="right", fill="y")
         self.tabla_busq.bind("<Double-1>", lambda e: self._agregar_seleccionado())
         self.tabla_busq.bind("<Return>", lambda e: self._agregar_seleccionado())
+        self.tabla_busq.tag_configure("low", foreground=C["yellow"])
+        self.vt_busq = TablaVirtual(self.tabla_busq, sb)
 
         btn_add = tk.Button(left, text="＋  Agregar al carrito  (↵ Enter)",
                             bg=C["accent"], fg=C["white"], bd=0,
@@ -287,6 +320,7 @@ class PuntoDeVenta(tk.Tk):
         self.lbl_total = tk.Label(total_frame, text="$0.00", fg=C["green"],
                                   bg=C["panel"], font=("Courier", 22, "bold"))
         self.lbl_total.pack(side="right")
+        self.carrito.suscribir(self._on_carrito)
 
         btn_quitar = tk.Button(right, text="✕  Quitar seleccionado",
                                bg=C["card"], fg=C["red"], bd=0,
@@ -310,132 +344,353 @@ class PuntoDeVenta(tk.Tk):
         btn_cobrar.pack(fill="x", pady=(8,0))
 
     # ── Lógica de búsqueda ────────────────────────────────
-    def _cargar_productos(self):
-        self._productos_cache = []
-        with get_conn() as conn:
-            rows = conn.execute(
-                "SELECT id,codigo,nombre,precio,costo,stock FROM productos ORDER BY nombre"
-            ).fetchall()
-        self._productos_cache = rows
+    def _refrescar_productos(self):
+        """Trae de la BD solo los productos que cambiaron (por una venta, una edición
+        u otra caja) y los aplica al índice de búsqueda y a la página Productos.
+        La primera vez lee el catálogo completo y arma el índice, todo en el hilo
+        de consultas: la ventana ya está en pantalla mientras tanto."""
+        def consulta():
+            self.catalogo.sincronizar()
+            if self._indice_listo:
+                return None
+            # Se decide aquí y no al programar: si un sondeo reemplaza a la
+            # primera carga, el sondeo arma el índice
+            filas = self.catalogo.filas_venta()
+            if self.diario:
+                filas = self._descontar_pendientes(filas)
+            return IndiceProductos(filas)
+        self._consultas.programar("catalogo", consulta, self._aplicar_cambios_catalogo)
+
+    def _aplicar_cambios_catalogo(self, indice=None):
+        if not self._indice_listo:
+            if indice is None:
+                return
+            self._indice, self._indice_listo = indice, True
+            self._filtrar_productos()
+            if self.diario:
+                self._mostrar_pendientes()
+            else:
+                self.title("Punto de Venta")
+            self._marcar("catálogo")
+            return
+        cambios = self.catalogo.tomar_cambios()
+        if not cambios:
+            return
+        filas = [Catalogo.a_venta(f) for f in cambios.values() if f is not None]
+        if self.diario:
+            filas = self._descontar_pendientes(filas)
+        for fila in filas:
+            self._indice.actualizar(fila)
+        for pid, fila in cambios.items():
+            if fila is None:
+                self._indice.eliminar(pid)
         self._filtrar_productos()
+        if self._pagina_visible("productos"):
+            self._cargar_tabla_productos()
 
-    def _filtrar_productos(self):
-        q = self.sv_busqueda.get().strip().lower()
-        for row in self.tabla_busq.get_children():
-            self.tabla_busq.delete(row)
-        for prod in self._productos_cache:
+    def _sondear_catalogo(self):
+        self._refrescar_productos()
+        self.after(REVISAR_CATALOGO, self._sondear_catalogo)
+
+    def _descontar_pendientes(self, filas):
+        """Las ventas diferidas aún no están en la BD: restarlas del stock leído."""
+        # Si una se sincroniza entre las dos lecturas se resta dos veces: la caja
+        # ve de menos (nunca de más) hasta la siguiente revisión del diario
+        pendientes = self.diario.unidades_pendientes()
+        if not pendientes:
+            return filas
+        return [(pid, codigo, nombre, precio, costo, stock - pendientes.get(pid, 0))
+                for pid, codigo, nombre, precio, costo, stock in filas]
+
+    def _filtrar_productos(self, demora_ms=0):
+        """Busca en un hilo de trabajo; la tabla se actualiza al llegar el resultado."""
+        q = self.sv_busqueda.get()
+        indice = self._indice
+        self._consultas.programar("busqueda", lambda: (q, indice.buscar(q)),
+                                  self._mostrar_busqueda, demora_ms)
+
+    def _mostrar_busqueda(self, resultado):
+        q, productos = resultado
+        filas = []
+        for prod in productos:
             pid, codigo, nombre, precio, costo, stock = prod
-            if q in codigo.lower() or q in nombre.lower():
-                tag = "low" if stock <= 5 else ""
-                self.tabla_busq.insert("", "end",
-                    values=(codigo, nombre, f"${precio:.2f}", stock),
-                    iid=str(pid), tags=(tag,))
-        self.tabla_busq.tag_configure("low", foreground=C["yellow"])
+            tag = "low" if stock <= 5 else ""
+            filas.append((str(pid), (codigo, nombre, formato(precio), stock), (tag,)))
+        self.vt_busq.cargar(filas)
+        self._busq_mostrada = q
+
+    def _busqueda_cambio(self):
+        if not getattr(self, "_silenciar_busqueda", False):
+            self._filtrar_productos(DEMORA_BUSQUEDA)
+
+    def _limpiar_busqueda(self):
+        """Vacía la caja de búsqueda después de agregar un producto al carrito."""
+        if getattr(self, "_busq_mostrada", None) == "":
+            # La tabla ya muestra el catálogo completo (lo normal entre escaneos):
+            # descartar la búsqueda de las teclas del código y no reconstruirla.
+            self._consultas.cancelar("busqueda")
+            self._silenciar_busqueda = True
+            try:
+                self.sv_busqueda.set("")
+            finally:
+                self._silenciar_busqueda = False
+        else:
+            self.sv_busqueda.set("")
+
+    def _enter_busqueda(self):
+        q = self.sv_busqueda.get()
+        # Camino rápido del lector de código de barras (código + Enter): búsqueda
+        # exacta O(1) por código y directo al carrito, sin filtrar ni redibujar
+        # la tabla de resultados.
+        prod = self._indice.por_codigo_exacto(q) if q.strip() else None
+        if prod:
+            self._agregar_producto(prod)
+            self._limpiar_busqueda()   # Aun si faltó stock: que el siguiente escaneo no se concatene
+            return
+        # Si el cajero presiona Enter antes de que termine la espera del debounce,
+        # resolver la búsqueda aquí mismo: nunca agregar un resultado de otra consulta.
+        q = self.sv_busqueda.get()
+        if getattr(self, "_busq_mostrada", None) != q:
+            self._consultas.cancelar("busqueda")
+            self._mostrar_busqueda((q, self._indice.buscar(q)))
+        self._agregar_primero_al_carrito()
 
     def _focus_tabla(self):
-        children = self.tabla_busq.get_children()
-        if children:
-            self.tabla_busq.selection_set(children[0])
-            self.tabla_busq.focus(children[0])
+        primera = self.vt_busq.primera()
+        if primera:
+            self.vt_busq.seleccionar(primera)
             self.tabla_busq.focus_set()
 
     def _agregar_primero_al_carrito(self):
-        children = self.tabla_busq.get_children()
-        if children:
-            self.tabla_busq.selection_set(children[0])
+        primera = self.vt_busq.primera()
+        if primera:
+            self.vt_busq.seleccionar(primera)
             self._agregar_seleccionado()
 
     def _agregar_seleccionado(self):
-        sel = self.tabla_busq.selection()
+        sel = self.vt_busq.seleccion()
         if not sel:
             self._agregar_primero_al_carrito()
             return
-        pid = int(sel[0])
-        prod = next((p for p in self._productos_cache if p[0] == pid), None)
-        if not prod:
-            return
+        prod = self._indice.fila(int(sel))
+        if prod and self._agregar_producto(prod):
+            self._limpiar_busqueda()
+
+    def _agregar_producto(self, prod):
+        """Suma una unidad del producto al carrito. Retorna False si no hay stock."""
         pid, codigo, nombre, precio, costo, stock = prod
         if stock <= 0:
             messagebox.showwarning("Sin stock",
                 f'"{nombre}" no tiene stock disponible.', parent=self)
-            return
-        for item in self.carrito:
-            if item["id"] == pid:
-                if item["cantidad"] >= stock:
-                    messagebox.showwarning("Stock insuficiente",
-                        f'Stock máximo: {stock}', parent=self)
-                    return
-                item["cantidad"] += 1
-                self._refresh_carrito()
-                self.sv_busqueda.set("")
-                return
-        self.carrito.append({"id": pid, "codigo": codigo, "nombre": nombre,
-                              "precio": precio, "costo": costo,
-                              "cantidad": 1, "stock": stock})
-        self._refresh_carrito()
-        self.sv_busqueda.set("")
+            return False
+        item = self.carrito.linea(pid)
+        if item and item["cantidad"] >= stock:
+            messagebox.showwarning("Stock insuficiente",
+                f'Stock máximo: {stock}', parent=self)
+            return False
+        self.carrito.agregar(prod)
+        return True
 
     # ── Carrito ───────────────────────────────────────────
-    def _refresh_carrito(self):
-        self.lista_carrito.delete(0, "end")
-        total = 0
-        for i, item in enumerate(self.carrito):
+    def _on_carrito(self, evento, i, item):
+        """Refleja en la Listbox solo la línea que cambió (ver carrito.Carrito)."""
+        if evento == "vaciado":
+            self.lista_carrito.delete(0, "end")
+        elif evento == "quitada":
+            self.lista_carrito.delete(i)
+            # Las filas de abajo subieron una posición: re-alternar sus colores
+            for j in range(i, self.lista_carrito.size()):
+                self._color_linea_carrito(j)
+        else:
             sub = item["precio"] * item["cantidad"]
-            total += sub
-            line = f"  {item['nombre'][:22]:<22}  x{item['cantidad']}  ${sub:.2f}"
-            self.lista_carrito.insert("end", line)
-            if i % 2 == 0:
-                self.lista_carrito.itemconfig(i, bg=C["card"])
+            line = f"  {item['nombre'][:22]:<22}  x{item['cantidad']}  {formato(sub)}"
+            if evento == "cambiada":
+                seleccionada = i in self.lista_carrito.curselection()
+                self.lista_carrito.delete(i)
+                self.lista_carrito.insert(i, line)
+                if seleccionada:
+                    self.lista_carrito.selection_set(i)
             else:
-                self.lista_carrito.itemconfig(i, bg=C["hover"])
-        self.lbl_total.config(text=f"${total:.2f}")
+                self.lista_carrito.insert("end", line)
+                self.lista_carrito.see(i)
+            self._color_linea_carrito(i)
+        self.lbl_total.config(text=formato(self.carrito.total))
+
+    def _color_linea_carrito(self, i):
+        self.lista_carrito.itemconfig(i, bg=C["card"] if i % 2 == 0 else C["hover"])
 
     def _quitar_del_carrito(self):
         sel = self.lista_carrito.curselection()
         if not sel:
             return
-        idx = sel[0]
-        self.carrito.pop(idx)
-        self._refresh_carrito()
+        self.carrito.quitar_en(sel[0])
 
     def _limpiar_carrito(self):
         if not self.carrito:
             return
         if messagebox.askyesno("Limpiar", "¿Vaciar el carrito?", parent=self):
-            self.carrito.clear()
-            self._refresh_carrito()
+            self.carrito.vaciar()
 
     def _cobrar_venta(self):
         if not self.carrito:
             messagebox.showinfo("Carrito vacío", "Agrega productos antes de cobrar.",
                                 parent=self)
             return
-        total = sum(i["precio"] * i["cantidad"] for i in self.carrito)
+        total = self.carrito.total
         confirm = messagebox.askyesno("Confirmar venta",
-            f"¿Registrar venta por ${total:.2f}?", parent=self)
+            f"¿Registrar venta por {formato(total)}?", parent=self)
         if not confirm:
             return
-        with get_conn() as conn:
-            fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cur = conn.execute("INSERT INTO ventas (fecha,total) VALUES (?,?)",
-                               (fecha, total))
-            venta_id = cur.lastrowid
-            for item in self.carrito:
-                sub      = item["precio"] * item["cantidad"]
-                ganancia = (item["precio"] - item["costo"]) * item["cantidad"]
-                conn.execute(
-                    "INSERT INTO detalle_venta"
-                    " (venta_id,producto_id,nombre,precio,costo,cantidad,subtotal,ganancia)"
-                    " VALUES (?,?,?,?,?,?,?,?)",
-                    (venta_id, item["id"], item["nombre"],
-                     item["precio"], item["costo"], item["cantidad"], sub, ganancia))
-                conn.execute("UPDATE productos SET stock = stock - ? WHERE id = ?",
-                             (item["cantidad"], item["id"]))
+        if COBRO_DIFERIDO:
+            self._cobrar_diferido()
+            return
+        try:
+            venta_id, total = repo.registrar_venta(self.carrito)
+        except repo.StockInsuficiente as e:
+            detalle = "\n".join(f"  • {nombre}: pides {pedido}, hay {disponible}"
+                                 for _, nombre, pedido, disponible in e.faltantes)
+            messagebox.showerror("Stock insuficiente",
+                "No se registró la venta; el stock cambió desde que se armó el carrito:\n\n"
+                f"{detalle}\n\nAjusta el carrito e intenta de nuevo.", parent=self)
+            self._refrescar_productos()   # Mostrar el stock real
+            return
+        except (sqlite3.OperationalError, ConnectionError) as e:
+            # BD ocupada tras los reintentos, o el servidor no responde: el carrito
+            # se conserva para volver a intentar
+            messagebox.showerror("No se pudo registrar la venta",
+                f"{e}\n\nEl carrito se conserva; intenta de nuevo.", parent=self)
+            return
         messagebox.showinfo("✔ Venta registrada",
-            f"Venta #{venta_id} guardada.\nTotal: ${total:.2f}", parent=self)
-        self.carrito.clear()
-        self._refresh_carrito()
-        self._cargar_productos()
+            f"Venta #{venta_id} guardada.\nTotal: {formato(total)}", parent=self)
+        self.carrito.vaciar()
+        self._refrescar_productos()
+
+    def _cobrar_diferido(self):
+        """
+        Anota la venta en el diario local (instantáneo, no espera a la BD) y
+        descuenta el stock en el índice de búsqueda para que la caja siga
+        viendo existencias correctas mientras el hilo sincroniza.
+        """
+        # El carrito se armó con el stock del índice; si otra venta diferida lo
+        # bajó desde entonces, revisar aquí (la BD lo sabrá hasta sincronizar)
+        faltantes = [(l["nombre"], l["cantidad"], fila[5]) for l in self.carrito
+                     for fila in [self._indice.fila(l["id"])]
+                     if fila is None or fila[5] < l["cantidad"]]
+        if faltantes:
+            detalle = "\n".join(f"  • {nombre}: pides {pedido}, hay {disponible}"
+                                 for nombre, pedido, disponible in faltantes)
+            messagebox.showerror("Stock insuficiente",
+                f"No se registró la venta:\n\n{detalle}\n\nAjusta el carrito e intenta de nuevo.",
+                parent=self)
+            return
+        try:
+            ticket, total = self.diario.anotar(self.carrito)
+        except OSError as e:
+            messagebox.showerror("No se pudo registrar la venta",
+                f"No se pudo escribir {self.diario.ruta}:\n{e}", parent=self)
+            return
+        for linea in self.carrito:
+            pid, codigo, nombre, precio, costo, stock = self._indice.fila(linea["id"])
+            self._indice.actualizar((pid, codigo, nombre, precio, costo,
+                                     stock - linea["cantidad"]))
+        messagebox.showinfo("✔ Venta registrada",
+            f"Venta {ticket[:8]} guardada.\nTotal: {formato(total)}", parent=self)
+        self.carrito.vaciar()
+        self._filtrar_productos()
+        self._mostrar_pendientes()
+
+    def _revisar_diario(self):
+        """Avisos de las ventas diferidas que ya llegaron a la BD."""
+        hechas = self.diario.novedades()
+        for ticket, venta_id, faltantes in hechas:
+            if faltantes:
+                # Otra caja vendió lo mismo mientras tanto: la venta ya se entregó,
+                # así que se guardó igual y el stock quedó negativo
+                detalle = "\n".join(f"  • {nombre}: se vendieron {pedido}, había {disponible}"
+                                     for _, nombre, pedido, disponible in faltantes)
+                messagebox.showwarning("Stock negativo",
+                    f"La venta #{venta_id} se guardó, pero dejó stock negativo:\n\n{detalle}"
+                    "\n\nRevisa el inventario.", parent=self)
+        if hechas:
+            self._refrescar_productos()   # Stock real, con lo que vendieron otras cajas
+            if self._pagina_visible("historial"):
+                self._cargar_historial()
+        # Ventas que la BD rechaza: avisar una vez por cada nueva, sin esperar a F9
+        atascadas = len(self.diario.atascadas)
+        if atascadas > self._atascadas_avisadas:
+            self._ver_atascadas()
+        self._atascadas_avisadas = atascadas
+        self._mostrar_pendientes()
+        self.after(REVISAR_DIARIO, self._revisar_diario)
+
+    def _mostrar_pendientes(self):
+        n = self.diario.pendientes()
+        titulo = "Punto de Venta"
+        if not self._indice_listo:
+            titulo += "  —  cargando productos…"
+        elif n:
+            titulo += f"  —  {n} venta{'s' if n != 1 else ''} por sincronizar"
+            if self.diario.atascadas:
+                titulo += f", {len(self.diario.atascadas)} con error (F9)"
+            elif self.diario.ultimo_error:
+                titulo += " (sin conexión con la BD)"
+        if self.title() != titulo:
+            self.title(titulo)
+
+    def _ver_atascadas(self):
+        """Ventas del diario que la BD rechaza: reintentarlas o descartarlas (F9)."""
+        dlg = getattr(self, "_dlg_atascadas", None)
+        if dlg is None or not dlg.winfo_exists():
+            dlg = self._dlg_atascadas = tk.Toplevel(self)
+            dlg.title("⚠  Ventas sin sincronizar")
+            dlg.configure(bg=C["card"], padx=14, pady=12)
+            tk.Label(dlg, text="La base de datos rechazó estas ventas (p. ej. se eliminó un\n"
+                               "producto). Siguen descontando stock en esta caja.",
+                     fg=C["text"], bg=C["card"], font=("Courier", 10),
+                     justify="left").pack(anchor="w", pady=(0, 8))
+            cols = ("ticket", "fecha", "total", "error")
+            dlg.tabla = ttk.Treeview(dlg, columns=cols, show="headings", height=8,
+                                     selectmode="browse")
+            for c, h, w in zip(cols, ("Ticket", "Fecha", "Total", "Error"), (90, 150, 90, 360)):
+                dlg.tabla.heading(c, text=h)
+                dlg.tabla.column(c, width=w, anchor="w" if c == "error" else "center")
+            dlg.tabla.pack(fill="both", expand=True)
+            botones = tk.Frame(dlg, bg=C["card"])
+            botones.pack(fill="x", pady=(8, 0))
+            for texto, color, comando in (("↻  Reintentar todas", C["accent"], self._reintentar_atascadas),
+                                          ("✕  Descartar", C["red"], self._descartar_atascada),
+                                          ("Cerrar", C["panel"], dlg.destroy)):
+                tk.Button(botones, text=texto, bg=color, fg=C["white"], bd=0,
+                          font=("Courier", 10), padx=12, pady=6, cursor="hand2",
+                          command=comando).pack(side="left", padx=(0, 6))
+        tabla = dlg.tabla
+        tabla.delete(*tabla.get_children())
+        for ticket, fecha, total, error in self.diario.detalle_atascadas():
+            tabla.insert("", "end", iid=ticket, values=(ticket[:8], fecha, formato(total), error))
+        dlg.lift()
+
+    def _reintentar_atascadas(self):
+        self.diario.reintentar()
+        self._atascadas_avisadas = 0   # Si vuelven a fallar, avisar otra vez
+        self._dlg_atascadas.destroy()
+        self._mostrar_pendientes()
+
+    def _descartar_atascada(self):
+        sel = self._dlg_atascadas.tabla.selection()
+        if not sel:
+            return
+        if not messagebox.askyesno(
+                "Descartar venta",
+                f"La venta {sel[0][:8]} no se guardará en la base de datos y su stock\n"
+                f"vuelve a contar en esta caja. Queda una copia en\n"
+                f"{self.diario.ruta_descartadas}.\n\n¿Descartarla?",
+                icon="warning", parent=self._dlg_atascadas):
+            return
+        self.diario.descartar(sel[0])
+        self._atascadas_avisadas = len(self.diario.atascadas)
+        self._refrescar_productos()   # Sin las unidades de la venta descartada
+        self._mostrar_pendientes()
+        self._ver_atascadas()
 
     # ══════════════════════════════════════════════════════
     #  PÁGINA: PRODUCTOS
@@ -491,21 +746,35 @@ class PuntoDeVenta(tk.Tk):
             self.tabla_prod.column(c, width=w, anchor="center" if c!="nombre" else "w")
         sb = ttk.Scrollbar(frame_t, orient="vertical",
                            command=self.tabla_prod.yview)
-        self.tabla_prod.configure(yscrollcommand=sb.set)
         self.tabla_prod.pack(side="left", fill="both", expand=True)
         sb.pack(side="right", fill="y")
-        self.tabla_prod.bind("<<TreeviewSelect>>", self._llenar_form_producto)
+        self.tabla_prod.tag_configure("low", foreground=C["yellow"])
+        self.vt_prod = TablaVirtual(self.tabla_prod, sb,
+                                    al_seleccionar=self._llenar_form_producto)
 
         search_f = tk.Frame(page, bg=C["bg"])
         search_f.pack(fill="x", pady=(0,6))
         tk.Label(search_f, text="Filtrar: ", fg=C["muted"], bg=C["bg"],
                  font=("Courier",10)).pack(side="left")
         self.sv_prod_filter = tk.StringVar()
-        self.sv_prod_filter.trace_add("write", lambda *a: self._cargar_tabla_productos())
+        self.sv_prod_filter.trace_add("write",
+            lambda *a: self._cargar_tabla_productos(DEMORA_FILTROS))
         tk.Entry(search_f, textvariable=self.sv_prod_filter,
                  bg=C["panel"], fg=C["text"], insertbackground=C["text"],
                  bd=0, font=("Courier",10), highlightthickness=1,
                  highlightbackground=C["border"], width=30).pack(side="left", ipady=5)
+        tk.Button(search_f, text="⇩ Exportar…", bg=C["panel"], fg=C["text"],
+                  bd=0, font=("Courier", 10), padx=10, pady=4, cursor="hand2",
+                  command=self._exportar_productos).pack(side="right")
+        tk.Button(search_f, text="⇧ Importar…", bg=C["panel"], fg=C["text"],
+                  bd=0, font=("Courier", 10), padx=10, pady=4, cursor="hand2",
+                  command=self._importar_productos).pack(side="right", padx=(0,4))
+        tk.Button(search_f, text="📥 Recibir…", bg=C["panel"], fg=C["text"],
+                  bd=0, font=("Courier", 10), padx=10, pady=4, cursor="hand2",
+                  command=self._recibir_mercancia).pack(side="right", padx=(0,4))
+        self.lbl_prod_estado = tk.Label(search_f, text="", fg=C["muted"], bg=C["bg"],
+                                        font=("Courier", 9))
+        self.lbl_prod_estado.pack(side="right", padx=8)
 
         search_f.pack_forget()
         form_card.pack_forget()
@@ -514,29 +783,29 @@ class PuntoDeVenta(tk.Tk):
         search_f.pack(fill="x", pady=(0,6))
         frame_t.pack(fill="both", expand=True)
 
-    def _cargar_tabla_productos(self):
+    def _cargar_tabla_productos(self, demora_ms=0):
         q = ""
         if hasattr(self, "sv_prod_filter"):
             q = self.sv_prod_filter.get().strip().lower()
-        for row in self.tabla_prod.get_children():
-            self.tabla_prod.delete(row)
-        with get_conn() as conn:
-            rows = conn.execute(
-                "SELECT id,codigo,nombre,costo,precio,stock,categoria FROM productos ORDER BY nombre"
-            ).fetchall()
+
+        # Sale de la copia en memoria del catálogo, no de la BD
+        self._consultas.programar("productos", lambda: self.catalogo.listar(q),
+                                  self._mostrar_tabla_productos, demora_ms)
+
+    def _mostrar_tabla_productos(self, rows):
+        filas = []
         for r in rows:
-            if q in r[1].lower() or q in r[2].lower():
-                tag = "low" if r[5] <= 5 else ""
-                self.tabla_prod.insert("", "end",
-                    values=(r[0],r[1],r[2],f"${r[3]:.2f}",f"${r[4]:.2f}",r[5],r[6]),
-                    iid=str(r[0]), tags=(tag,))
-        self.tabla_prod.tag_configure("low", foreground=C["yellow"])
+            tag = "low" if r[5] <= 5 else ""
+            filas.append((str(r[0]),
+                (r[0],r[1],r[2],formato(r[3]),formato(r[4]),r[5],r[6]), (tag,)))
+        # Conservar el desplazamiento: al guardar un producto la tabla no salta al inicio
+        self.vt_prod.cargar(filas, conservar_posicion=True)
 
     def _llenar_form_producto(self, event=None):
         sel = self.tabla_prod.selection()
         if not sel:
             return
-        vals = self.tabla_prod.item(sel[0], "values")
+        vals = self.vt_prod.valores(sel[0])
         pid, codigo, nombre, costo, precio, stock, cat = vals
         costo = costo.replace("$","")
         precio = precio.replace("$","")
@@ -551,8 +820,8 @@ class PuntoDeVenta(tk.Tk):
         try:
             codigo   = self._prod_entries["e_codigo"].get().strip()
             nombre   = self._prod_entries["e_nombre"].get().strip()
-            costo    = float(self._prod_entries["e_costo"].get().strip() or 0)
-            precio   = float(self._prod_entries["e_precio"].get().strip())
+            costo    = a_centavos(self._prod_entries["e_costo"].get().strip() or 0)
+            precio   = a_centavos(self._prod_entries["e_precio"].get().strip())
             stock    = int(self._prod_entries["e_stock"].get().strip())
             categoria= self._prod_entries["e_categoria"].get().strip() or "General"
         except ValueError:
@@ -568,30 +837,20 @@ class PuntoDeVenta(tk.Tk):
             return
 
         eid = getattr(self, "_editing_id", None)
-        with get_conn() as conn:
-            if eid:
-                conn.execute(
-                    "UPDATE productos SET codigo=?,nombre=?,costo=?,precio=?,stock=?,categoria=?"
-                    " WHERE id=?",
-                    (codigo, nombre, costo, precio, stock, categoria, eid))
-                msg = "Producto actualizado."
-            else:
-                try:
-                    conn.execute(
-                        "INSERT INTO productos (codigo,nombre,costo,precio,stock,categoria)"
-                        " VALUES (?,?,?,?,?,?)",
-                        (codigo, nombre, costo, precio, stock, categoria))
-                    msg = "Producto agregado."
-                except sqlite3.IntegrityError:
-                    messagebox.showerror("Error",
-                        f'El código "{codigo}" ya existe.', parent=self)
-                    return
+        try:
+            repo.guardar_producto(codigo, nombre, costo, precio, stock, categoria,
+                                  producto_id=eid)
+        except sqlite3.IntegrityError:
+            messagebox.showerror("Error",
+                f'El código "{codigo}" ya existe.', parent=self)
+            return
+        msg = "Producto actualizado." if eid else "Producto agregado."
         messagebox.showinfo("OK", msg, parent=self)
         for e in self._prod_entries.values():
             e.delete(0,"end")
         self._editing_id = None
-        self._cargar_tabla_productos()
-        self._cargar_productos()
+        self.vt_prod.deseleccionar()
+        self._refrescar_productos()   # Índice y tabla: solo este producto
 
     def _eliminar_producto(self):
         eid = getattr(self, "_editing_id", None)
@@ -599,17 +858,104 @@ class PuntoDeVenta(tk.Tk):
             messagebox.showinfo("Selecciona un producto",
                 "Haz clic en un producto de la tabla primero.", parent=self)
             return
-        sel = self.tabla_prod.selection()
-        nombre = self.tabla_prod.item(sel[0])["values"][2] if sel else "?"
+        sel = self.vt_prod.seleccion()
+        nombre = self.vt_prod.valores(sel)[2] if sel else "?"
         if messagebox.askyesno("Eliminar",
             f'¿Eliminar "{nombre}"? (No se puede deshacer)', parent=self):
-            with get_conn() as conn:
-                conn.execute("DELETE FROM productos WHERE id=?", (eid,))
+            try:
+                repo.eliminar_producto(eid)
+            except sqlite3.IntegrityError:
+                messagebox.showerror("No se puede eliminar",
+                    f'"{nombre}" tiene ventas o compras registradas.', parent=self)
+                return
             for e in self._prod_entries.values():
                 e.delete(0,"end")
             self._editing_id = None
-            self._cargar_tabla_productos()
-            self._cargar_productos()
+            self.vt_prod.deseleccionar()
+            self._refrescar_productos()
+
+    # ── Importar / exportar ───────────────────────────────
+    _TIPOS_ARCHIVO = [("CSV, JSON o JSONL", "*.csv *.json *.jsonl"), ("Todos", "*.*")]
+
+    def _importar_productos(self):
+        ruta = filedialog.askopenfilename(parent=self, title="Importar productos",
+                                          filetypes=self._TIPOS_ARCHIVO)
+        if not ruta:
+            return
+        def consulta():
+            try:
+                return importar_productos(ruta, repo)
+            except (OSError, ValueError, OverflowError, sqlite3.Error, ConnectionError) as e:
+                return e
+        self.lbl_prod_estado.config(text="Importando…")
+        self._tareas.programar("importacion", consulta, self._importacion_terminada)
+
+    def _importacion_terminada(self, r):
+        self.lbl_prod_estado.config(text="")
+        if isinstance(r, Exception):
+            messagebox.showerror("No se pudo importar", str(r), parent=self)
+            return
+        texto = (f"Filas leídas: {r['leidas']}\nNuevas: {r['insertadas']}\n"
+                 f"Actualizadas: {r['actualizadas']}\nRechazadas: {r['rechazadas']}")
+        if r["reporte"]:
+            texto += f"\n\nDetalle de las rechazadas:\n{r['reporte']}"
+        messagebox.showinfo("Importación terminada", texto, parent=self)
+        self._refrescar_productos()
+
+    def _recibir_mercancia(self):
+        """Entrega de un proveedor desde un archivo codigo, cantidad, costo (ver compras.py)."""
+        ruta = filedialog.askopenfilename(parent=self, title="Recibir mercancía",
+                                          filetypes=self._TIPOS_ARCHIVO)
+        if not ruta:
+            return
+        proveedor = simpledialog.askstring("Recibir mercancía", "Proveedor:", parent=self)
+        if proveedor is None:
+            return
+        folio = simpledialog.askstring(
+            "Recibir mercancía", "Folio de la factura o remisión (vacío si no tiene):",
+            parent=self)
+        if folio is None:
+            return
+        def consulta():
+            try:
+                return recibir_archivo(ruta, proveedor.strip(), folio, repo)
+            except (OSError, ValueError, sqlite3.Error, ConnectionError) as e:
+                return e
+        self.lbl_prod_estado.config(text="Recibiendo…")
+        self._tareas.programar("recepcion", consulta, self._recepcion_terminada)
+
+    def _recepcion_terminada(self, r):
+        self.lbl_prod_estado.config(text="")
+        if isinstance(r, Exception):
+            messagebox.showerror("No se recibió la mercancía", str(r), parent=self)
+            return
+        compra_id, n, unidades, total = r
+        messagebox.showinfo("Mercancía recibida",
+                            f"Compra #{compra_id}\nProductos: {n}\nUnidades: {unidades}\n"
+                            f"Total: {formato(total, True)}", parent=self)
+        self._refrescar_productos()
+
+    def _exportar_productos(self):
+        ruta = filedialog.asksaveasfilename(parent=self, title="Exportar productos",
+                                            defaultextension=".csv",
+                                            filetypes=self._TIPOS_ARCHIVO)
+        if not ruta:
+            return
+        def consulta():
+            try:
+                # De la copia en memoria: funciona igual en modo servidor
+                return exportar_productos(ruta, self.catalogo.listar())
+            except (OSError, ValueError) as e:
+                return e
+        self._tareas.programar("exportacion", consulta,
+                               lambda r: self._exportacion_terminada(ruta, r))
+
+    def _exportacion_terminada(self, ruta, r):
+        if isinstance(r, Exception):
+            messagebox.showerror("No se pudo exportar", str(r), parent=self)
+        else:
+            messagebox.showinfo("Exportación terminada",
+                                f"{r} productos escritos en\n{ruta}", parent=self)
 
     # ══════════════════════════════════════════════════════
     #  PÁGINA: HISTORIAL
@@ -624,7 +970,7 @@ class PuntoDeVenta(tk.Tk):
         tk.Label(filter_f, text="Filtrar por fecha (YYYY-MM-DD):", fg=C["muted"],
                  bg=C["card"], font=("Courier",9)).pack(side="left")
         self.sv_hist_fecha = tk.StringVar()
-        self.sv_hist_fecha.trace_add("write", lambda *a: self._cargar_historial())
+        self.sv_hist_fecha.trace_add("write", lambda *a: self._filtro_historial_cambio())
         tk.Entry(filter_f, textvariable=self.sv_hist_fecha,
                  bg=C["panel"], fg=C["text"], insertbackground=C["text"],
                  bd=0, font=("Courier",11), width=14, highlightthickness=1,
@@ -644,6 +990,12 @@ class PuntoDeVenta(tk.Tk):
                   activebackground="#6a4aaf",
                   command=self._cambiar_contrasena).pack(side="right", padx=(0,8))
 
+        # Reportes del mismo rango que el filtro
+        tk.Button(filter_f, text="📈  Reportes",
+                  bg=C["accent"], fg=C["white"], bd=0,
+                  font=("Courier", 10), padx=12, pady=4, cursor="hand2",
+                  command=self._abrir_reportes).pack(side="right", padx=(0,8))
+
         # KPIs
         self.kpi_frame = tk.Frame(page, bg=C["bg"])
         self.kpi_frame.pack(fill="x", pady=(0,10))
@@ -671,10 +1023,12 @@ class PuntoDeVenta(tk.Tk):
             self.tabla_hist.heading(c, text=h)
             self.tabla_hist.column(c, width=w, anchor="center")
         sb = ttk.Scrollbar(left_h, orient="vertical", command=self.tabla_hist.yview)
-        self.tabla_hist.configure(yscrollcommand=sb.set)
         self.tabla_hist.pack(side="left", fill="both", expand=True)
         sb.pack(side="right", fill="y")
-        self.tabla_hist.bind("<<TreeviewSelect>>", self._ver_detalle_venta)
+        # Al llegar a la última venta cargada se pide la siguiente página
+        self.vt_hist = TablaVirtual(self.tabla_hist, sb,
+                                    al_final=self._cargar_pagina_historial,
+                                    al_seleccionar=self._ver_detalle_venta)
 
         # Detalle venta
         right_h = tk.Frame(split, bg=C["card"], padx=12, pady=12, width=350)
@@ -704,36 +1058,58 @@ class PuntoDeVenta(tk.Tk):
         lbl.pack(anchor="w")
         return lbl
 
-    def _cargar_historial(self):
+    def _filtro_historial_cambio(self):
+        # Solo ir a la BD con el filtro vacío o con una fecha completa
+        # (YYYY, YYYY-MM o YYYY-MM-DD); mientras se escribe '2024-0' no se consulta.
+        f = self.sv_hist_fecha.get().strip()
+        if not f or repo.rango_de_fechas(f):
+            self._cargar_historial(DEMORA_FILTROS)
+
+    def _cargar_historial(self, demora_ms=0):
         f = ""
         if hasattr(self, "sv_hist_fecha"):
             f = self.sv_hist_fecha.get().strip()
-        today = datetime.date.today().isoformat()
-        for row in self.tabla_hist.get_children():
-            self.tabla_hist.delete(row)
-        with get_conn() as conn:
-            if f:
-                rows = conn.execute(
-                    "SELECT id,fecha,total FROM ventas WHERE fecha LIKE ? ORDER BY id DESC",
-                    (f"%{f}%",)).fetchall()
-            else:
-                rows = conn.execute(
-                    "SELECT id,fecha,total FROM ventas ORDER BY id DESC LIMIT 200"
-                ).fetchall()
-            kpi = conn.execute(
-                "SELECT COUNT(*), IFNULL(SUM(v.total),0),"
-                " IFNULL(SUM(dv.ganancia),0)"
-                " FROM ventas v"
-                " LEFT JOIN detalle_venta dv ON dv.venta_id = v.id"
-                " WHERE v.fecha LIKE ?",
-                (f"{today}%",)).fetchone()
-        for r in rows:
-            self.tabla_hist.insert("","end",
-                values=(r[0],r[1],f"${r[2]:.2f}"), iid=str(r[0]))
+        rango = (repo.rango_de_fechas(f) if f else None) or (None, None)
+
+        def consulta():
+            return rango, repo.listar_ventas(*rango), repo.kpis_del_dia()
+        self._consultas.programar("historial", consulta,
+                                  self._mostrar_historial, demora_ms)
+
+    def _mostrar_historial(self, resultado):
+        rango, rows, kpi = resultado
+        self._hist_rango  = rango
+        self._hist_cursor = None   # (fecha, id) de la última venta mostrada
+        self.vt_hist.limpiar()
+        self._agregar_pagina_historial((rango, None, rows))
         if hasattr(self,"kpi_ventas"):
             self.kpi_ventas.config(text=str(kpi[0]))
-            self.kpi_total.config(text=f"${kpi[1]:.2f}")
-            self.kpi_ganancia.config(text=f"${kpi[2]:.2f}")
+            self.kpi_total.config(text=formato(kpi[1]))
+            self.kpi_ganancia.config(text=formato(kpi[2]))
+
+    def _cargar_pagina_historial(self):
+        """Pide la siguiente página del historial (la tabla llegó a la última fila)."""
+        cursor = getattr(self, "_hist_cursor", None)
+        if cursor is None:
+            return  # Ya se mostró todo el historial del rango
+        rango = self._hist_rango
+        self._consultas.programar(
+            "historial_pagina",
+            lambda: (rango, cursor, repo.listar_ventas(*rango, despues_de=cursor)),
+            self._agregar_pagina_historial)
+
+    def _agregar_pagina_historial(self, resultado):
+        rango, cursor, rows = resultado
+        # Página pedida antes de cambiar el filtro o de recargar: ya no corresponde
+        if rango != self._hist_rango or cursor != self._hist_cursor:
+            return
+        self.vt_hist.agregar(
+            [(str(r[0]), (r[0],r[1],formato(r[2])), ()) for r in rows])
+        # Una página incompleta significa que ya no hay ventas más antiguas
+        if len(rows) == repo.PAGINA_HISTORIAL:
+            self._hist_cursor = (rows[-1][1], rows[-1][0])
+        else:
+            self._hist_cursor = None
 
     def _ver_detalle_venta(self, event=None):
         sel = self.tabla_hist.selection()
@@ -742,13 +1118,40 @@ class PuntoDeVenta(tk.Tk):
         vid = int(sel[0])
         for row in self.tabla_det.get_children():
             self.tabla_det.delete(row)
-        with get_conn() as conn:
-            rows = conn.execute(
-                "SELECT nombre,cantidad,precio,subtotal,ganancia FROM detalle_venta"
-                " WHERE venta_id=?", (vid,)).fetchall()
+        rows = repo.detalle_de_venta(vid)
         for r in rows:
             self.tabla_det.insert("","end",
-                values=(r[0],r[1],f"${r[2]:.2f}",f"${r[3]:.2f}",f"${r[4]:.2f}"))
+                values=(r[0],r[1],formato(r[2]),formato(r[3]),formato(r[4])))
+
+    def _abrir_reportes(self):
+        """Más vendidos, horas pico y márgenes del rango filtrado (ver reportes.py)."""
+        f = self.sv_hist_fecha.get().strip()
+        rango = (repo.rango_de_fechas(f) if f else None) or (None, None)
+
+        dlg = tk.Toplevel(self)
+        dlg.title(f"📈 Reportes — {f or 'todas las ventas'}")
+        dlg.configure(bg=C["card"])
+        texto = tk.Text(dlg, bg=C["panel"], fg=C["text"], bd=0, padx=12, pady=12,
+                        font=("Courier", 10), width=92, height=40, wrap="none")
+        texto.pack(fill="both", expand=True)
+        texto.insert("1.0", "Calculando…")
+        texto.config(state="disabled")
+
+        def mostrar(resultado):
+            if not dlg.winfo_exists():
+                return   # Se cerró antes de terminar
+            texto.config(state="normal")
+            texto.delete("1.0", "end")
+            texto.insert("1.0", f"No se pudo calcular: {resultado}"
+                         if isinstance(resultado, Exception) else resultado)
+            texto.config(state="disabled")
+
+        def consulta():
+            try:
+                return informe(*rango, repo=repo)
+            except (sqlite3.Error, ConnectionError) as e:
+                return e
+        self._tareas.programar("reportes", consulta, mostrar)
 
     # ══════════════════════════════════════════════════════
     #  GESTIÓN DE CONTRASEÑA DE ADMINISTRADOR
@@ -758,7 +1161,7 @@ class PuntoDeVenta(tk.Tk):
         Se llama al arrancar. Si no existe contraseña en BD, muestra un
         diálogo obligatorio para crear una. No se puede cerrar sin crearla.
         """
-        if get_admin_hash() is not None:
+        if repo.hay_admin():
             return  # Ya existe contraseña → todo en orden, continuar normalmente
 
         # No hay contraseña: mostrar diálogo de creación obligatorio
@@ -829,7 +1232,7 @@ class PuntoDeVenta(tk.Tk):
                 e_conf.focus()
                 return
 
-            set_admin_hash(_hash(nueva))
+            repo.cambiar_admin(nueva)
             dlg.destroy()
             messagebox.showinfo("✔ Contraseña creada",
                 "Contraseña de administrador guardada correctamente.\n"
@@ -853,7 +1256,7 @@ class PuntoDeVenta(tk.Tk):
 
         Si no existe contraseña aún, redirige al flujo de creación.
         """
-        if get_admin_hash() is None:
+        if not repo.hay_admin():
             # Caso borde: el usuario llega aquí sin haber creado contraseña aún
             self._verificar_contrasena_inicial()
             return
@@ -918,9 +1321,9 @@ class PuntoDeVenta(tk.Tk):
                 lbl_error.config(text="✕ Todos los campos son obligatorios.")
                 return
 
-            # Capa 2: validar contraseña actual con hash (máx 3 intentos)
+            # Capa 2: validar contraseña actual (máx 3 intentos)
             intentos_actuales[0] += 1
-            if _hash(actual) != get_admin_hash():
+            if not repo.verificar_admin(actual):
                 restantes = 3 - intentos_actuales[0]
                 if restantes <= 0:
                     dlg.destroy()
@@ -943,12 +1346,12 @@ class PuntoDeVenta(tk.Tk):
                 sv_conf.set("")
                 e_conf.focus()
                 return
-            if _hash(nueva) == get_admin_hash():
+            if nueva == actual:
                 lbl_error.config(text="✕ La nueva contraseña es igual a la actual.")
                 return
 
             # Todo OK: guardar nuevo hash
-            set_admin_hash(_hash(nueva))
+            repo.cambiar_admin(nueva, actual)
             dlg.destroy()
             messagebox.showinfo("✔ Contraseña actualizada",
                 "La contraseña de administrador fue cambiada exitosamente.", parent=self)
@@ -976,14 +1379,14 @@ class PuntoDeVenta(tk.Tk):
         Capas de validación (fail-fast, de menor a mayor costo):
           1. ¿Hay venta seleccionada?         → barato, solo leer UI
           2. ¿Se ingresó contraseña?          → diálogo modal
-          3. ¿Contraseña correcta? (hash)     → comparación en memoria
+          3. ¿Contraseña correcta? (hash)     → repo.verificar_admin
           4. ¿Confirmar con resumen?          → doble intención
           5. DELETE en transacción atómica    → detalle primero, luego cabecera
           6. Manejo de excepción de BD        → rollback automático
         """
 
         # ── Capa 1: Validar que haya una venta seleccionada ──────────────
-        sel = self.tabla_hist.selection()
+        sel = self.vt_hist.seleccion()
         if not sel:
             messagebox.showinfo(
                 "Sin selección",
@@ -993,14 +1396,14 @@ class PuntoDeVenta(tk.Tk):
             return  # Salida temprana: no tiene sentido continuar
 
         # Extraer datos de la venta para mostrarlos en los diálogos
-        vals = self.tabla_hist.item(sel[0], "values")
+        vals = self.vt_hist.valores(sel)
         venta_id   = int(vals[0])
         venta_fecha = vals[1]
         venta_total = vals[2]
 
         # ── Capa 2 y 3: Diálogo de contraseña con validación de hash ─────
-        password_ok = self._pedir_y_validar_password(venta_id, venta_fecha, venta_total)
-        if not password_ok:
+        clave = self._pedir_y_validar_password(venta_id, venta_fecha, venta_total)
+        if not clave:
             return  # El método interno ya mostró el mensaje de error
 
         # ── Capa 4: Confirmación final con resumen de la venta ────────────
@@ -1019,20 +1422,10 @@ class PuntoDeVenta(tk.Tk):
 
         # ── Capa 5 y 6: Eliminar en transacción atómica ───────────────────
         try:
-            with get_conn() as conn:
-                # ORDEN CRÍTICO: primero el detalle (FK hijo), luego la cabecera (FK padre)
-                # Si se invirtiera el orden, SQLite lanzaría un error de integridad referencial.
-                conn.execute(
-                    "DELETE FROM detalle_venta WHERE venta_id = ?", (venta_id,)
-                )
-                conn.execute(
-                    "DELETE FROM ventas WHERE id = ?", (venta_id,)
-                )
-                # El 'with' hace COMMIT automático al salir sin excepciones.
-                # Si algo falla aquí dentro, hace ROLLBACK automático,
-                # dejando la BD intacta.
-
-        except sqlite3.Error as e:
+            # Detalle y cabecera se borran en una sola transacción (ver repositorio);
+            # la contraseña viaja con la orden porque el servidor la verifica otra vez
+            repo.eliminar_venta(venta_id, clave=clave)
+        except (sqlite3.Error, ConnectionError, PermissionError) as e:
             # Error inesperado de base de datos (disco lleno, BD corrupta, etc.)
             messagebox.showerror(
                 "Error de base de datos",
@@ -1058,7 +1451,7 @@ class PuntoDeVenta(tk.Tk):
         """
         Muestra un diálogo modal para ingresar la contraseña de administrador.
         Permite hasta 3 intentos antes de bloquear la operación.
-        Retorna True si la contraseña es correcta, False en caso contrario.
+        Retorna la contraseña si es correcta, False en caso contrario.
 
         Por qué un método separado:
           - Responsabilidad única: solo se ocupa de autenticar
@@ -1151,8 +1544,7 @@ class PuntoDeVenta(tk.Tk):
                 # El usuario cerró o presionó Cancelar/Escape — salir limpiamente
                 return False
 
-            # ── Capa 3: Validar contraseña con hash SHA-256 ───────────────
-            # Nunca comparar texto plano. Hashear lo ingresado y comparar hashes.
+            # ── Capa 3: Validar contraseña (repositorio compara hashes SHA-256) ──
             ingresada = sv_pass.get()
 
             # Error de validación: campo vacío
@@ -1162,10 +1554,8 @@ class PuntoDeVenta(tk.Tk):
                 )
                 continue  # Cuenta como intento
 
-            hash_ingresada = _hash(ingresada)
-
-            if hash_ingresada == get_admin_hash():
-                return True  # ✔ Autenticación exitosa
+            if repo.verificar_admin(ingresada):
+                return ingresada  # ✔ Autenticación exitosa
 
             # Contraseña incorrecta — si no quedan intentos, abortar
             if intento == MAX_INTENTOS:
@@ -1184,5 +1574,15 @@ class PuntoDeVenta(tk.Tk):
 
 # ──────────────────────────────────────────────────────────
 if __name__ == "__main__":
+    if instrumentacion.ACTIVA:
+        instrumentacion.activar(repo)
+        instrumentacion.medir_atributos(PuntoDeVenta, METODOS_MEDIDOS, "ui")
     app = PuntoDeVenta()
     app.mainloop()
+    if app.vigia:
+        app.vigia.detener()
+    if app.respaldos:
+        app.respaldos.detener()
+    if app.diario:
+        app.diario.detener()
+    repo.cerrar_conexiones()
@@ -0,0 +1,114 @@
+"""
+=============================================================
+  REPORTES DE VENTAS  —  Más vendidos, horas pico, márgenes
+  Ejecutar:  python reportes.py 2025
+             python reportes.py 2025-03 --por ganancia --top 20
+             python reportes.py --desde 2024-01-01 --hasta 2026-01-01
+  El mismo texto se muestra en la página Historial (📈 Reportes).
+=============================================================
+
+Los números salen de resumen_producto_diario y resumen_horario, que se
+actualizan con cada venta (ver repositorio.insertar_venta): un reporte de
+varios años cuesta lo mismo que uno de un mes.
+"""
+
+import argparse, os, time
+
+import repositorio
+from dinero import formato
+
+DIAS = ("Dom", "Lun", "Mar", "Mié", "Jue", "Vie", "Sáb")   # strftime('%w'): 0 = domingo
+NIVELES = " ░▒▓█"
+
+
+# ──────────────────────────────────────────────────────────
+#  FORMATO
+# ──────────────────────────────────────────────────────────
+def _margen(ingreso, ganancia):
+    return f"{100 * ganancia / ingreso:5.1f}%" if ingreso else "    –"
+
+def texto_top(filas, por):
+    lineas = [f"MÁS VENDIDOS (por {por})",
+              f"{'#':>3}  {'Producto':<28}{'Unid.':>8}{'Ingreso':>13}{'Ganancia':>13}{'Margen':>8}"]
+    for n, (_, nombre, _, unidades, ingreso, ganancia) in enumerate(filas, 1):
+        lineas.append(f"{n:>3}  {nombre[:27]:<28}{unidades:>8}{formato(ingreso, True):>13}"
+                      f"{formato(ganancia, True):>13}{_margen(ingreso, ganancia):>8}")
+    if not filas:
+        lineas.append("     (sin ventas en el periodo)")
+    return "\n".join(lineas)
+
+def texto_mapa(celdas):
+    """Número de ventas por día de la semana (filas) y hora (columnas)."""
+    lineas = ["VENTAS POR DÍA Y HORA"]
+    if not celdas:
+        return "\n".join(lineas + ["     (sin ventas en el periodo)"])
+    conteo = {(d, h): n for d, h, n, _ in celdas}
+    horas  = range(min(h for _, h, _, _ in celdas), max(h for _, h, _, _ in celdas) + 1)
+    minimo, maximo = min(conteo.values()), max(conteo.values())
+    rango  = (maximo - minimo) or 1
+    lineas.append("     " + "".join(f"{h:>3}" for h in horas))
+    for d in (1, 2, 3, 4, 5, 6, 0):   # De lunes a domingo
+        fila = ""
+        for h in horas:
+            n = conteo.get((d, h), 0)
+            # Escala entre la hora más floja y la más fuerte, no desde cero:
+            # en un negocio parejo las diferencias también se notan
+            nivel = 0 if not n else 1 + (len(NIVELES) - 2) * (n - minimo) // rango
+            fila += " " + NIVELES[nivel] * 2
+        lineas.append(f"{DIAS[d]:<5}{fila}")
+    pico_d, pico_h = max(conteo, key=conteo.get)
+    lineas.append(f"Hora pico: {DIAS[pico_d]} {pico_h}:00 ({maximo} ventas).  "
+                  f"Escala: {NIVELES[1]} pocas … {NIVELES[-1]} más")
+    return "\n".join(lineas)
+
+def texto_categorias(filas):
+    lineas = ["MÁRGENES POR CATEGORÍA",
+              f"     {'Categoría':<28}{'Unid.':>8}{'Ingreso':>13}{'Ganancia':>13}{'Margen':>8}"]
+    for categoria, unidades, ingreso, ganancia in filas:
+        lineas.append(f"     {categoria[:27]:<28}{unidades:>8}{formato(ingreso, True):>13}"
+                      f"{formato(ganancia, True):>13}{_margen(ingreso, ganancia):>8}")
+    if not filas:
+        lineas.append("     (sin ventas en el periodo)")
+    return "\n".join(lineas)
+
+def informe(desde=None, hasta=None, repo=repositorio, por="ingreso", limite=10):
+    """Los tres reportes del rango [desde, hasta) como texto de ancho fijo.
+    repo: repositorio o cliente (modo servidor)."""
+    periodo = f"{desde or 'inicio'} → {hasta or 'hoy'}"
+    partes = [f"REPORTE DE VENTAS  {periodo}",
+              texto_top(repo.top_productos(desde, hasta, por, limite), por),
+              texto_mapa(repo.mapa_horario(desde, hasta)),
+              texto_categorias(repo.margenes_por_categoria(desde, hasta))]
+    return "\n\n".join(partes)
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reportes de ventas")
+    parser.add_argument("periodo", nargs="?", default=None,
+                        help="YYYY, YYYY-MM o YYYY-MM-DD (por defecto, todas las ventas)")
+    parser.add_argument("--desde", help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--hasta", help="YYYY-MM-DD, sin incluir")
+    parser.add_argument("--por", choices=repositorio.ORDEN_TOP, default="ingreso",
+                        help="orden de los más vendidos")
+    parser.add_argument("--top", type=int, default=10, help="cuántos productos mostrar")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    args = parser.parse_args()
+
+    desde, hasta = args.desde, args.hasta
+    if args.periodo:
+        rango = repositorio.rango_de_fechas(args.periodo)
+        if rango is None:
+            parser.error(f"Periodo no válido: {args.periodo}")
+        desde, hasta = rango
+    if args.db:
+        repositorio.DB_FILE = os.path.abspath(args.db)
+    if not os.path.exists(repositorio.DB_FILE):
+        parser.error(f"No existe {repositorio.DB_FILE}")
+    repositorio.init_db()
+
+    t0 = time.perf_counter()
+    texto = informe(desde, hasta, por=args.por, limite=args.top)
+    print(texto)
+    print(f"\n({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    repositorio.cerrar_conexiones()
@@ -0,0 +1,1349 @@
+"""
+=============================================================
+  REPOSITORIO  —  Acceso a datos del punto de venta (SQLite)
+  No depende de tkinter: se puede usar desde scripts,
+  pruebas de carga o benchmarks sin levantar la interfaz.
+=============================================================
+
+Todos los montos (precio, costo, total, subtotal, ganancia) entran y salen
+en centavos enteros: 1850 = $18.50. La conversión a texto y desde lo que se
+captura está en dinero.py.
+"""
+
+import sqlite3, os, datetime, hashlib, hmac, threading, contextlib, functools, itertools, random, re, time
+
+# ──────────────────────────────────────────────────────────
+#  CONEXIÓN
+# ──────────────────────────────────────────────────────────
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ventas.db")
+
+# Por defecto cada hilo reutiliza UNA conexión abierta durante toda la sesión
+# (en vez de abrir y cerrar el archivo en cada consulta). Con la variable de
+# entorno POS_CONEXION_POR_LLAMADA=1 se vuelve al comportamiento original:
+# una conexión nueva en cada llamada a get_conn() (con la misma espera y los
+# mismos pragmas), que se cierra al terminar el 'with'.
+CONEXION_PERSISTENTE = os.environ.get("POS_CONEXION_POR_LLAMADA", "") != "1"
+
+# Varias terminales sobre el mismo ventas.db:
+#  - ESPERA_BLOQUEO: cuánto espera SQLite a que otra terminal suelte el candado
+#    de escritura antes de responder "database is locked".
+#  - REINTENTOS_ESCRITURA: si aun así se agota, las escrituras se reintentan con
+#    espera exponencial (ver con_reintentos).
+#  - JOURNAL_MODE: WAL requiere memoria compartida entre procesos y NO funciona
+#    sobre carpetas compartidas en red (SMB/NFS); ahí usar POS_JOURNAL_MODE=DELETE
+#    o, mejor, el modo servidor.
+ESPERA_BLOQUEO       = float(os.environ.get("POS_ESPERA_BLOQUEO_MS", "5000")) / 1000
+REINTENTOS_ESCRITURA = int(os.environ.get("POS_REINTENTOS_ESCRITURA", "6"))
+JOURNAL_MODE         = os.environ.get("POS_JOURNAL_MODE", "WAL")
+
+# Se aplican una sola vez al abrir cada conexión persistente.
+# journal_mode=WAL queda guardado en el archivo .db; para regresar al modo
+# clásico: PRAGMA journal_mode=DELETE con la aplicación cerrada.
+PRAGMAS = [
+    ("journal_mode", JOURNAL_MODE), # WAL: lectores no bloquean al escritor y viceversa
+    ("synchronous",  "NORMAL"),     # seguro con WAL; evita un fsync por commit
+    ("cache_size",   -20000),       # ~20 MB de caché de páginas (negativo = KiB)
+    ("mmap_size",    268435456),    # lecturas vía memoria mapeada (256 MB)
+    ("temp_store",   "MEMORY"),
+    ("foreign_keys", "ON"),
+]
+
+# Clase de las conexiones (instrumentacion.py pone una que mide cada sentencia)
+FABRICA_CONEXION = sqlite3.Connection
+
+_local      = threading.local()
+_abiertas   = []               # todas las conexiones persistentes, para cerrarlas
+_lock       = threading.Lock()
+_generacion = 0                # aumenta en cerrar_conexiones(): invalida las de otros hilos
+
+def _abrir_conexion():
+    # check_same_thread=False solo para poder cerrarla desde cerrar_conexiones();
+    # cada conexión se usa exclusivamente en el hilo que la creó.
+    conn = sqlite3.connect(DB_FILE, timeout=ESPERA_BLOQUEO, check_same_thread=False,
+                           factory=FABRICA_CONEXION)
+    for nombre, valor in PRAGMAS:
+        conn.execute(f"PRAGMA {nombre}={valor}")
+    return conn
+
+class _ConexionDeLlamada:
+    """
+    Conexión de POS_CONEXION_POR_LLAMADA=1: se usa igual que una conexión
+    (execute, commit, transaccion(conn)…), pero el 'with' además de hacer
+    COMMIT/ROLLBACK la cierra. Sin 'with' se cierra cuando ya nadie la usa
+    (ni ella ni sus cursores), como cualquier sqlite3.Connection.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *error):
+        try:
+            return self._conn.__exit__(*error)
+        finally:
+            self._conn.close()
+
+def get_conn():
+    """
+    Devuelve la conexión del hilo actual. Se usa siempre como
+    'with get_conn() as conn:' — el 'with' hace COMMIT/ROLLBACK pero
+    NO cierra la conexión, así que puede reutilizarse (salvo con
+    POS_CONEXION_POR_LLAMADA=1, ver _ConexionDeLlamada).
+    """
+    if not CONEXION_PERSISTENTE:
+        return _ConexionDeLlamada(_abrir_conexion())
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.clave != (DB_FILE, _generacion):
+        conn = _abrir_conexion()
+        _local.conn, _local.clave = conn, (DB_FILE, _generacion)
+        with _lock:
+            _abiertas.append(conn)
+    return conn
+
+def cerrar_conexiones():
+    """Cierra todas las conexiones persistentes (al salir o al cambiar DB_FILE)."""
+    global _generacion
+    with _lock:
+        _generacion += 1
+        for conn in _abiertas:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _abiertas.clear()
+
+@contextlib.contextmanager
+def transaccion(conn, modo="IMMEDIATE"):
+    """
+    Transacción explícita: BEGIN IMMEDIATE toma el candado de escritura al
+    inicio (no a mitad de la venta), así otra terminal no puede colarse entre
+    la verificación de stock y el descuento. COMMIT al salir, ROLLBACK si hay
+    cualquier excepción.
+    """
+    conn.execute(f"BEGIN {modo}")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def _bloqueada(error):
+    mensaje = str(error).lower()
+    return "locked" in mensaje or "busy" in mensaje
+
+def con_reintentos(funcion):
+    """
+    Decorador para operaciones de escritura: si la BD sigue bloqueada por otra
+    terminal después de ESPERA_BLOQUEO, reintenta la operación completa con
+    espera exponencial y aleatoria (para que dos terminales no choquen otra vez
+    al mismo tiempo). Cualquier otro error se propaga de inmediato.
+    """
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        espera = 0.05
+        for intento in range(1, REINTENTOS_ESCRITURA + 1):
+            try:
+                return funcion(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _bloqueada(e) or intento == REINTENTOS_ESCRITURA:
+                    raise
+            time.sleep(espera * random.uniform(0.5, 1.5))
+            espera = min(espera * 2, 2.0)
+    return envoltura
+
+def iterar_consulta(sql, params=(), tamano=1000, ruta=None):
+    """
+    Recorre el resultado de una consulta de a 'tamano' filas (fetchmany), con
+    memoria constante sin importar cuántas filas haya: para exportaciones.
+    Usa una conexión propia para no dejar a medias un cursor de la del hilo.
+    ruta: otra BD en vez de DB_FILE (un año archivado, ver archivar_ventas).
+    """
+    if ruta is not None:
+        conn = sqlite3.connect(ruta, factory=FABRICA_CONEXION)
+    else:
+        conn = _abrir_conexion()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            filas = cur.fetchmany(tamano)
+            if not filas:
+                return
+            yield from filas
+    finally:
+        conn.close()
+
+def _hash(texto):
+    """Devuelve el SHA-256 hexadecimal de un texto. Único punto de hashing en todo el sistema."""
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+# ──────────────────────────────────────────────────────────
+#  ESQUEMA
+#  Cada cambio al esquema es una migración numerada; el número
+#  de la última aplicada se guarda en PRAGMA user_version (en
+#  la cabecera del archivo). Con la BD al día, init_db() solo
+#  lee ese número. Para cambiar el esquema: agregar una función
+#  al final de MIGRACIONES, nunca modificar las que ya existen.
+# ──────────────────────────────────────────────────────────
+def _columnas(conn, tabla):
+    """Nombres de las columnas de una tabla, en orden."""
+    return [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")]
+
+def _agregar_columna(conn, tabla, columna, definicion):
+    """ALTER TABLE ADD COLUMN solo si falta (BD de versiones anteriores)."""
+    if columna not in _columnas(conn, tabla):
+        conn.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
+def _m1_tablas(conn):
+    """Tablas originales. Una BD anterior a las migraciones ya las tiene, quizá
+    sin las columnas de costo y ganancia."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS configuracion (
+            clave  TEXT PRIMARY KEY,
+            valor  TEXT NOT NULL
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS productos (
+            id        INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo    TEXT    UNIQUE NOT NULL,
+            nombre    TEXT    NOT NULL,
+            precio    REAL    NOT NULL DEFAULT 0,
+            costo     REAL    NOT NULL DEFAULT 0,
+            stock     INTEGER NOT NULL DEFAULT 0,
+            categoria TEXT    DEFAULT 'General'
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ventas (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha      TEXT    NOT NULL,
+            total      REAL    NOT NULL DEFAULT 0
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS detalle_venta (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            venta_id    INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            nombre      TEXT    NOT NULL,
+            precio      REAL    NOT NULL,
+            costo       REAL    NOT NULL DEFAULT 0,
+            cantidad    INTEGER NOT NULL,
+            subtotal    REAL    NOT NULL,
+            ganancia    REAL    NOT NULL DEFAULT 0,
+            FOREIGN KEY (venta_id)    REFERENCES ventas(id),
+            FOREIGN KEY (producto_id) REFERENCES productos(id)
+        )""")
+    _agregar_columna(conn, "productos",     "costo",    "REAL NOT NULL DEFAULT 0")
+    _agregar_columna(conn, "detalle_venta", "costo",    "REAL NOT NULL DEFAULT 0")
+    _agregar_columna(conn, "detalle_venta", "ganancia", "REAL NOT NULL DEFAULT 0")
+    # Productos de ejemplo, solo en una BD nueva
+    if conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT INTO productos (codigo,nombre,precio,costo,stock,categoria) VALUES (?,?,?,?,?,?)",
+            [
+                ("P001", "Refresco 600ml",  18.0, 12.0, 50, "Bebidas"),
+                ("P002", "Agua 500ml",       10.0,  6.0, 80, "Bebidas"),
+                ("P003", "Papas fritas",     15.0,  9.0, 30, "Botanas"),
+                ("P004", "Galletas",         12.0,  7.0, 40, "Botanas"),
+                ("P005", "Café americano",   25.0, 14.0, 20, "Cafetería"),
+            ]
+        )
+
+def _m2_indices(conn):
+    # Historial y exportación por rango de fechas (ver listar_ventas)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)")
+    # Líneas de una venta sin recorrer todo detalle_venta (detalle, eliminación)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_detalle_venta_venta ON detalle_venta(venta_id)")
+    # Historia de un producto; también evita recorrer todo el detalle al
+    # revisar la llave foránea cuando se elimina un producto
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detalle_venta_producto ON detalle_venta(producto_id)")
+    # Listados de productos ordenados por nombre (listar_productos)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre)")
+
+def _m3_resumen_diario(conn):
+    """Acumulados por día, mantenidos en la misma transacción que registra o
+    elimina cada venta (ver insertar_venta / eliminar_venta)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_diario (
+            dia       TEXT    PRIMARY KEY,          -- 'YYYY-MM-DD'
+            ventas    INTEGER NOT NULL DEFAULT 0,
+            total     REAL    NOT NULL DEFAULT 0,
+            ganancia  REAL    NOT NULL DEFAULT 0
+        )""")
+    reconstruir_resumen_diario(conn)
+
+def _m4_uuid_ventas(conn):
+    """Identificador que asigna la caja al cobrar (ver diario.py): la misma venta
+    enviada dos veces se reconoce y no se duplica. Las ventas antiguas quedan
+    en NULL, que UNIQUE permite repetir."""
+    _agregar_columna(conn, "ventas", "uuid", "TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ventas_uuid ON ventas(uuid)")
+
+def _m5_cambios_productos(conn):
+    """Registro de cambios de productos para que cada caja actualice su copia
+    del catálogo sin releerlo completo (ver cambios_productos). Una fila por
+    producto con la versión de su último cambio: la tabla no crece con cada
+    venta, solo con productos nuevos."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS productos_cambios (
+            producto_id INTEGER PRIMARY KEY,
+            version     INTEGER NOT NULL
+        )""")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_productos_cambios_version
+            ON productos_cambios(version)""")
+    for nombre, evento, fila in (("trg_productos_insert", "INSERT", "NEW"),
+                                 ("trg_productos_update", "UPDATE", "NEW"),
+                                 ("trg_productos_delete", "DELETE", "OLD")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nombre} AFTER {evento} ON productos
+            BEGIN
+                INSERT OR REPLACE INTO productos_cambios (producto_id, version)
+                VALUES ({fila}.id, (SELECT IFNULL(MAX(version), 0) + 1 FROM productos_cambios));
+            END""")
+
+def _m6_resumenes_reportes(conn):
+    """Acumulados para reportes (ver reportes.py), mantenidos igual que
+    resumen_diario: un reporte de varios años suma unos miles de filas en vez
+    de recorrer todo detalle_venta."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_producto_diario (
+            dia         TEXT    NOT NULL,
+            producto_id INTEGER NOT NULL,
+            unidades    INTEGER NOT NULL DEFAULT 0,
+            ingreso     REAL    NOT NULL DEFAULT 0,
+            ganancia    REAL    NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, producto_id)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_horario (
+            dia     TEXT    NOT NULL,
+            hora    INTEGER NOT NULL,              -- 0–23
+            ventas  INTEGER NOT NULL DEFAULT 0,
+            total   REAL    NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, hora)
+        )""")
+    reconstruir_resumenes_reportes(conn)
+
+def _reconstruir_tabla(conn, tabla, definicion, montos):
+    """
+    Cambia el tipo de columnas que ALTER TABLE no puede cambiar: crea la tabla
+    con la definición nueva, copia los datos pasando las columnas de 'montos'
+    de pesos a centavos y la reemplaza. Índices y disparadores se vuelven a
+    crear igual que estaban. Requiere las llaves foráneas apagadas (ver _migrar).
+    """
+    columnas = _columnas(conn, tabla)
+    objetos  = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger')"
+        " AND sql IS NOT NULL", (tabla,))]
+    secuencia = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,)).fetchone()
+    origen = ", ".join(f"CAST(ROUND({c} * 100) AS INTEGER)" if c in montos else c
+                       for c in columnas)
+    conn.execute(f"CREATE TABLE {tabla}_nueva ({definicion})")
+    conn.execute(f"INSERT INTO {tabla}_nueva ({', '.join(columnas)}) SELECT {origen} FROM {tabla}")
+    conn.execute(f"DROP TABLE {tabla}")
+    conn.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+    for sql in objetos:
+        conn.execute(sql)
+    if secuencia:
+        # AUTOINCREMENT no debe reutilizar ids de filas que ya se borraron
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (secuencia[0], tabla))
+
+def _m7_centavos(conn):
+    """Montos en centavos enteros (ver dinero.py). Una columna REAL guarda
+    hasta los enteros como float, así que las tablas se reconstruyen con
+    columnas INTEGER; los resúmenes se recalculan desde el detalle ya
+    convertido."""
+    _reconstruir_tabla(conn, "productos", """
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo    TEXT    UNIQUE NOT NULL,
+        nombre    TEXT    NOT NULL,
+        precio    INTEGER NOT NULL DEFAULT 0,       -- centavos
+        costo     INTEGER NOT NULL DEFAULT 0,       -- centavos
+        stock     INTEGER NOT NULL DEFAULT 0,
+        categoria TEXT    DEFAULT 'General'
+    """, {"precio", "costo"})
+    _reconstruir_tabla(conn, "ventas", """
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha      TEXT    NOT NULL,
+        total      INTEGER NOT NULL DEFAULT 0,      -- centavos
+        uuid       TEXT
+    """, {"total"})
+    _reconstruir_tabla(conn, "detalle_venta", """
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        venta_id    INTEGER NOT NULL,
+        producto_id INTEGER NOT NULL,
+        nombre      TEXT    NOT NULL,
+        precio      INTEGER NOT NULL,               -- centavos
+        costo       INTEGER NOT NULL DEFAULT 0,     -- centavos
+        cantidad    INTEGER NOT NULL,
+        subtotal    INTEGER NOT NULL,               -- centavos
+        ganancia    INTEGER NOT NULL DEFAULT 0,     -- centavos
+        FOREIGN KEY (venta_id)    REFERENCES ventas(id),
+        FOREIGN KEY (producto_id) REFERENCES productos(id)
+    """, {"precio", "costo", "subtotal", "ganancia"})
+    conn.execute("DROP TABLE resumen_diario")
+    conn.execute("""
+        CREATE TABLE resumen_diario (
+            dia       TEXT    PRIMARY KEY,          -- 'YYYY-MM-DD'
+            ventas    INTEGER NOT NULL DEFAULT 0,
+            total     INTEGER NOT NULL DEFAULT 0,   -- centavos
+            ganancia  INTEGER NOT NULL DEFAULT 0    -- centavos
+        )""")
+    conn.execute("DROP TABLE resumen_producto_diario")
+    conn.execute("""
+        CREATE TABLE resumen_producto_diario (
+            dia         TEXT    NOT NULL,
+            producto_id INTEGER NOT NULL,
+            unidades    INTEGER NOT NULL DEFAULT 0,
+            ingreso     INTEGER NOT NULL DEFAULT 0, -- centavos
+            ganancia    INTEGER NOT NULL DEFAULT 0, -- centavos
+            PRIMARY KEY (dia, producto_id)
+        )""")
+    conn.execute("DROP TABLE resumen_horario")
+    conn.execute("""
+        CREATE TABLE resumen_horario (
+            dia     TEXT    NOT NULL,
+            hora    INTEGER NOT NULL,              -- 0–23
+            ventas  INTEGER NOT NULL DEFAULT 0,
+            total   INTEGER NOT NULL DEFAULT 0,    -- centavos
+            PRIMARY KEY (dia, hora)
+        )""")
+    reconstruir_resumen_diario(conn)
+    reconstruir_resumenes_reportes(conn)
+
+def _m8_compras(conn):
+    """Recepción de mercancía (ver registrar_compra): cada entrega del proveedor
+    es un documento con sus líneas. costo_anterior y stock_anterior guardan cómo
+    estaba el producto antes de recibir, para poder revisar el costo promedio."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS compras (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha      TEXT    NOT NULL,
+            proveedor  TEXT    NOT NULL DEFAULT '',
+            folio      TEXT,                        -- factura o remisión del proveedor
+            lineas     INTEGER NOT NULL DEFAULT 0,
+            unidades   INTEGER NOT NULL DEFAULT 0,
+            total      INTEGER NOT NULL DEFAULT 0   -- centavos
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS detalle_compra (
+            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+            compra_id      INTEGER NOT NULL,
+            producto_id    INTEGER NOT NULL,
+            cantidad       INTEGER NOT NULL,
+            costo          INTEGER NOT NULL,    -- centavos por unidad, de esta entrega
+            costo_anterior INTEGER NOT NULL,    -- centavos
+            stock_anterior INTEGER NOT NULL,
+            FOREIGN KEY (compra_id)   REFERENCES compras(id),
+            FOREIGN KEY (producto_id) REFERENCES productos(id)
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_compras_fecha ON compras(fecha)")
+    # La misma factura no se recibe dos veces (sin folio no se puede saber)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_compras_folio"
+                 " ON compras(proveedor, folio) WHERE folio IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_detalle_compra_compra ON detalle_compra(compra_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detalle_compra_producto ON detalle_compra(producto_id)")
+
+# La migración N (desde 1) deja la BD en user_version = N
+MIGRACIONES = [
+    _m1_tablas,
+    _m2_indices,
+    _m3_resumen_diario,
+    _m4_uuid_ventas,
+    _m5_cambios_productos,
+    _m6_resumenes_reportes,
+    _m7_centavos,
+    _m8_compras,
+]
+VERSION_ESQUEMA = len(MIGRACIONES)
+
+def version_esquema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def init_db():
+    """
+    Crea la BD o la pone al día aplicando las migraciones que falten, cada una
+    en su propia transacción junto con el nuevo user_version: si se corta a la
+    mitad, al abrir otra vez se repite solo la que no terminó.
+    """
+    conn = get_conn()
+    if version_esquema(conn) >= VERSION_ESQUEMA:
+        return   # Al día: nada que hacer
+    _migrar(conn)
+
+@con_reintentos
+def _migrar(conn):
+    # Reconstruir una tabla (ver _reconstruir_tabla) requiere las llaves foráneas
+    # apagadas, y solo se pueden cambiar fuera de una transacción
+    llaves = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for numero, migracion in enumerate(MIGRACIONES, 1):
+            with transaccion(conn):
+                # Se vuelve a leer con el candado tomado: si otra caja arrancó al
+                # mismo tiempo y ya la aplicó, aquí se salta
+                if version_esquema(conn) >= numero:
+                    continue
+                migracion(conn)
+                conn.execute(f"PRAGMA user_version = {numero}")
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {llaves}")
+
+def _archivado_hasta(conn):
+    """Los días anteriores a esta fecha ya no están en ventas (ver
+    archivar_ventas): sus resúmenes se conservan al reconstruir y solo se
+    recalculan los días desde esta fecha."""
+    fila = conn.execute(
+        "SELECT valor FROM configuracion WHERE clave = 'archivado_hasta'").fetchone()
+    return fila[0] if fila else ""
+
+def reconstruir_resumen_diario(conn):
+    """
+    Recalcula resumen_diario desde ventas/detalle_venta. Se ejecuta una vez al
+    actualizar una BD antigua; también sirve para reparar el resumen a mano.
+    La ganancia se suma por venta antes del JOIN para no repetir cada total
+    una vez por línea de detalle.
+    """
+    archivado_hasta = _archivado_hasta(conn)
+    conn.execute("DELETE FROM resumen_diario WHERE dia >= ?", (archivado_hasta,))
+    conn.execute("""
+        INSERT INTO resumen_diario (dia, ventas, total, ganancia)
+        SELECT substr(v.fecha, 1, 10), COUNT(*), SUM(v.total), IFNULL(SUM(g.ganancia), 0)
+        FROM ventas v
+        LEFT JOIN (SELECT venta_id, SUM(ganancia) AS ganancia
+                   FROM detalle_venta GROUP BY venta_id) g ON g.venta_id = v.id
+        WHERE v.fecha >= ?
+        GROUP BY substr(v.fecha, 1, 10)
+    """, (archivado_hasta,))
+
+def reconstruir_resumenes_reportes(conn):
+    """Recalcula resumen_producto_diario y resumen_horario desde las ventas."""
+    archivado_hasta = _archivado_hasta(conn)
+    conn.execute("DELETE FROM resumen_producto_diario WHERE dia >= ?", (archivado_hasta,))
+    conn.execute("""
+        INSERT INTO resumen_producto_diario (dia, producto_id, unidades, ingreso, ganancia)
+        SELECT substr(v.fecha, 1, 10), d.producto_id,
+               SUM(d.cantidad), SUM(d.subtotal), SUM(d.ganancia)
+        FROM detalle_venta d JOIN ventas v ON v.id = d.venta_id
+        WHERE v.fecha >= ?
+        GROUP BY substr(v.fecha, 1, 10), d.producto_id
+    """, (archivado_hasta,))
+    conn.execute("DELETE FROM resumen_horario WHERE dia >= ?", (archivado_hasta,))
+    conn.execute("""
+        INSERT INTO resumen_horario (dia, hora, ventas, total)
+        SELECT substr(fecha, 1, 10), CAST(substr(fecha, 12, 2) AS INTEGER), COUNT(*), SUM(total)
+        FROM ventas
+        WHERE fecha >= ?
+        GROUP BY substr(fecha, 1, 10), CAST(substr(fecha, 12, 2) AS INTEGER)
+    """, (archivado_hasta,))
+
+# ──────────────────────────────────────────────────────────
+#  CONFIGURACIÓN
+# ──────────────────────────────────────────────────────────
+def get_config(clave):
+    """Lee un valor de la tabla configuracion. Retorna None si la clave no existe."""
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT valor FROM configuracion WHERE clave = ?", (clave,)
+        ).fetchone()
+    return row[0] if row else None
+
+@con_reintentos
+def set_config(clave, valor):
+    """Guarda o actualiza un valor de configuración (INSERT OR REPLACE)."""
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)",
+            (clave, valor)
+        )
+
+def get_admin_hash():
+    """Lee el hash de contraseña guardado en BD. Retorna None si aún no se ha creado."""
+    return get_config("admin_hash")
+
+def set_admin_hash(nuevo_hash):
+    """Guarda o actualiza el hash en BD (INSERT OR REPLACE)."""
+    set_config("admin_hash", nuevo_hash)
+
+# La interfaz usa estas tres y no el hash: así servidor.py puede ofrecerlas
+# a las cajas sin que el hash salga nunca de la BD.
+def hay_admin():
+    """True si ya se creó la contraseña de administrador."""
+    return get_admin_hash() is not None
+
+def verificar_admin(clave):
+    """True si 'clave' es la contraseña de administrador."""
+    guardado = get_admin_hash()
+    return guardado is not None and hmac.compare_digest(guardado, _hash(clave or ""))
+
+def cambiar_admin(nueva, actual=None):
+    """
+    Crea la contraseña de administrador o, si ya existe, la cambia: entonces
+    'actual' tiene que ser la vigente. Lanza PermissionError si no lo es.
+    """
+    if hay_admin() and not verificar_admin(actual):
+        raise PermissionError("La contraseña actual no es correcta.")
+    set_admin_hash(_hash(nueva))
+
+# ──────────────────────────────────────────────────────────
+#  PRODUCTOS
+# ──────────────────────────────────────────────────────────
+def listar_productos():
+    """Catálogo para la pantalla de ventas: (id, codigo, nombre, precio, costo, stock)."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT id,codigo,nombre,precio,costo,stock FROM productos ORDER BY nombre"
+        ).fetchall()
+
+def obtener_producto(producto_id):
+    """Un producto en el mismo formato que listar_productos(), o None si no existe."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT id,codigo,nombre,precio,costo,stock FROM productos WHERE id=?",
+            (producto_id,)).fetchone()
+
+def listar_productos_admin():
+    """Catálogo completo para la página Productos:
+    (id, codigo, nombre, costo, precio, stock, categoria)."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT id,codigo,nombre,costo,precio,stock,categoria FROM productos ORDER BY nombre"
+        ).fetchall()
+
+def version_productos():
+    """Versión actual del catálogo: aumenta con cada alta, cambio o baja de un
+    producto (incluido el stock que descuenta una venta)."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT IFNULL(MAX(version), 0) FROM productos_cambios").fetchone()[0]
+
+def cambios_productos(desde_version):
+    """
+    Lo que cambió en el catálogo después de 'desde_version':
+    (version, filas, eliminados), con filas en el formato de
+    listar_productos_admin() y eliminados como lista de ids.
+
+    Para una copia completa y al día: leer version_productos() ANTES de
+    listar_productos_admin() y luego pedir los cambios desde esa versión.
+    Si algo cambió entre ambas lecturas llega dos veces, y aplicarlo de
+    nuevo no hace daño.
+    """
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT c.version, c.producto_id,"
+            " p.id, p.codigo, p.nombre, p.costo, p.precio, p.stock, p.categoria"
+            " FROM productos_cambios c LEFT JOIN productos p ON p.id = c.producto_id"
+            " WHERE c.version > ? ORDER BY c.version", (desde_version,)).fetchall()
+    filas      = [r[2:] for r in rows if r[2] is not None]
+    eliminados = [r[1] for r in rows if r[2] is None]
+    return (rows[-1][0] if rows else desde_version), filas, eliminados
+
+@con_reintentos
+def guardar_producto(codigo, nombre, costo, precio, stock, categoria, producto_id=None):
+    """
+    Inserta un producto nuevo o actualiza uno existente (si se pasa producto_id).
+    costo y precio en centavos. Lanza sqlite3.IntegrityError si el código ya
+    pertenece a otro producto. Retorna el id del producto.
+    """
+    with get_conn() as conn:
+        if producto_id:
+            conn.execute(
+                "UPDATE productos SET codigo=?,nombre=?,costo=?,precio=?,stock=?,categoria=?"
+                " WHERE id=?",
+                (codigo, nombre, costo, precio, stock, categoria, producto_id))
+            return producto_id
+        cur = conn.execute(
+            "INSERT INTO productos (codigo,nombre,costo,precio,stock,categoria)"
+            " VALUES (?,?,?,?,?,?)",
+            (codigo, nombre, costo, precio, stock, categoria))
+        return cur.lastrowid
+
+COLUMNAS_PRODUCTO = ("codigo", "nombre", "costo", "precio", "stock", "categoria")
+
+@con_reintentos
+def upsert_productos(columnas, filas):
+    """
+    Inserta o actualiza por código un lote de productos, en UNA transacción
+    (ver importacion.py).
+
+    columnas: columnas de COLUMNAS_PRODUCTO presentes en el archivo, 'codigo'
+              primero. Solo esas se modifican en los productos existentes:
+              una lista de precios con codigo y precio no toca stock ni nombre.
+    filas:    tuplas en el orden de 'columnas', con códigos no repetidos.
+
+    Retorna (insertadas, actualizadas, sin_alta): sin_alta son los índices de
+    filas con código nuevo que no se pueden dar de alta porque el archivo no
+    trae nombre.
+    """
+    columnas = list(columnas)
+    if not filas:
+        return 0, 0, []
+    conn = get_conn()
+    with transaccion(conn):
+        existentes = set()
+        codigos = [f[0] for f in filas]
+        for i in range(0, len(codigos), 500):   # Límite de parámetros por consulta
+            trozo = codigos[i:i + 500]
+            existentes.update(r[0] for r in conn.execute(
+                f"SELECT codigo FROM productos WHERE codigo IN ({','.join('?' * len(trozo))})",
+                trozo))
+        nuevas     = [f for f in filas if f[0] not in existentes]
+        actualizar = [f for f in filas if f[0] in existentes]
+        sin_alta   = []
+        if nuevas and "nombre" not in columnas:
+            sin_alta = [i for i, f in enumerate(filas) if f[0] not in existentes]
+            nuevas = []
+        if nuevas:
+            conn.executemany(
+                f"INSERT INTO productos ({','.join(columnas)})"
+                f" VALUES ({','.join('?' * len(columnas))})", nuevas)
+        if actualizar and len(columnas) > 1:
+            conn.executemany(
+                f"UPDATE productos SET {', '.join(c + '=?' for c in columnas[1:])}"
+                " WHERE codigo=?", [(*f[1:], f[0]) for f in actualizar])
+    return len(nuevas), len(actualizar), sin_alta
+
+def iterar_productos(tamano=1000):
+    """Todos los productos en el formato de listar_productos_admin(), por código,
+    sin cargarlos completos en memoria (ver iterar_consulta)."""
+    return iterar_consulta(
+        "SELECT id,codigo,nombre,costo,precio,stock,categoria FROM productos ORDER BY codigo",
+        tamano=tamano)
+
+@con_reintentos
+def eliminar_producto(producto_id):
+    """Lanza sqlite3.IntegrityError si el producto aparece en ventas o compras
+    registradas (con foreign_keys=ON el historial no puede quedar apuntando a
+    la nada)."""
+    with get_conn() as conn:
+        conn.execute("DELETE FROM productos WHERE id=?", (producto_id,))
+
+# ──────────────────────────────────────────────────────────
+#  VENTAS
+# ──────────────────────────────────────────────────────────
+class StockInsuficiente(Exception):
+    """Al momento de cobrar, una o más líneas piden más unidades de las que hay.
+    faltantes: [(producto_id, nombre, pedido, disponible), ...]"""
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__("; ".join(f"{nombre}: pide {pedido}, hay {disponible}"
+                                   for _, nombre, pedido, disponible in faltantes))
+
+@con_reintentos
+def registrar_venta(items, fecha=None, uuid=None):
+    """
+    Registra una venta con sus líneas, descuenta el stock y actualiza
+    resumen_diario, todo en una sola transacción BEGIN IMMEDIATE.
+
+    items: iterable de dicts con las llaves id, nombre, precio, costo, cantidad
+           (el mismo formato que usa el carrito de la interfaz; montos en centavos).
+    fecha: 'YYYY-MM-DD HH:MM:SS'; por defecto, el momento actual.
+    uuid:  identificador opcional de la venta; si ya existe una venta con ese
+           uuid no se registra otra vez y se retorna la existente.
+
+    El stock se descuenta con 'WHERE stock >= cantidad': si alguna línea dejaría
+    el stock en negativo (p. ej. otra terminal vendió lo último), no se guarda
+    nada y se lanza StockInsuficiente.
+
+    Retorna (venta_id, total).
+    """
+    items = list(items)
+    conn = get_conn()
+    try:
+        with transaccion(conn):
+            return insertar_venta(conn, items, fecha, uuid)
+    except StockInsuficiente:
+        raise StockInsuficiente(_faltantes(conn, items)) from None
+
+def insertar_venta(conn, items, fecha=None, uuid=None, forzar=False):
+    """
+    El trabajo de registrar_venta sin abrir ni cerrar la transacción: quien
+    llama ya hizo BEGIN (o SAVEPOINT) y decide si confirma. Así el servidor
+    puede agrupar varias ventas en un solo COMMIT (ver servidor.py).
+
+    Lanza StockInsuficiente con la lista vacía; el detalle se arma con
+    _faltantes() después de deshacer, cuando el stock ya es el real.
+    forzar=True descuenta el stock aunque quede negativo (ventas que ya se
+    entregaron en caja, ver registrar_lote).
+
+    Una venta con fecha anterior a archivado_hasta (p. ej. del diario de una
+    caja que estuvo mucho tiempo sin conexión) se acepta: se suma a los
+    resúmenes de su día, que se conservan, y queda en ventas hasta que el
+    siguiente archivar_ventas la pase a su año.
+    """
+    if not items:
+        raise ValueError("La venta no tiene líneas.")
+    if uuid is not None:
+        ya = conn.execute("SELECT id, total FROM ventas WHERE uuid = ?", (uuid,)).fetchone()
+        if ya:
+            return ya
+    if fecha is None:
+        fecha = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    total = sum(i["precio"] * i["cantidad"] for i in items)
+    ganancia_total = 0
+    lineas = []
+    pedido = _pedido(items)
+    for item in items:
+        sub      = item["precio"] * item["cantidad"]
+        ganancia = (item["precio"] - item["costo"]) * item["cantidad"]
+        ganancia_total += ganancia
+        lineas.append((item["id"], item["nombre"], item["precio"], item["costo"],
+                       item["cantidad"], sub, ganancia))
+
+    if forzar:
+        conn.executemany("UPDATE productos SET stock = stock - ? WHERE id = ?",
+                         [(cant, pid) for pid, cant in pedido.items()])
+    else:
+        cur = conn.executemany(
+            "UPDATE productos SET stock = stock - ? WHERE id = ? AND stock >= ?",
+            [(cant, pid, cant) for pid, cant in pedido.items()])
+        if cur.rowcount != len(pedido):
+            raise StockInsuficiente([])
+    venta_id = conn.execute("INSERT INTO ventas (fecha,total,uuid) VALUES (?,?,?)",
+                            (fecha, total, uuid)).lastrowid
+    conn.executemany(
+        "INSERT INTO detalle_venta"
+        " (venta_id,producto_id,nombre,precio,costo,cantidad,subtotal,ganancia)"
+        " VALUES (?,?,?,?,?,?,?,?)",
+        [(venta_id, *linea) for linea in lineas])
+    por_producto = {}
+    for pid, _, _, _, cantidad, sub, ganancia in lineas:
+        acum = por_producto.setdefault(pid, [0, 0, 0])
+        acum[0] += cantidad
+        acum[1] += sub
+        acum[2] += ganancia
+    _acumular_resumenes(conn, fecha, total, ganancia_total, por_producto, 1)
+    return venta_id, total
+
+def _acumular_resumenes(conn, fecha, total, ganancia, por_producto, signo):
+    """
+    Suma (signo=1, venta nueva) o resta (signo=-1, venta eliminada) una venta
+    en resumen_diario, resumen_producto_diario y resumen_horario.
+    por_producto: {producto_id: (unidades, ingreso, ganancia)}.
+    """
+    dia, hora = fecha[:10], int(fecha[11:13])
+    conn.execute(
+        "INSERT INTO resumen_diario (dia, ventas, total, ganancia) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT(dia) DO UPDATE SET ventas = ventas + excluded.ventas,"
+        " total = total + excluded.total, ganancia = ganancia + excluded.ganancia",
+        (dia, signo, signo * total, signo * ganancia))
+    conn.executemany(
+        "INSERT INTO resumen_producto_diario (dia, producto_id, unidades, ingreso, ganancia)"
+        " VALUES (?, ?, ?, ?, ?) ON CONFLICT(dia, producto_id) DO UPDATE SET"
+        " unidades = unidades + excluded.unidades, ingreso = ingreso + excluded.ingreso,"
+        " ganancia = ganancia + excluded.ganancia",
+        [(dia, pid, signo * u, signo * i, signo * g)
+         for pid, (u, i, g) in por_producto.items()])
+    conn.execute(
+        "INSERT INTO resumen_horario (dia, hora, ventas, total) VALUES (?, ?, ?, ?)"
+        " ON CONFLICT(dia, hora) DO UPDATE SET ventas = ventas + excluded.ventas,"
+        " total = total + excluded.total",
+        (dia, hora, signo, signo * total))
+
+@con_reintentos
+def registrar_lote(ventas):
+    """
+    Guarda en UNA transacción un lote de ventas ya cobradas en caja (el diario
+    de ventas pendientes, ver diario.py).
+
+    ventas: [(uuid, items, fecha), ...]. Las que ya estaban guardadas (mismo
+    uuid) se reconocen y no se duplican, así reenviar un lote tras una caída
+    es seguro. Como la mercancía ya se entregó, el stock se descuenta aunque
+    quede negativo; las líneas que no alcanzaban se reportan.
+
+    Retorna [(venta_id, faltantes), ...] en el mismo orden, con faltantes en
+    el formato de StockInsuficiente (vacío si había stock suficiente).
+    """
+    conn = get_conn()
+    resultados = []
+    with transaccion(conn):
+        for uuid, items, fecha in ventas:
+            ya = conn.execute("SELECT id FROM ventas WHERE uuid = ?", (uuid,)).fetchone()
+            if ya:
+                resultados.append((ya[0], []))
+                continue
+            faltantes = _faltantes(conn, items)
+            venta_id, _ = insertar_venta(conn, items, fecha, uuid, forzar=True)
+            resultados.append((venta_id, faltantes))
+    return resultados
+
+def _pedido(items):
+    """producto_id → unidades (por si un producto viene en varias líneas)."""
+    pedido = {}
+    for item in items:
+        pedido[item["id"]] = pedido.get(item["id"], 0) + item["cantidad"]
+    return pedido
+
+def _faltantes(conn, items):
+    pedido  = _pedido(items)
+    nombres = {i["id"]: i["nombre"] for i in items}
+    marcas  = ",".join("?" * len(pedido))
+    stock   = dict(conn.execute(
+        f"SELECT id, stock FROM productos WHERE id IN ({marcas})", list(pedido)).fetchall())
+    return [(pid, nombres[pid], cant, stock.get(pid, 0))
+            for pid, cant in pedido.items() if stock.get(pid, 0) < cant]
+
+PAGINA_HISTORIAL = 200
+
+def rango_de_fechas(texto):
+    """
+    Convierte lo escrito en el filtro del historial en un rango semiabierto
+    [desde, hasta) comparable contra ventas.fecha ('YYYY-MM-DD HH:MM:SS').
+    Acepta 'YYYY', 'YYYY-MM' o 'YYYY-MM-DD'. Retorna None si el texto está
+    incompleto o no es una fecha válida (p. ej. mientras se escribe '2024-0').
+    """
+    texto = texto.strip()
+    try:
+        if len(texto) == 4:
+            anio = int(texto)
+            return f"{anio:04d}", f"{anio + 1:04d}"
+        if len(texto) == 7:
+            d = datetime.date(int(texto[:4]), int(texto[5:7]), 1)
+            sig = datetime.date(d.year + d.month // 12, d.month % 12 + 1, 1)
+            return d.strftime("%Y-%m"), sig.strftime("%Y-%m")
+        if len(texto) == 10:
+            d = datetime.date.fromisoformat(texto)
+            return d.isoformat(), (d + datetime.timedelta(days=1)).isoformat()
+    except ValueError:
+        pass
+    return None
+
+def _filtro_fechas(desde, hasta, columna="fecha"):
+    """Condiciones SQL y parámetros para el rango semiabierto [desde, hasta)."""
+    condiciones, params = [], []
+    if desde is not None:
+        condiciones.append(f"{columna} >= ?")
+        params.append(desde)
+    if hasta is not None:
+        condiciones.append(f"{columna} < ?")
+        params.append(hasta)
+    return condiciones, params
+
+def listar_ventas(desde=None, hasta=None, despues_de=None, limite=PAGINA_HISTORIAL):
+    """
+    Una página de ventas, más recientes primero: [(id, fecha, total), ...].
+
+    desde/hasta: rango semiabierto sobre fecha (ver rango_de_fechas); None = sin límite.
+    despues_de:  (fecha, id) de la última fila de la página anterior — paginación
+                 por llave (keyset): cada página cuesta lo mismo sin importar qué
+                 tan atrás esté, porque recorre el índice idx_ventas_fecha desde
+                 ese punto en vez de saltarse filas con OFFSET.
+    """
+    condiciones, params = _filtro_fechas(desde, hasta)
+    if despues_de is not None:
+        condiciones.append("(fecha, id) < (?, ?)")
+        params.extend(despues_de)
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with get_conn() as conn:
+        return conn.execute(
+            f"SELECT id,fecha,total FROM ventas{where}"
+            " ORDER BY fecha DESC, id DESC LIMIT ?",
+            (*params, limite)).fetchall()
+
+COLUMNAS_VENTA   = ("id", "uuid", "fecha", "total")
+COLUMNAS_DETALLE = ("venta_id", "fecha", "producto_id", "nombre", "precio", "costo",
+                    "cantidad", "subtotal", "ganancia")
+
+def _iterar_con_archivo(sql, params, tamano, desde, hasta, archivadas):
+    # Cada año archivado es anterior a todo lo que queda en ventas: leer los
+    # archivos en orden y después la BD principal conserva el orden por fecha
+    rutas = archivos_del_rango(desde, hasta) if archivadas else []
+    return itertools.chain(*[iterar_consulta(sql, params, tamano, ruta) for ruta in rutas],
+                           iterar_consulta(sql, params, tamano))
+
+def iterar_ventas(desde=None, hasta=None, tamano=5000, archivadas=False):
+    """Ventas del rango, más antiguas primero, en el orden de COLUMNAS_VENTA.
+    Se leen por partes (ver iterar_consulta): sirve para un año completo.
+    archivadas=True incluye las de los años archivados (ver archivar_ventas)."""
+    condiciones, params = _filtro_fechas(desde, hasta)
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return _iterar_con_archivo(
+        f"SELECT id,uuid,fecha,total FROM ventas{where} ORDER BY fecha, id",
+        params, tamano, desde, hasta, archivadas)
+
+def iterar_detalle(desde=None, hasta=None, tamano=5000, archivadas=False):
+    """Líneas de las ventas del rango, en el orden de COLUMNAS_DETALLE. Recorre
+    ventas por idx_ventas_fecha y sus líneas por idx_detalle_venta_venta, así
+    no hace falta ordenar todo el rango en memoria."""
+    condiciones, params = _filtro_fechas(desde, hasta, "v.fecha")
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return _iterar_con_archivo(
+        "SELECT d.venta_id, v.fecha, d.producto_id, d.nombre, d.precio, d.costo,"
+        " d.cantidad, d.subtotal, d.ganancia"
+        f" FROM ventas v JOIN detalle_venta d ON d.venta_id = v.id{where}"
+        " ORDER BY v.fecha, v.id", params, tamano, desde, hasta, archivadas)
+
+def kpis_del_dia(dia=None):
+    """Indicadores de un día ('YYYY-MM-DD', por defecto hoy):
+    (número de ventas, total vendido, ganancia)."""
+    if dia is None:
+        dia = datetime.date.today().isoformat()
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT ventas, total, ganancia FROM resumen_diario WHERE dia = ?",
+            (dia,)).fetchone()
+    return row or (0, 0, 0)
+
+def detalle_de_venta(venta_id):
+    """Líneas de una venta: (nombre, cantidad, precio, subtotal, ganancia)."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT nombre,cantidad,precio,subtotal,ganancia FROM detalle_venta"
+            " WHERE venta_id=?", (venta_id,)).fetchall()
+
+def eliminar_venta(venta_id, clave=None):
+    """
+    Elimina una venta y su detalle en una transacción atómica, descontándola
+    de los resúmenes. Lanza sqlite3.Error si la BD falla; en ese caso no se
+    modifica nada. clave: si se da, tiene que ser la contraseña de
+    administrador (PermissionError si no); servidor.py la exige siempre.
+    """
+    if clave is not None and not verificar_admin(clave):
+        raise PermissionError("Contraseña de administrador incorrecta.")
+    _eliminar_venta(venta_id)
+
+@con_reintentos
+def _eliminar_venta(venta_id):
+    conn = get_conn()
+    with transaccion(conn):
+        venta = conn.execute(
+            "SELECT fecha, total FROM ventas WHERE id = ?", (venta_id,)).fetchone()
+        if venta is None:
+            return
+        por_producto = {pid: (u, i, g) for pid, u, i, g in conn.execute(
+            "SELECT producto_id, SUM(cantidad), SUM(subtotal), SUM(ganancia)"
+            " FROM detalle_venta WHERE venta_id = ? GROUP BY producto_id", (venta_id,))}
+        ganancia = sum(g for _, _, g in por_producto.values())
+        # ORDEN CRÍTICO: primero el detalle (FK hijo), luego la cabecera (FK padre)
+        # Si se invirtiera el orden, SQLite lanzaría un error de integridad referencial.
+        conn.execute(
+            "DELETE FROM detalle_venta WHERE venta_id = ?", (venta_id,)
+        )
+        conn.execute(
+            "DELETE FROM ventas WHERE id = ?", (venta_id,)
+        )
+        _acumular_resumenes(conn, venta[0], venta[1], ganancia, por_producto, -1)
+        # transaccion() hace COMMIT al salir sin excepciones y ROLLBACK si algo
+        # falla aquí dentro, dejando la BD intacta.
+
+
+# ──────────────────────────────────────────────────────────
+#  COMPRAS  (recepción de mercancía)
+#  Única forma de SUMAR stock además de editar el producto:
+#  la entrega entera se aplica en una transacción y con unas
+#  pocas sentencias, sin importar cuántas líneas traiga.
+# ──────────────────────────────────────────────────────────
+ENTERO_MAX = 2 ** 63 - 1   # el INTEGER más grande de SQLite
+
+def registrar_compra(lineas, proveedor="", folio=None, fecha=None):
+    """
+    Registra una entrega de un proveedor: suma las cantidades al stock y
+    actualiza el costo de cada producto con el costo promedio ponderado
+        (existencia × costo actual + cantidad × costo de la entrega)
+        / (existencia + cantidad)
+    (un stock negativo cuenta como cero: esas unidades ya se vendieron).
+
+    lineas: iterable de (codigo, cantidad, costo) con costo en centavos por
+            unidad; un código repetido se suma (y su costo se promedia).
+    folio:  factura o remisión; si ya se recibió una con el mismo proveedor y
+            folio, lanza ValueError y no modifica nada.
+
+    Las líneas van a una tabla temporal con un solo executemany y de ahí, con
+    un INSERT … SELECT y un UPDATE, al detalle y a productos: miles de líneas
+    cuestan unas cuantas sentencias, no una por línea. Todo o nada: si algún
+    código no existe o alguna línea es inválida lanza ValueError sin tocar la BD.
+
+    Retorna (compra_id, lineas, unidades, total en centavos).
+    """
+    filas = []
+    for codigo, cantidad, costo in lineas:
+        # type() y no isinstance(): True / False no son cantidades
+        if type(cantidad) is not int or cantidad <= 0:
+            raise ValueError(f"{codigo}: la cantidad debe ser un entero mayor que 0")
+        if type(costo) is not int or costo < 0:
+            raise ValueError(f"{codigo}: el costo debe ser un entero de centavos ≥ 0")
+        if cantidad * costo > ENTERO_MAX:
+            raise ValueError(f"{codigo}: cantidad o costo demasiado grandes")
+        filas.append((str(codigo).strip(), cantidad, cantidad * costo))
+    if not filas:
+        raise ValueError("La compra no tiene líneas.")
+    folio = (folio or "").strip() or None
+    fecha = fecha or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return _recibir(filas, proveedor, folio, fecha)
+
+@con_reintentos
+def _recibir(filas, proveedor, folio, fecha):
+    conn = get_conn()
+    with transaccion(conn):
+        if folio is not None:
+            ya = conn.execute("SELECT id FROM compras WHERE proveedor = ? AND folio = ?",
+                              (proveedor, folio)).fetchone()
+            if ya:
+                raise ValueError(f"La compra {folio} de {proveedor or 'este proveedor'}"
+                                 f" ya se registró (#{ya[0]}).")
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS recepcion (
+                codigo   TEXT PRIMARY KEY,
+                cantidad INTEGER NOT NULL,
+                importe  INTEGER NOT NULL      -- centavos: cantidad × costo
+            )""")
+        conn.execute("DELETE FROM temp.recepcion")
+        conn.executemany(
+            "INSERT INTO temp.recepcion (codigo, cantidad, importe) VALUES (?, ?, ?)"
+            " ON CONFLICT (codigo) DO UPDATE SET cantidad = cantidad + excluded.cantidad,"
+            "                                    importe  = importe  + excluded.importe",
+            filas)
+        desconocidos = [r[0] for r in conn.execute(
+            "SELECT codigo FROM temp.recepcion WHERE codigo NOT IN (SELECT codigo FROM productos)"
+            " ORDER BY codigo LIMIT 21")]
+        if desconocidos:
+            raise ValueError("Códigos que no existen en productos: " + ", ".join(desconocidos[:20])
+                             + (" …" if len(desconocidos) > 20 else ""))
+        n, unidades, total = conn.execute(
+            "SELECT COUNT(*), SUM(cantidad), SUM(importe) FROM temp.recepcion").fetchone()
+        compra_id = conn.execute(
+            "INSERT INTO compras (fecha, proveedor, folio, lineas, unidades, total)"
+            " VALUES (?, ?, ?, ?, ?, ?)", (fecha, proveedor, folio, n, unidades, total)).lastrowid
+        # Primero el detalle, que guarda costo y stock de ANTES de recibir.
+        # Los redondeos son a medio centavo hacia arriba, en enteros.
+        conn.execute("""
+            INSERT INTO detalle_compra
+                (compra_id, producto_id, cantidad, costo, costo_anterior, stock_anterior)
+            SELECT ?, p.id, r.cantidad, (2 * r.importe + r.cantidad) / (2 * r.cantidad),
+                   p.costo, p.stock
+            FROM temp.recepcion r JOIN productos p ON p.codigo = r.codigo
+        """, (compra_id,))
+        conn.execute("""
+            UPDATE productos SET
+                costo = (SELECT (2 * (MAX(productos.stock, 0) * productos.costo + r.importe)
+                                 + MAX(productos.stock, 0) + r.cantidad)
+                                / (2 * (MAX(productos.stock, 0) + r.cantidad))
+                         FROM temp.recepcion r WHERE r.codigo = productos.codigo),
+                stock = stock + (SELECT r.cantidad FROM temp.recepcion r
+                                 WHERE r.codigo = productos.codigo)
+            WHERE codigo IN (SELECT codigo FROM temp.recepcion)
+        """)
+        conn.execute("DELETE FROM temp.recepcion")
+    return compra_id, n, unidades, total
+
+def listar_compras(desde=None, hasta=None, limite=PAGINA_HISTORIAL):
+    """Compras más recientes primero: [(id, fecha, proveedor, folio, lineas, unidades, total)]."""
+    condiciones, params = _filtro_fechas(desde, hasta)
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT id, fecha, proveedor, folio, lineas, unidades, total"
+            f" FROM compras{where} ORDER BY fecha DESC, id DESC LIMIT ?",
+            (*params, limite)).fetchall()
+
+def detalle_de_compra(compra_id):
+    """Líneas de una compra: (codigo, nombre, cantidad, costo, costo_anterior,
+    stock_anterior)."""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT p.codigo, p.nombre, d.cantidad, d.costo, d.costo_anterior, d.stock_anterior"
+            " FROM detalle_compra d JOIN productos p ON p.id = d.producto_id"
+            " WHERE d.compra_id = ? ORDER BY d.id", (compra_id,)).fetchall()
+
+
+# ──────────────────────────────────────────────────────────
+#  REPORTES
+#  Se leen de resumen_producto_diario / resumen_horario, no
+#  de detalle_venta: el costo depende de los días del rango,
+#  no de cuántas ventas hubo.
+# ──────────────────────────────────────────────────────────
+ORDEN_TOP = ("unidades", "ingreso", "ganancia")
+
+def top_productos(desde=None, hasta=None, por="unidades", limite=10):
+    """
+    Los 'limite' productos que más vendieron en [desde, hasta), ordenados
+    por 'por' (unidades, ingreso o ganancia):
+    [(producto_id, nombre, categoria, unidades, ingreso, ganancia), ...].
+    """
+    if por not in ORDEN_TOP:
+        raise ValueError(f"Orden no válido: {por} (usa {', '.join(ORDEN_TOP)})")
+    condiciones, params = _filtro_fechas(desde, hasta, "dia")
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with get_conn() as conn:
+        # Primero se agrupa y se corta, luego se buscan nombres: solo 'limite' búsquedas
+        return conn.execute(
+            "SELECT t.producto_id, IFNULL(p.nombre, '?'), IFNULL(p.categoria, 'General'),"
+            " t.unidades, t.ingreso, t.ganancia FROM ("
+            "   SELECT producto_id, SUM(unidades) AS unidades, SUM(ingreso) AS ingreso,"
+            "          SUM(ganancia) AS ganancia"
+            f"  FROM resumen_producto_diario{where}"
+            f"  GROUP BY producto_id ORDER BY {por} DESC LIMIT ?"
+            " ) t LEFT JOIN productos p ON p.id = t.producto_id"
+            f" ORDER BY t.{por} DESC", (*params, limite)).fetchall()
+
+def mapa_horario(desde=None, hasta=None):
+    """
+    Ventas por día de la semana y hora en [desde, hasta):
+    [(dia_semana, hora, ventas, total), ...], dia_semana 0 = domingo … 6 = sábado.
+    Solo vienen las combinaciones con ventas.
+    """
+    condiciones, params = _filtro_fechas(desde, hasta, "dia")
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT CAST(strftime('%w', dia) AS INTEGER) AS dia_semana, hora,"
+            " SUM(ventas), SUM(total)"
+            f" FROM resumen_horario{where}"
+            " GROUP BY dia_semana, hora ORDER BY dia_semana, hora", params).fetchall()
+
+def margenes_por_categoria(desde=None, hasta=None):
+    """
+    Ventas por categoría en [desde, hasta), de mayor a menor ganancia:
+    [(categoria, unidades, ingreso, ganancia), ...]. La categoría es la
+    actual del producto.
+    """
+    condiciones, params = _filtro_fechas(desde, hasta, "dia")
+    where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT IFNULL(p.categoria, 'General') AS categoria, SUM(t.unidades),"
+            " SUM(t.ingreso), SUM(t.ganancia) AS ganancia FROM ("
+            "   SELECT producto_id, SUM(unidades) AS unidades, SUM(ingreso) AS ingreso,"
+            "          SUM(ganancia) AS ganancia"
+            f"  FROM resumen_producto_diario{where} GROUP BY producto_id"
+            " ) t LEFT JOIN productos p ON p.id = t.producto_id"
+            " GROUP BY categoria ORDER BY ganancia DESC", params).fetchall()
+
+
+# ──────────────────────────────────────────────────────────
+#  ARCHIVO DE VENTAS ANTIGUAS
+#  Las ventas anteriores a un horizonte pasan de ventas /
+#  detalle_venta a una BD por año (archivo/ventas_2023.db junto
+#  a ventas.db), con las mismas tablas: se puede abrir o hacer
+#  ATTACH para consultarla. Los resúmenes se quedan en la BD
+#  principal, así KPIs y reportes no cambian; el historial
+#  muestra solo lo no archivado y la exportación lo incluye si
+#  se pide (iterar_ventas(..., archivadas=True)).
+# ──────────────────────────────────────────────────────────
+LOTE_ARCHIVO = 2000   # ventas por transacción al archivar
+
+_ESQUEMA_ARCHIVO = (
+    """CREATE TABLE IF NOT EXISTS archivo.ventas (
+           id     INTEGER PRIMARY KEY,
+           fecha  TEXT    NOT NULL,
+           total  INTEGER NOT NULL,          -- centavos
+           uuid   TEXT
+       )""",
+    """CREATE TABLE IF NOT EXISTS archivo.detalle_venta (
+           id          INTEGER PRIMARY KEY,
+           venta_id    INTEGER NOT NULL,
+           producto_id INTEGER NOT NULL,
+           nombre      TEXT    NOT NULL,
+           precio      INTEGER NOT NULL,     -- centavos
+           costo       INTEGER NOT NULL,     -- centavos
+           cantidad    INTEGER NOT NULL,
+           subtotal    INTEGER NOT NULL,     -- centavos
+           ganancia    INTEGER NOT NULL      -- centavos
+       )""",
+    "CREATE INDEX IF NOT EXISTS archivo.idx_ventas_fecha ON ventas(fecha)",
+    "CREATE INDEX IF NOT EXISTS archivo.idx_detalle_venta_venta ON detalle_venta(venta_id)",
+)
+
+def carpeta_archivo():
+    return os.path.join(os.path.dirname(DB_FILE), "archivo")
+
+def ruta_archivo(anio):
+    base = os.path.splitext(os.path.basename(DB_FILE))[0]
+    return os.path.join(carpeta_archivo(), f"{base}_{anio:04d}.db")
+
+def anios_archivados():
+    """Años con BD de archivo, en orden."""
+    base = re.escape(os.path.splitext(os.path.basename(DB_FILE))[0])
+    patron = re.compile(rf"{base}_(\d{{4}})\.db$")
+    try:
+        nombres = os.listdir(carpeta_archivo())
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(patron.match, nombres) if m)
+
+def archivos_del_rango(desde=None, hasta=None):
+    """Rutas de los años archivados que se cruzan con [desde, hasta), en orden."""
+    return [ruta_archivo(anio) for anio in anios_archivados()
+            if (desde is None or desde < f"{anio + 1:04d}")
+            and (hasta is None or hasta > f"{anio:04d}")]
+
+def horizonte(meses, hoy=None):
+    """Primer día del mes de hace 'meses' meses: con meses=24 el 2026-10-17,
+    '2024-10-01'. Lo anterior se archiva."""
+    hoy = hoy or datetime.date.today()
+    indice = hoy.year * 12 + hoy.month - 1 - meses
+    return datetime.date(indice // 12, indice % 12 + 1, 1).isoformat()
+
+def archivar_ventas(antes, lote=LOTE_ARCHIVO, al_avanzar=None):
+    """
+    Mueve las ventas con fecha < antes ('YYYY-MM-DD') y su detalle a la BD de
+    archivo de su año. Retorna cuántas ventas movió.
+
+    Trabaja de a 'lote' ventas y cada lote en dos transacciones cortas (los
+    cobros esperan milisegundos, no lo que tarde todo el archivo): primero se
+    copian al archivo y después se borran de la principal. Si se corta entre
+    las dos, esas ventas quedan en ambos lados y la siguiente corrida solo las
+    borra (la copia usa INSERT OR IGNORE): nunca se pierden.
+
+    al_avanzar: función opcional (anio, movidas_del_anio) después de cada lote.
+    """
+    antes = datetime.date.fromisoformat(antes).isoformat()   # ValueError si no es fecha
+    conn  = get_conn()
+    primera = conn.execute("SELECT MIN(fecha) FROM ventas WHERE fecha < ?", (antes,)).fetchone()[0]
+    movidas = 0
+    if primera is not None:
+        for anio in range(int(primera[:4]), int(antes[:4]) + 1):
+            movidas += _archivar_anio(conn, anio, min(antes, f"{anio + 1:04d}"), lote, al_avanzar)
+    if antes > _archivado_hasta(conn):
+        set_config("archivado_hasta", antes)
+    return movidas
+
+def _archivar_anio(conn, anio, hasta, lote, al_avanzar):
+    os.makedirs(carpeta_archivo(), exist_ok=True)
+    conn.execute("ATTACH DATABASE ? AS archivo", (ruta_archivo(anio),))
+    try:
+        for sql in _ESQUEMA_ARCHIVO:
+            conn.execute(sql)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS por_archivar (id INTEGER PRIMARY KEY)")
+        movidas = 0
+        while True:
+            with transaccion(conn):
+                conn.execute("DELETE FROM temp.por_archivar")
+                n = conn.execute(
+                    "INSERT INTO temp.por_archivar SELECT id FROM main.ventas"
+                    " WHERE fecha >= ? AND fecha < ? ORDER BY fecha LIMIT ?",
+                    (f"{anio:04d}", hasta, lote)).rowcount
+                conn.execute(
+                    "INSERT OR IGNORE INTO archivo.ventas (id, fecha, total, uuid)"
+                    " SELECT id, fecha, total, uuid FROM main.ventas"
+                    " WHERE id IN (SELECT id FROM temp.por_archivar)")
+                conn.execute(
+                    "INSERT OR IGNORE INTO archivo.detalle_venta"
+                    " (id, venta_id, producto_id, nombre, precio, costo, cantidad, subtotal, ganancia)"
+                    " SELECT id, venta_id, producto_id, nombre, precio, costo, cantidad,"
+                    "        subtotal, ganancia FROM main.detalle_venta"
+                    " WHERE venta_id IN (SELECT id FROM temp.por_archivar)")
+            if not n:
+                return movidas
+            with transaccion(conn):
+                # Primero el detalle (FK hijo), luego la cabecera, como eliminar_venta;
+                # los resúmenes NO se tocan: siguen contando estas ventas
+                conn.execute("DELETE FROM main.detalle_venta"
+                             " WHERE venta_id IN (SELECT id FROM temp.por_archivar)")
+                conn.execute("DELETE FROM main.ventas"
+                             " WHERE id IN (SELECT id FROM temp.por_archivar)")
+            movidas += n
+            if al_avanzar:
+                al_avanzar(anio, movidas)
+    finally:
+        conn.execute("DETACH DATABASE archivo")
@@ -0,0 +1,219 @@
+"""
+=============================================================
+  RESPALDOS Y ARCHIVO  —  Copias seguras de ventas.db
+  Ejecutar:  python respaldo.py respaldar
+             python respaldo.py respaldar copia_usb.db
+             python respaldo.py archivar --meses 24
+             python respaldo.py listar
+  El programa de ventas y el servidor respaldan solos cada
+  POS_RESPALDO_HORAS (24 por defecto) sin detener los cobros.
+=============================================================
+
+Copiar ventas.db con el explorador mientras el programa está abierto puede
+dar una copia corrupta (a medio escribir, o sin lo que aún está en el
+-wal). respaldar() usa la API de respaldo de SQLite, que copia una foto
+consistente de la BD; la copia se revisa (PRAGMA quick_check) y solo
+entonces toma su nombre final: un respaldo cortado nunca parece bueno.
+
+Los respaldos automáticos van a respaldos/ junto a ventas.db (POS_RESPALDOS
+para otra carpeta, p. ej. una memoria USB o una carpeta sincronizada) y se
+conservan los últimos POS_RESPALDOS_CONSERVAR (14).
+
+Archivo: con POS_ARCHIVAR_MESES=24, después de cada respaldo automático las
+ventas de hace más de 24 meses pasan a archivo/ventas_<año>.db (ver
+repositorio.archivar_ventas): la BD de todos los días se mantiene chica. Los
+KPIs y reportes siguen contando esas ventas; el historial ya no las muestra;
+exportacion.py las incluye con --archivadas.
+"""
+
+import argparse, datetime, os, re, sqlite3, sys, threading, time
+
+import repositorio
+
+CADA_HORAS     = float(os.environ.get("POS_RESPALDO_HORAS", "24"))   # 0 = sin automáticos
+CONSERVAR      = int(os.environ.get("POS_RESPALDOS_CONSERVAR", "14"))
+ARCHIVAR_MESES = int(os.environ.get("POS_ARCHIVAR_MESES", "0"))      # 0 = no archivar
+
+PAGINAS        = 1024   # páginas por paso cuando la BD no está en WAL (ver respaldar)
+PAUSA          = 0.01   # segundos entre pasos: ahí pueden escribir las cajas
+ESPERA_INICIAL = 120    # segundos tras abrir el programa antes del primer respaldo
+
+
+# ──────────────────────────────────────────────────────────
+#  RESPALDAR
+# ──────────────────────────────────────────────────────────
+def carpeta_respaldos():
+    return os.environ.get("POS_RESPALDOS") or os.path.join(
+        os.path.dirname(repositorio.DB_FILE), "respaldos")
+
+def _patron():
+    base = re.escape(os.path.splitext(os.path.basename(repositorio.DB_FILE))[0])
+    return re.compile(rf"{base}_\d{{8}}_\d{{6}}\.db$")
+
+def respaldos():
+    """Rutas de los respaldos automáticos, del más viejo al más nuevo."""
+    carpeta = carpeta_respaldos()
+    try:
+        nombres = os.listdir(carpeta)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(carpeta, n) for n in sorted(filter(_patron().match, nombres))]
+
+def respaldar(destino=None, al_avanzar=None):
+    """
+    Copia en caliente de la BD a 'destino' (por defecto respaldos/ventas_<fecha>_<hora>.db).
+    Retorna la ruta. Lanza sqlite3.Error u OSError si no se pudo; en ese caso
+    no queda ningún archivo con el nombre final.
+
+    En WAL la copia se hace de una pasada: es una transacción de lectura, que no
+    frena a las cajas que cobran mientras tanto. En modo DELETE un lector sí
+    frena a los escritores, así que se copia de a PAGINAS con pausas.
+    al_avanzar: función opcional (copiadas, total) en páginas.
+    """
+    automatico = destino is None
+    if automatico:
+        base = os.path.splitext(os.path.basename(repositorio.DB_FILE))[0]
+        destino = os.path.join(carpeta_respaldos(),
+                               f"{base}_{datetime.datetime.now():%Y%m%d_%H%M%S}.db")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    parcial = f"{destino}.parcial"
+    if os.path.exists(parcial):
+        os.remove(parcial)   # De un intento anterior que se cortó
+    origen = sqlite3.connect(repositorio.DB_FILE, timeout=repositorio.ESPERA_BLOQUEO)
+    try:
+        copia = sqlite3.connect(parcial)
+        try:
+            wal = origen.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            avance = (lambda estado, faltan, total: al_avanzar(total - faltan, total)) \
+                if al_avanzar else None
+            origen.backup(copia, pages=-1 if wal else PAGINAS, sleep=PAUSA, progress=avance)
+            # La copia queda como un solo archivo, sin -wal, lista para llevarse
+            copia.execute("PRAGMA journal_mode = DELETE")
+            revision = copia.execute("PRAGMA quick_check").fetchone()[0]
+            if revision != "ok":
+                raise sqlite3.DatabaseError(f"La copia no pasó la revisión: {revision}")
+        finally:
+            copia.close()
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    finally:
+        origen.close()
+    os.replace(parcial, destino)
+    if automatico:
+        for viejo in respaldos()[:-CONSERVAR] if CONSERVAR > 0 else []:
+            os.remove(viejo)
+    return destino
+
+def horas_desde_ultimo():
+    """Horas desde el último respaldo automático (None si no hay ninguno)."""
+    existentes = respaldos()
+    if not existentes:
+        return None
+    return (time.time() - os.path.getmtime(existentes[-1])) / 3600
+
+
+# ──────────────────────────────────────────────────────────
+#  RESPALDO AUTOMÁTICO
+# ──────────────────────────────────────────────────────────
+class RespaldoAutomatico:
+    """
+    Hilo que respalda cuando el último respaldo tiene más de 'cada_horas' (se
+    fija en la carpeta, así varias cajas sobre la misma BD no respaldan cada
+    una) y, si archivar_meses > 0, archiva después lo anterior al horizonte.
+    Los errores no detienen el programa: quedan en ultimo_error y en stderr.
+    """
+
+    def __init__(self, cada_horas=CADA_HORAS, archivar_meses=ARCHIVAR_MESES):
+        self.cada_horas     = cada_horas
+        self.archivar_meses = archivar_meses
+        self.ultimo         = None   # ruta del último respaldo de esta sesión
+        self.ultimo_error   = None
+        self._detener       = threading.Event()
+
+    def iniciar(self):
+        if self.cada_horas <= 0:
+            return
+        threading.Thread(target=self._correr, name="respaldos", daemon=True).start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _correr(self):
+        espera = ESPERA_INICIAL
+        while not self._detener.wait(espera):
+            edad = horas_desde_ultimo()
+            if edad is None or edad >= self.cada_horas:
+                self.revisar()
+                edad = 0
+            # Despertar cuando toque; como mucho cada hora por si otra caja respaldó
+            espera = min(3600, max(60, (self.cada_horas - edad) * 3600))
+
+    def revisar(self):
+        """Un respaldo y, si corresponde, el archivo de ventas antiguas."""
+        try:
+            self.ultimo = respaldar()
+            if self.archivar_meses > 0:
+                repositorio.archivar_ventas(repositorio.horizonte(self.archivar_meses))
+            self.ultimo_error = None
+        except (sqlite3.Error, OSError) as e:
+            self.ultimo_error = e
+            print(f"[respaldos] No se pudo respaldar / archivar: {e}", file=sys.stderr)
+
+
+# ──────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Respaldos y archivo de ventas antiguas")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("respaldar", help="copia en caliente, sin cerrar el programa")
+    p.add_argument("destino", nargs="?", default=None,
+                   help="archivo de salida (por defecto en respaldos/)")
+    p = sub.add_parser("archivar", help="mover ventas antiguas a archivo/<año>.db")
+    grupo = p.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--meses", type=int, help="archivar lo de hace más de N meses")
+    grupo.add_argument("--antes", help="archivar lo anterior a YYYY-MM-DD")
+    p.add_argument("--sin-respaldo", action="store_true",
+                   help="no respaldar antes de archivar")
+    p.add_argument("--compactar", action="store_true",
+                   help="VACUUM al terminar para achicar el archivo (con las cajas cerradas)")
+    sub.add_parser("listar", help="respaldos y años archivados")
+    args = parser.parse_args()
+
+    if args.db:
+        repositorio.DB_FILE = os.path.abspath(args.db)
+    if not os.path.exists(repositorio.DB_FILE):
+        parser.error(f"No existe {repositorio.DB_FILE}")
+    repositorio.init_db()
+
+    if args.comando == "respaldar":
+        t0 = time.perf_counter()
+        ruta = respaldar(args.destino, lambda hechas, total: print(
+            f"  {hechas}/{total} páginas…", end="\r"))
+        print(f"Respaldo en {ruta} ({os.path.getsize(ruta) / 1e6:.1f} MB,"
+              f" {time.perf_counter() - t0:.1f} s)")
+    elif args.comando == "archivar":
+        try:
+            antes = args.antes or repositorio.horizonte(args.meses)
+            datetime.date.fromisoformat(antes)
+        except ValueError:
+            parser.error(f"Fecha no válida: {args.antes}")
+        if not args.sin_respaldo:
+            print(f"Respaldo previo: {respaldar()}")
+        t0 = time.perf_counter()
+        n = repositorio.archivar_ventas(antes, al_avanzar=lambda anio, movidas: print(
+            f"  {anio}: {movidas} ventas…", end="\r"))
+        print(f"{n} ventas anteriores a {antes} archivadas en"
+              f" {time.perf_counter() - t0:.1f} s ({repositorio.carpeta_archivo()})")
+        if args.compactar:
+            repositorio.get_conn().execute("VACUUM")
+            print(f"Compactada: {os.path.getsize(repositorio.DB_FILE) / 1e6:.1f} MB")
+    else:
+        for ruta in respaldos():
+            print(f"  {ruta}  ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+        print(f"Años archivados: {', '.join(map(str, repositorio.anios_archivados())) or 'ninguno'}")
+        hasta = repositorio.get_config("archivado_hasta")
+        if hasta:
+            print(f"La BD principal tiene las ventas desde {hasta}")
+    repositorio.cerrar_conexiones()
@@ -0,0 +1,308 @@
+"""
+=============================================================
+  SERVIDOR  —  Un solo proceso dueño de ventas.db
+  Ejecutar:  python servidor.py                  (solo esta computadora)
+             python servidor.py --host 0.0.0.0    (cajas en la red local)
+  Las cajas se conectan con:
+      POS_SERVIDOR=http://IP:8765 POS_TOKEN=<token> python punto_de_venta.py
+  El token lo muestra el servidor al arrancar (ver Token abajo).
+=============================================================
+
+Protocolo: HTTP/1.1 + JSON, sin dependencias externas.
+
+  GET  /salud                  → {"ok": true, "ventas": n, "grupos": n}
+  POST /api/<funcion>          cuerpo {"args": [...], "kwargs": {...}}
+                               → {"resultado": ...}
+                               → {"error": "StockInsuficiente" | "IntegrityError" |
+                                           "ValueError" | "PermissionError" | "Error",
+                                  "mensaje": ...,
+                                  "faltantes": [...]}      (solo StockInsuficiente)
+
+<funcion> es una de las funciones de repositorio.py listadas en LECTURAS o
+ESCRITURAS; cliente.py expone las mismas con los mismos nombres. El hash de
+la contraseña de administrador no se ofrece: las cajas usan hay_admin,
+verificar_admin y cambiar_admin, y eliminar_venta exige la contraseña.
+
+Token: toda petición lleva "Authorization: Bearer <token>" (401 si no).
+Es POS_TOKEN si está definido; si no, el de servidor.token junto a este
+archivo, que se crea la primera vez. Las cajas de la misma computadora lo
+leen de ahí; las de otras necesitan POS_TOKEN. Va en texto plano (HTTP sin
+cifrar): usar solo en la red local del negocio.
+
+Lecturas: corren en un grupo de hilos, cada uno con su conexión (en WAL no
+bloquean a la escritura). Escrituras: las hace UN solo hilo escritor, en el
+orden en que llegan. Las ventas que se acumulan mientras se confirma la
+anterior se guardan juntas en una sola transacción (un COMMIT para todo el
+grupo), cada una dentro de su SAVEPOINT: si a una le falta stock, solo esa
+se deshace y las demás se confirman igual.
+"""
+
+import argparse, asyncio, concurrent.futures, hmac, json, os, secrets, sqlite3
+
+import instrumentacion
+import repositorio as repo
+from respaldo import RespaldoAutomatico
+
+PUERTO   = 8765
+GRUPO_MAX = 64   # ventas por COMMIT como máximo
+RUTA_TOKEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "servidor.token")
+
+LECTURAS = {
+    "get_config", "hay_admin", "verificar_admin",
+    "listar_productos", "obtener_producto", "listar_productos_admin",
+    "version_productos", "cambios_productos",
+    "listar_ventas", "kpis_del_dia", "detalle_de_venta",
+    "top_productos", "mapa_horario", "margenes_por_categoria",
+    "listar_compras", "detalle_de_compra",
+}
+ESCRITURAS = {
+    "set_config", "cambiar_admin",
+    "guardar_producto", "eliminar_producto", "eliminar_venta", "upsert_productos",
+    "registrar_compra",  # recepción de mercancía (compras.py)
+    "registrar_lote",    # diario de ventas pendientes de una caja (diario.py)
+    "registrar_venta",   # agrupada: ver _escribir_grupo
+}
+CON_CLAVE = {"eliminar_venta"}      # exigen la contraseña de administrador (kwarg clave)
+CONFIG_PRIVADA = {"admin_hash"}     # claves que get_config / set_config no tocan
+
+
+def token_compartido():
+    """POS_TOKEN, o el de servidor.token (se crea al azar la primera vez)."""
+    if os.environ.get("POS_TOKEN"):
+        return os.environ["POS_TOKEN"]
+    try:
+        with open(RUTA_TOKEN, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(24)
+    # Solo el dueño puede leerlo (en Linux; en Windows lo protege la carpeta)
+    with os.fdopen(os.open(RUTA_TOKEN, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                   "w", encoding="utf-8") as f:
+        f.write(token)
+    return token
+
+def _validar(nombre, args, kwargs):
+    """Lanza PermissionError si la petición toca lo que las cajas no pueden."""
+    if nombre in ("get_config", "set_config"):
+        clave = args[0] if args else kwargs.get("clave")
+        if clave in CONFIG_PRIVADA:
+            raise PermissionError(f"{clave} no se puede leer ni escribir desde una caja.")
+    if nombre in CON_CLAVE and not kwargs.get("clave"):
+        raise PermissionError("Se requiere la contraseña de administrador.")
+
+
+# ──────────────────────────────────────────────────────────
+#  ESCRITOR ÚNICO
+# ──────────────────────────────────────────────────────────
+def _escribir_grupo(ventas):
+    """
+    Corre en el hilo escritor. ventas: [(items, fecha, uuid), ...].
+    Retorna una lista paralela con (venta_id, total) o la excepción de cada una.
+    """
+    conn = repo.get_conn()
+    resultados = []
+    with repo.transaccion(conn):
+        for items, fecha, uuid in ventas:
+            conn.execute("SAVEPOINT venta")
+            try:
+                resultados.append(repo.insertar_venta(conn, items, fecha, uuid))
+            except sqlite3.OperationalError:
+                raise   # Del grupo entero (BD bloqueada, disco): lo reintenta con_reintentos
+            except Exception as e:
+                # Una venta mal formada no debe tumbar las de las otras cajas
+                conn.execute("ROLLBACK TO venta")
+                if isinstance(e, repo.StockInsuficiente):
+                    e = repo.StockInsuficiente(repo._faltantes(conn, items))
+                resultados.append(e)
+            conn.execute("RELEASE venta")
+    return resultados
+
+_CAMPOS_ITEM = {"id": int, "nombre": str, "precio": int, "costo": int, "cantidad": int}
+
+def _args_venta(items, fecha=None, uuid=None):
+    """Revisa la forma de la venta antes de encolarla: ValueError → 400."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("items debe ser una lista no vacía.")
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"línea {n}: no es un objeto.")
+        for campo, tipo in _CAMPOS_ITEM.items():
+            if type(item.get(campo)) is not tipo:
+                raise ValueError(f"línea {n}: falta {campo} o no es {tipo.__name__}.")
+        if item["cantidad"] <= 0 or item["precio"] < 0 or item["costo"] < 0:
+            raise ValueError(f"línea {n}: cantidad, precio o costo fuera de rango.")
+    for nombre, valor in (("fecha", fecha), ("uuid", uuid)):
+        if valor is not None and not isinstance(valor, str):
+            raise ValueError(f"{nombre} debe ser texto.")
+    return items, fecha, uuid
+
+# Si el grupo completo falla (p. ej. disco lleno), cada venta recibe el error
+_escribir_grupo_con_reintentos = repo.con_reintentos(_escribir_grupo)
+
+
+class Servidor:
+    def __init__(self, token, lectores=4):
+        self._token = token
+        self._lectores = concurrent.futures.ThreadPoolExecutor(
+            lectores, thread_name_prefix="lector")
+        self._escritor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="escritor")
+        self._cola = None   # asyncio.Queue de (funcion, args, kwargs, futuro)
+        self.grupos, self.ventas = 0, 0   # ventas / grupos = ventas por COMMIT
+
+    async def iniciar(self, host, puerto):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._escritor, repo.init_db)
+        self._cola = asyncio.Queue()
+        asyncio.create_task(self._bucle_escritor())
+        return await asyncio.start_server(self._atender, host, puerto)
+
+    async def llamar(self, nombre, args, kwargs):
+        _validar(nombre, args, kwargs)
+        loop = asyncio.get_running_loop()
+        if nombre in LECTURAS:
+            funcion = getattr(repo, nombre)
+            return await loop.run_in_executor(self._lectores, lambda: funcion(*args, **kwargs))
+        if nombre == "registrar_venta":
+            args, kwargs = _args_venta(*args, **kwargs), {}
+        futuro = loop.create_future()
+        await self._cola.put((nombre, args, kwargs, futuro))
+        return await futuro
+
+    async def _bucle_escritor(self):
+        loop = asyncio.get_running_loop()
+        pendiente = None
+        while True:
+            nombre, args, kwargs, futuro = pendiente or await self._cola.get()
+            pendiente = None
+            if nombre != "registrar_venta":
+                funcion = getattr(repo, nombre)
+                try:
+                    futuro.set_result(await loop.run_in_executor(
+                        self._escritor, lambda: funcion(*args, **kwargs)))
+                except Exception as e:
+                    futuro.set_exception(e)
+                continue
+            # Juntar las ventas que ya están esperando (sin adelantar otras escrituras)
+            grupo = [(args, kwargs, futuro)]
+            while len(grupo) < GRUPO_MAX and not self._cola.empty():
+                siguiente = self._cola.get_nowait()
+                if siguiente[0] != "registrar_venta":
+                    pendiente = siguiente
+                    break
+                grupo.append(siguiente[1:])
+            ventas = [a for a, _, _ in grupo]
+            try:
+                resultados = await loop.run_in_executor(
+                    self._escritor, _escribir_grupo_con_reintentos, ventas)
+            except Exception as e:
+                resultados = [e] * len(grupo)
+            self.grupos += 1
+            self.ventas += len(grupo)
+            for (_, _, fut), r in zip(grupo, resultados):
+                if isinstance(r, BaseException):
+                    fut.set_exception(r)
+                else:
+                    fut.set_result(r)
+
+    # ── HTTP ──────────────────────────────────────────────
+    async def _atender(self, lector, escritor):
+        """Una conexión keep-alive: varias peticiones seguidas de la misma caja."""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+                largo, cerrar, token = 0, False, ""
+                while True:
+                    h = (await lector.readline()).decode("latin-1").strip()
+                    if not h:
+                        break
+                    clave, _, valor = h.partition(":")
+                    clave = clave.strip().lower()
+                    if clave == "content-length":
+                        largo = int(valor)
+                    elif clave == "connection" and valor.strip().lower() == "close":
+                        cerrar = True
+                    elif clave == "authorization":
+                        token = valor.strip().removeprefix("Bearer ").strip()
+                cuerpo = await lector.readexactly(largo) if largo else b""
+                if hmac.compare_digest(token.encode(), self._token.encode()):
+                    estado, respuesta = await self._responder(metodo, ruta, cuerpo)
+                else:
+                    estado, respuesta = "401 Unauthorized", {
+                        "error": "PermissionError",
+                        "mensaje": "token incorrecto o ausente (POS_TOKEN)"}
+                datos = json.dumps(respuesta, ensure_ascii=False).encode()
+                escritor.write(
+                    f"HTTP/1.1 {estado}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(datos)}\r\n\r\n".encode() + datos)
+                await escritor.drain()
+                if cerrar:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _responder(self, metodo, ruta, cuerpo):
+        if metodo == "GET" and ruta == "/salud":
+            return "200 OK", {"ok": True, "ventas": self.ventas, "grupos": self.grupos}
+        nombre = ruta[len("/api/"):] if ruta.startswith("/api/") else None
+        if metodo != "POST" or nombre not in LECTURAS | ESCRITURAS:
+            return "404 Not Found", {"error": "Error", "mensaje": f"{metodo} {ruta}"}
+        try:
+            peticion = json.loads(cuerpo or b"{}")
+            resultado = await self.llamar(nombre, peticion.get("args", []),
+                                          peticion.get("kwargs", {}))
+        except repo.StockInsuficiente as e:
+            return "409 Conflict", {"error": "StockInsuficiente", "mensaje": str(e),
+                                    "faltantes": e.faltantes}
+        except sqlite3.IntegrityError as e:
+            return "409 Conflict", {"error": "IntegrityError", "mensaje": str(e)}
+        except (ValueError, TypeError) as e:
+            return "400 Bad Request", {"error": "ValueError", "mensaje": str(e)}
+        except PermissionError as e:
+            return "403 Forbidden", {"error": "PermissionError", "mensaje": str(e)}
+        except Exception as e:
+            return "500 Internal Server Error", {"error": "Error", "mensaje": str(e)}
+        return "200 OK", {"resultado": resultado}
+
+
+# ──────────────────────────────────────────────────────────
+async def _principal(args):
+    token = token_compartido()
+    servidor = Servidor(token, args.lectores)
+    red = await servidor.iniciar(args.host, args.puerto)
+    print(f"Servidor de ventas en http://{args.host}:{args.puerto}  —  BD: {repo.DB_FILE}")
+    if args.host not in ("127.0.0.1", "localhost"):
+        print(f"Cajas de otras computadoras: POS_TOKEN={token}")
+    async with red:
+        await red.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local del punto de venta")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="0.0.0.0 para aceptar cajas de otras computadoras "
+                             "(con POS_TOKEN, ver arriba)")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--lectores", type=int, default=4, help="hilos para consultas")
+    parser.add_argument("--db", default=None, help="ruta de ventas.db (por defecto junto al .py)")
+    args = parser.parse_args()
+    if args.db:
+        repo.DB_FILE = os.path.abspath(args.db)
+    if instrumentacion.ACTIVA:   # Resumen de tiempos al detenerlo (ver instrumentacion.py)
+        instrumentacion.activar(repo)
+    respaldos = RespaldoAutomatico()   # Ver respaldo.py (POS_RESPALDO_HORAS)
+    respaldos.iniciar()
+    try:
+        asyncio.run(_principal(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        respaldos.detener()
+        repo.cerrar_conexiones()
@@ -0,0 +1,212 @@
+"""
+=============================================================
+  TABLA VIRTUAL  —  Treeview que solo dibuja lo visible
+  El Treeview de Tk crea un elemento por fila; con miles de
+  filas cada recarga cuesta miles de llamadas a Tk. Aquí los
+  datos viven en una lista de Python y en el Treeview solo
+  existen las filas que caben en pantalla.
+=============================================================
+"""
+
+from tkinter import ttk
+
+
+class TablaVirtual:
+    """
+    Envuelve un ttk.Treeview y su Scrollbar vertical.
+
+    Las filas son tuplas (iid, values, tags). Al desplazarse o recargar, se
+    compara la ventana nueva con la que ya está dibujada y solo se insertan,
+    mueven, actualizan o borran las filas que cambiaron: el costo de cada
+    refresco depende de la altura de la tabla, no del número de filas.
+
+    al_final: función opcional que se llama cuando la ventana llega a la
+              última fila cargada (sirve para paginar, p. ej. el historial).
+    al_seleccionar: función opcional que se llama cuando el usuario cambia
+              la fila seleccionada. Usarla en vez de bind("<<TreeviewSelect>>"):
+              al desplazarse, la fila seleccionada sale del Treeview y al volver
+              se selecciona otra vez, lo que Tk anuncia como una selección nueva.
+    """
+
+    RUEDA_FILAS = 3   # filas por "clic" de la rueda del ratón
+
+    def __init__(self, tree, scrollbar, al_final=None, al_seleccionar=None):
+        self.tree      = tree
+        self.sb        = scrollbar
+        self.al_final  = al_final
+        self.al_seleccionar = al_seleccionar
+        self._filas    = []    # [(iid, values, tags)] — todos los datos
+        self._indice   = {}    # iid → posición en _filas
+        self._inicio   = 0     # primera fila visible
+        self._capacidad = 1    # filas que caben en pantalla (se recalcula en <Configure>)
+        self._vista    = []    # iids dibujados en el Treeview, en orden
+        self._dibujado = {}    # iid → (values, tags) tal como está en el Treeview
+        self._seleccion = None
+        self._avisada  = None  # última selección que se pasó a al_seleccionar
+        self._pidiendo = False
+
+        tree.configure(yscrollcommand=lambda *a: None)
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.bind("<Configure>", self._on_configure, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", self._on_rueda)
+        tree.bind("<Button-4>", lambda e: self._desplazar(-self.RUEDA_FILAS))
+        tree.bind("<Button-5>", lambda e: self._desplazar(self.RUEDA_FILAS))
+        tree.bind("<Down>",  lambda e: self._mover(1))
+        tree.bind("<Up>",    lambda e: self._mover(-1))
+        tree.bind("<Next>",  lambda e: self._mover(self._capacidad))
+        tree.bind("<Prior>", lambda e: self._mover(-self._capacidad))
+        tree.bind("<Home>",  lambda e: self._mover(-len(self._filas)))
+        tree.bind("<End>",   lambda e: self._mover(len(self._filas)))
+
+    # ── Datos ─────────────────────────────────────────────
+    def cargar(self, filas, conservar_posicion=False):
+        """Reemplaza todas las filas. Por defecto vuelve al inicio de la tabla."""
+        self._filas  = list(filas)
+        self._indice = {f[0]: i for i, f in enumerate(self._filas)}
+        if not conservar_posicion:
+            self._inicio = 0
+        if self._seleccion not in self._indice:
+            self._seleccion = self._avisada = None
+        self._render()
+
+    def agregar(self, filas):
+        """Agrega filas al final (siguiente página) sin mover la vista."""
+        for f in filas:
+            self._indice[f[0]] = len(self._filas)
+            self._filas.append(f)
+        self._render()
+
+    def limpiar(self):
+        self.cargar([])
+
+    def __len__(self):
+        return len(self._filas)
+
+    def primera(self):
+        """iid de la primera fila, o None si la tabla está vacía."""
+        return self._filas[0][0] if self._filas else None
+
+    def seleccion(self):
+        """iid seleccionado, aunque en este momento esté fuera de la pantalla."""
+        return self._seleccion
+
+    def valores(self, iid):
+        return self._filas[self._indice[iid]][1]
+
+    def deseleccionar(self):
+        self._seleccion = self._avisada = None
+        self.tree.selection_remove(*self.tree.selection())
+
+    def seleccionar(self, iid):
+        """Selecciona una fila y desplaza la vista hasta ella si hace falta."""
+        if iid not in self._indice:
+            return
+        pos = self._indice[iid]
+        if pos < self._inicio:
+            self._inicio = pos
+        elif pos >= self._inicio + self._capacidad:
+            self._inicio = pos - self._capacidad + 1
+        self._seleccion = iid
+        self._render()
+        self.tree.focus(iid)
+
+    # ── Dibujo ────────────────────────────────────────────
+    def _render(self):
+        total = len(self._filas)
+        cap   = self._capacidad
+        self._inicio = max(0, min(self._inicio, total - cap))
+        # Una fila extra al final: la que se ve cortada en el borde inferior
+        ventana = self._filas[self._inicio:self._inicio + cap + 1]
+        nuevos  = [f[0] for f in ventana]
+        visibles = set(nuevos)
+
+        sobrantes = [iid for iid in self._vista if iid not in visibles]
+        if sobrantes:
+            self.tree.delete(*sobrantes)
+            for iid in sobrantes:
+                del self._dibujado[iid]
+
+        for pos, (iid, values, tags) in enumerate(ventana):
+            antes = self._dibujado.get(iid)
+            if antes is None:
+                self.tree.insert("", pos, iid=iid, values=values, tags=tags)
+            else:
+                if antes != (values, tags):
+                    self.tree.item(iid, values=values, tags=tags)
+                if self.tree.index(iid) != pos:
+                    self.tree.move(iid, "", pos)
+            self._dibujado[iid] = (values, tags)
+        self._vista = nuevos
+
+        if self._seleccion in visibles and self.tree.selection() != (self._seleccion,):
+            self.tree.selection_set(self._seleccion)
+        self.tree.yview_moveto(0)
+
+        if total:
+            self.sb.set(self._inicio / total, min(1.0, (self._inicio + cap) / total))
+        else:
+            self.sb.set(0, 1)
+
+        if (self.al_final and total and self._inicio + cap >= total - 1
+                and not self._pidiendo):
+            self._pidiendo = True
+            self.tree.after_idle(self._pedir_mas)
+
+    def _pedir_mas(self):
+        self._pidiendo = False
+        self.al_final()
+
+    # ── Eventos ───────────────────────────────────────────
+    def _on_configure(self, event=None):
+        alto_fila = int(ttk.Style().lookup(self.tree.cget("style") or "Treeview",
+                                           "rowheight") or 20)
+        encabezado = alto_fila
+        if self._vista:
+            caja = self.tree.bbox(self._vista[0])
+            if caja:
+                encabezado = caja[1]
+        capacidad = max(1, (self.tree.winfo_height() - encabezado) // alto_fila)
+        if capacidad != self._capacidad:
+            self._capacidad = capacidad
+            self._render()
+
+    def _on_select(self, event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return   # La fila salió de la ventana; se recuerda igual
+        self._seleccion = sel[0]
+        # La misma fila reseleccionada por _render al volver a la vista no es
+        # un cambio: sin esto el historial consultaría el detalle en cada scroll
+        if sel[0] != self._avisada:
+            self._avisada = sel[0]
+            if self.al_seleccionar:
+                self.al_seleccionar()
+
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        total = len(self._filas)
+        if accion == "moveto":
+            self._inicio = int(float(cantidad) * total)
+            self._render()
+        else:
+            n = int(cantidad)
+            self._desplazar(n * self._capacidad if unidad == "pages" else n)
+
+    def _on_rueda(self, event):
+        # Windows envía múltiplos de 120; macOS, valores pequeños
+        pasos = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        return self._desplazar(-pasos * self.RUEDA_FILAS)
+
+    def _desplazar(self, filas):
+        self._inicio += filas
+        self._render()
+        return "break"
+
+    def _mover(self, delta):
+        """Flechas / RePág / AvPág / Inicio / Fin: mueve la selección por los datos."""
+        if not self._filas:
+            return "break"
+        actual = self._indice.get(self._seleccion, -1 if delta > 0 else 0)
+        destino = max(0, min(len(self._filas) - 1, actual + delta))
+        self.seleccionar(self._filas[destino][0])
+        return "break"
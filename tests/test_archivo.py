@@ -0,0 +1,78 @@
+"""
+Archivo de ventas antiguas (repositorio.archivar_ventas) y resúmenes.
+Ejecutar:  python -m pytest tests   (o python -m unittest discover tests)
+"""
+
+import os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repositorio
+
+RESUMENES = ("resumen_diario", "resumen_producto_diario", "resumen_horario")
+
+
+class ArchivoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.db_original = repositorio.DB_FILE
+        repositorio.cerrar_conexiones()
+        repositorio.DB_FILE = os.path.join(self.carpeta, "ventas.db")
+        repositorio.init_db()
+        self.conn = repositorio.get_conn()
+        self.producto = repositorio.listar_productos()[0]
+        self.n = 0
+
+    def tearDown(self):
+        repositorio.cerrar_conexiones()
+        repositorio.DB_FILE = self.db_original
+        shutil.rmtree(self.carpeta)
+
+    def _venta(self, fecha, cantidad=1):
+        pid, _, nombre, precio, costo, _ = self.producto
+        self.n += 1
+        items = [{"id": pid, "nombre": nombre, "precio": precio, "costo": costo,
+                  "cantidad": cantidad}]
+        # Como llegan del diario de una caja: con uuid y fecha propia
+        return repositorio.registrar_lote([(f"u{self.n}", items, fecha)])[0][0]
+
+    def _resumenes(self):
+        return {t: self.conn.execute(f"SELECT * FROM {t} ORDER BY 1, 2").fetchall()
+                for t in RESUMENES}
+
+    def _reconstruir(self):
+        with repositorio.transaccion(self.conn):
+            repositorio.reconstruir_resumen_diario(self.conn)
+            repositorio.reconstruir_resumenes_reportes(self.conn)
+
+    def test_venta_atrasada_tras_archivar_no_rompe_la_reconstruccion(self):
+        for fecha in ("2020-03-01 10:00:00", "2020-03-01 18:30:00", "2020-05-05 12:00:00",
+                      "2024-02-10 09:15:00"):
+            self._venta(fecha, cantidad=2)
+        self.assertEqual(repositorio.archivar_ventas("2021-01-01"), 3)
+
+        # Llega tarde una venta de un día ya archivado (y con resumen)
+        self._venta("2020-05-05 13:00:00")
+        esperado = self._resumenes()
+        self.assertEqual(repositorio.kpis_del_dia("2020-05-05")[0], 2)
+
+        self._reconstruir()   # Antes: UNIQUE constraint failed: resumen_diario.dia
+        self.assertEqual(self._resumenes(), esperado)
+
+        # La siguiente corrida la pasa a su año sin tocar los resúmenes
+        self.assertEqual(repositorio.archivar_ventas("2021-01-01"), 1)
+        self.assertEqual(self._resumenes(), esperado)
+        self.assertEqual(len(list(repositorio.iterar_ventas(archivadas=True))), 5)
+
+    def test_reconstruir_conserva_los_dias_archivados(self):
+        self._venta("2020-03-01 10:00:00")
+        self._venta("2024-02-10 09:15:00")
+        antes = self._resumenes()
+        repositorio.archivar_ventas("2021-01-01")
+        self._reconstruir()
+        self.assertEqual(self._resumenes(), antes)
+
+
+if __name__ == "__main__":
+    unittest.main()
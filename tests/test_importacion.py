@@ -0,0 +1,57 @@
+"""
+Importación de productos (importacion.importar_productos).
+Ejecutar:  python -m pytest tests   (o python -m unittest discover tests)
+"""
+
+import csv, os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repositorio
+from importacion import importar_productos
+
+
+class ImportacionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.db_original = repositorio.DB_FILE
+        repositorio.cerrar_conexiones()
+        repositorio.DB_FILE = os.path.join(self.carpeta, "ventas.db")
+        repositorio.init_db()
+
+    def tearDown(self):
+        repositorio.cerrar_conexiones()
+        repositorio.DB_FILE = self.db_original
+        shutil.rmtree(self.carpeta)
+
+    def _precio(self, codigo):
+        fila = repositorio.get_conn().execute(
+            "SELECT precio FROM productos WHERE codigo=?", (codigo,)).fetchone()
+        return fila and fila[0]
+
+    def test_fila_con_monto_enorme_se_rechaza_sin_detener_la_importacion(self):
+        ruta = os.path.join(self.carpeta, "lista.csv")
+        with open(ruta, "w", encoding="utf-8", newline="") as f:
+            f.write("codigo,nombre,precio,stock\n"
+                    "IMP-1,Uno,10.50,3\n"
+                    "IMP-2,Dos,1e20,1\n"      # Antes: OverflowError y nada guardado
+                    "IMP-3,Tres,7,1e20\n"
+                    "IMP-4,Cuatro,2,5\n")
+
+        r = importar_productos(ruta)
+
+        self.assertEqual((r["leidas"], r["insertadas"], r["rechazadas"]), (4, 2, 2))
+        self.assertEqual(self._precio("IMP-1"), 1050)
+        self.assertEqual(self._precio("IMP-4"), 200)
+        self.assertIsNone(self._precio("IMP-2"))
+        self.assertIsNone(self._precio("IMP-3"))
+        with open(r["reporte"], encoding="utf-8-sig", newline="") as f:
+            rechazadas = list(csv.DictReader(f))
+        self.assertEqual([(x["linea"], x["motivo"]) for x in rechazadas],
+                         [("3", "precio demasiado grande: '1e20'"),
+                          ("4", "stock demasiado grande: '1e20'")])
+
+
+if __name__ == "__main__":
+    unittest.main()
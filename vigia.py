@@ -0,0 +1,182 @@
+"""
+=============================================================
+  VIGÍA DEL CICLO DE EVENTOS  —  ¿Qué congela la pantalla?
+  Ejecutar:  POS_VIGIA=1 python punto_de_venta.py
+             POS_VIGIA=1 POS_BLOQUEO_MS=100 python punto_de_venta.py
+  Anota en bloqueos.log cada vez que tkinter dejó de atender
+  la pantalla más de POS_BLOQUEO_MS (200 por defecto) y qué
+  método de la ventana lo tenía ocupado.
+=============================================================
+
+Cómo mide: un after() cada INTERVALO_MS. Si el ciclo de eventos está libre,
+dispara a tiempo; si un método tarda (un refresco de historial, un filtro
+enorme, un cobro esperando el candado de la BD) dispara tarde, y ese retraso
+es exactamente lo que el cajero vio congelado.
+
+Quién fue: mientras el after() está atrasado, un hilo toma muestras de la pila
+del hilo de tkinter (sys._current_frames) cada MUESTREO_MS. De cada muestra se
+anota el manejador (el primer método de la aplicación que llamó tkinter, p. ej.
+PuntoDeVenta._cargar_historial) y la línea donde estaba (p. ej.
+repositorio.py:812 en listar_ventas). El bloqueo se atribuye al manejador que
+aparece en más muestras.
+
+Los diálogos (messagebox, filedialog) esperan al usuario, no a la aplicación:
+en Windows son nativos y detienen el ciclo, así que no cuentan como bloqueo.
+
+Al salir se escribe un resumen: retraso del ciclo (p50/p95/p99) y tiempo
+bloqueado por manejador, para comparar antes y después de una optimización.
+Con POS_INSTRUMENTAR=1 los mismos datos aparecen en el resumen de F12.
+"""
+
+import collections, logging, os, sys, threading, time
+
+import instrumentacion
+
+ACTIVO        = os.environ.get("POS_VIGIA", "") == "1"
+UMBRAL_S      = float(os.environ.get("POS_BLOQUEO_MS", "200")) / 1000
+RUTA_REGISTRO = os.environ.get("POS_REGISTRO_BLOQUEOS") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bloqueos.log")
+
+INTERVALO_MS = 50    # cada cuánto se programa el after() de prueba
+MUESTREO_MS  = 20    # cada cuánto se mira la pila mientras está atrasado
+MAX_MUESTRAS = 500   # por bloqueo (un bloqueo de 10 s con MUESTREO_MS=20)
+
+_CARPETA = os.path.dirname(os.path.abspath(__file__))
+# Archivos de la aplicación que solo despachan a otro método: no son "el manejador"
+_DESPACHADORES = {"programador.py", "instrumentacion.py", "vigia.py"}
+_DIALOGOS      = ("messagebox", "filedialog", "simpledialog", "colorchooser", "commondialog")
+
+registro = logging.getLogger("pos.vigia")
+
+
+# ──────────────────────────────────────────────────────────
+#  PILA DEL HILO DE TKINTER
+# ──────────────────────────────────────────────────────────
+def _describir(frame):
+    """
+    Pila de un hilo → (manejador, punto, pila). manejador: el primer método de
+    la aplicación llamado desde tkinter; punto: la línea más interna de la
+    aplicación; pila: las líneas de la aplicación de afuera hacia adentro.
+    Retorna None si el hilo está esperando al usuario en un diálogo.
+    """
+    cuadros = []
+    while frame is not None:
+        cuadros.append(frame)
+        frame = frame.f_back
+    cuadros.reverse()   # De afuera hacia adentro
+    pila = []
+    for f in cuadros:
+        archivo = f.f_code.co_filename
+        if any(d in archivo for d in _DIALOGOS):
+            return None
+        if (archivo.startswith("<") or f.f_code.co_name == "<module>"
+                or os.path.dirname(os.path.abspath(archivo)) != _CARPETA):
+            continue
+        # co_qualname (3.11+) ya trae la clase: "PuntoDeVenta._cargar_historial"
+        metodo = getattr(f.f_code, "co_qualname", f.f_code.co_name).replace(".<locals>", "")
+        pila.append((os.path.basename(archivo), f.f_lineno, metodo))
+    propios = [p for p in pila if p[0] not in _DESPACHADORES]
+    if not propios:
+        return "(tkinter)", "(dentro de tkinter)", tuple(pila)
+    # Un bind(..., lambda e: self._metodo()) se atribuye a _metodo, no a la lambda
+    manejador = next((p[2] for p in propios if not p[2].endswith("<lambda>")), propios[0][2])
+    nombre, linea, metodo = propios[-1]
+    return manejador, f"{nombre}:{linea} en {metodo}", tuple(pila)
+
+
+# ──────────────────────────────────────────────────────────
+#  VIGÍA
+# ──────────────────────────────────────────────────────────
+class VigiaCiclo:
+    """
+    vigia = VigiaCiclo(ventana); vigia.iniciar()  … al cerrar: vigia.detener().
+    Se crea e inicia en el hilo de tkinter.
+    """
+
+    def __init__(self, widget, umbral_s=UMBRAL_S):
+        self.widget     = widget
+        self.umbral_s   = umbral_s
+        self._hilo_tk   = threading.get_ident()
+        self._esperado  = None     # perf_counter() en que debería disparar el after()
+        self._muestras  = []       # (manejador, punto, pila) del atraso en curso
+        self._lock      = threading.Lock()
+        self._detener   = threading.Event()
+        self.bloqueos   = collections.Counter()   # manejador → veces
+        self.bloqueado  = collections.Counter()   # manejador → segundos
+
+    def iniciar(self):
+        instrumentacion.preparar_registro(registro, RUTA_REGISTRO)
+        registro.info("Vigía activo (pid %d, bloqueo desde %.0f ms)",
+                      os.getpid(), self.umbral_s * 1000)
+        self._programar()
+        threading.Thread(target=self._muestrear, name="vigia", daemon=True).start()
+
+    def detener(self):
+        """Al cerrar la ventana: para el muestreo y escribe el resumen."""
+        self._detener.set()
+        texto = self.resumen()
+        registro.info("RESUMEN AL SALIR\n%s", texto)
+        return texto
+
+    def _programar(self):
+        self._esperado = time.perf_counter() + INTERVALO_MS / 1000
+        self.widget.after(INTERVALO_MS, self._latido)
+
+    # ── Hilo de tkinter ───────────────────────────────────
+    def _latido(self):
+        retraso = max(0.0, time.perf_counter() - self._esperado)
+        with self._lock:
+            muestras, self._muestras = self._muestras, []
+        instrumentacion.registrar("tk: retraso del ciclo", retraso)
+        if retraso >= self.umbral_s:
+            self._anotar(retraso, muestras)
+        if not self._detener.is_set():
+            self._programar()
+
+    def _anotar(self, retraso, muestras):
+        if muestras and all(m is None for m in muestras):
+            return   # Todo el tiempo fue un diálogo esperando al usuario
+        muestras = [m for m in muestras if m is not None]
+        if muestras:
+            manejador = collections.Counter(m[0] for m in muestras).most_common(1)[0][0]
+            puntos    = collections.Counter(m[1] for m in muestras if m[0] == manejador)
+            pila      = collections.Counter(m[2] for m in muestras
+                                            if m[0] == manejador).most_common(1)[0][0]
+        else:   # Más corto que el muestreo, o el GIL no soltó al hilo vigía
+            manejador, puntos, pila = "(sin muestra)", collections.Counter(), ()
+        self.bloqueos[manejador]  += 1
+        self.bloqueado[manejador] += retraso
+        instrumentacion.registrar(f"tk: bloqueo en {manejador}", retraso)
+        lineas = [f"BLOQUEO {retraso * 1000:.0f} ms en {manejador} "
+                  f"({len(muestras)} muestras)"]
+        lineas += [f"  {n:>3} × {punto}" for punto, n in puntos.most_common(3)]
+        lineas += [f"  pila: {archivo}:{linea} {metodo}" for archivo, linea, metodo in pila]
+        registro.warning("\n".join(lineas))
+
+    # ── Hilo vigía ────────────────────────────────────────
+    def _muestrear(self):
+        while not self._detener.wait(MUESTREO_MS / 1000):
+            esperado = self._esperado
+            # Atrasado más de medio umbral: empezar a mirar qué está haciendo
+            if esperado is None or time.perf_counter() - esperado < self.umbral_s / 2:
+                continue
+            frame = sys._current_frames().get(self._hilo_tk)
+            if frame is None:
+                continue
+            muestra = _describir(frame)
+            del frame
+            with self._lock:
+                if len(self._muestras) < MAX_MUESTRAS:
+                    self._muestras.append(muestra)
+
+    # ── Resumen ───────────────────────────────────────────
+    def resumen(self):
+        lineas = [instrumentacion.resumen(prefijo="tk: retraso"), "",
+                  f"{'Bloqueos por manejador':<58}{'veces':>7}{'total ms':>10}{'media':>8}"]
+        for manejador, segundos in self.bloqueado.most_common():
+            veces = self.bloqueos[manejador]
+            lineas.append(f"{manejador[:57]:<58}{veces:>7}{segundos * 1000:>10.0f}"
+                          f"{segundos * 1000 / veces:>8.0f}")
+        if not self.bloqueado:
+            lineas.append(f"(ninguno de más de {self.umbral_s * 1000:.0f} ms)")
+        return "\n".join(lineas)